@@ -0,0 +1,38 @@
+"""
+Streak Backfill Script
+
+Computes last participation day, current and longest streak for every
+user from their completed sessions, in one set-based UPDATE. Session
+settlement keeps the state current afterwards.
+
+Usage:
+    python -m backend.backfill_streaks
+"""
+import sys
+import time
+
+from backend.database import SessionLocal, init_db
+from backend.services.streaks import StreakService
+
+
+def main():
+    """Recompute streak state for all users"""
+    init_db()
+    db = SessionLocal()
+    try:
+        print("🔥 Backfilling user streaks...")
+        started = time.perf_counter()
+        updated = StreakService.backfill(db)
+        db.commit()
+        print(f"   • Users updated: {updated}")
+        print(f"   • Elapsed:       {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"\n❌ Error during backfill: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Baseline Benchmark Script
+
+Generates a synthetic cohort with SyntheticLoadGenerator and times the
+cohort baseline path end to end:
+- generating the load profiles
+- indexing them as ConsumptionSeries
+- BaselineService.calculate_many (in process)
+- CohortBatchExecutor.calculate_baselines (worker processes)
+
+Usage:
+    python -m backend.benchmark_baselines --households 100000 --days 35
+"""
+from datetime import datetime, timedelta
+import argparse
+import os
+import time
+
+import numpy as np
+
+from backend.services.baseline import BaselineService
+from backend.services.batch_executor import CohortBatchExecutor
+from backend.services.consumption import ConsumptionSeries
+from backend.services.synthetic import SyntheticLoadGenerator
+
+
+def _timed(label, rows, function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"   • {label:<28} {elapsed:8.3f}s  {rows / elapsed:14,.0f} rows/s")
+    return result
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--households", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=35)
+    parser.add_argument("--interval-minutes", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    session_start = datetime(2025, 7, 15, 17, 0)
+    history_start = session_start - timedelta(days=args.days)
+    generator = SyntheticLoadGenerator(seed=args.seed, interval_minutes=args.interval_minutes)
+
+    print(f"⚡ {args.households:,} households × {args.days} days "
+          f"({args.interval_minutes}-minute readings), {args.workers} workers\n")
+
+    def generate():
+        return [
+            matrix for _, _, matrix in generator.iter_cohort(
+                args.households, history_start, session_start, workers=args.workers
+            )
+        ]
+
+    timestamps = generator.timestamps(history_start, session_start)
+    readings = args.households * len(timestamps)
+    chunks = _timed("generate profiles", readings, generate)
+    print(f"     ({readings:,} readings)")
+
+    series = _timed(
+        "index ConsumptionSeries", args.households,
+        lambda: [ConsumptionSeries(timestamps, row) for matrix in chunks for row in matrix]
+    )
+    in_process = _timed(
+        "calculate_many", args.households,
+        BaselineService.calculate_many, series, session_start, 3
+    )
+
+    executor = CohortBatchExecutor(max_workers=args.workers)
+    try:
+        sharded = _timed(
+            "executor.calculate_baselines", args.households,
+            executor.calculate_baselines, series, session_start, 3
+        )
+    finally:
+        executor.shutdown()
+
+    baselines = np.array([float(value) for value in in_process if value is not None])
+    print(f"\n   • Valid baselines:    {len(baselines):,} / {args.households:,}")
+    print(f"   • Mean baseline:      {baselines.mean():.4f} kWh")
+    print(f"   • Executor matches:   {in_process == sharded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,41 @@ class Settings(BaseSettings):
     PEAK_HOURS_START: int = 17  # 17:00
     PEAK_HOURS_END: int = 20  # 20:00
 
+    # Rolling Baselines (per-process state caught up from meter_reading)
+    ROLLING_BASELINE_SYNC_OVERLAP_SECONDS: int = 300  # Re-read window for in-flight ingestion
+
+    # Baseline Cache
+    BASELINE_CACHE_TTL_HOURS: int = 36
+    BASELINE_CACHE_MAX_MB: int = 64
+    BASELINE_PRECOMPUTE_ENABLED: bool = True
+    BASELINE_PRECOMPUTE_HOUR: int = 2  # 02:00 UTC, fills the cache for the same day
+
+    # Background Jobs (run in the one process holding the leader lock)
+    LEADER_CHECK_SECONDS: int = 15  # Standby retry / leader liveness check interval
+
+    # User Stats Cache (home-screen stats, invalidated on session completion)
+    USER_STATS_CACHE_TTL_SECONDS: int = 300
+    USER_STATS_CACHE_MAX_MB: int = 16
+
+    # Wallet Write Coalescing (group commit of concurrent credits)
+    WALLET_COALESCE_ENABLED: bool = False
+    WALLET_COALESCE_MAX_DELAY_MS: float = 5.0  # Longest a credit waits for its batch
+    WALLET_COALESCE_MAX_BATCH: int = 1000  # Credits per batch
+
+    # Batch Processing (cohort baselines / settlement)
+    BATCH_WORKERS: int = 0  # 0 = one worker process per CPU
+    BATCH_MIN_ROWS_PER_WORKER: int = 5000
+
+    # Session Scheduler (automatic start / completion)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_BATCH_SIZE: int = 10_000  # Sessions per start / settlement transaction
+    SCHEDULER_REFRESH_SECONDS: int = 60  # How often newly created sessions are picked up
+    SCHEDULER_HORIZON_HOURS: int = 24  # How far ahead due times are queued
+    SCHEDULER_SETTLE_DELAY_MINUTES: int = 30  # Wait for meter readings after a session ends
+    SCHEDULER_RETRY_SECONDS: int = 60  # First retry of sessions left behind, doubled per attempt
+    SCHEDULER_RETRY_MAX_SECONDS: int = 900
+    SCHEDULER_START_GRACE_HOURS: int = 24  # Sessions still without a baseline are then FAILED
+
     # Municipality Integration
     MUNICIPALITY_API_BASE_URL: str = "http://localhost:8001/api"
     MUNICIPALITY_API_KEY: str = "municipality-api-key"
@@ -46,6 +81,32 @@ class Settings(BaseSettings):
     # Smart Meter Integration (AHK/EAC)
     AHK_API_BASE_URL: str = "http://localhost:8002/api"
     AHK_API_KEY: str = "ahk-api-key"
+    AHK_MAX_CONCURRENCY: int = 32  # Pooled connections / requests in flight
+    AHK_TIMEOUT_SECONDS: float = 10.0
+    AHK_HTTP2: bool = True
+    METER_READING_INTERVAL_MINUTES: int = 60  # Length of one interval reading
+    METER_DATA_SOURCE: str = "ahk"  # ahk or synthetic (generated load profiles)
+    SYNTHETIC_METER_SEED: int = 0
+    SYNTHETIC_METER_INTERVAL_MINUTES: int = 60
+
+    # Local meter reading store (columnar segment files)
+    METER_STORE_PATH: str = "./data/meter_store"
+    METER_STORE_SEGMENT: str = "day"  # day or month
+
+    # AHK history cache (complete days fetched from AHK, in its own segment store)
+    HISTORY_CACHE_ENABLED: bool = True
+    HISTORY_CACHE_PATH: str = "./data/history_cache"  # Never shared with METER_STORE_PATH
+    HISTORY_CACHE_MAX_MB: int = 2048
+    HISTORY_CACHE_RETENTION_DAYS: int = 35  # Covers the 4-week same-weekday lookback
+
+    # Meter Reading Ingestion
+    INGEST_BATCH_ROWS: int = 200_000
+    INGEST_MAX_INTERVAL_KWH: float = 50.0  # Higher interval readings are treated as meter faults
+
+    # Live Session Tracking
+    LIVE_READING_INTERVAL_MINUTES: int = 60  # Length of one interval reading
+    LIVE_KEEPALIVE_SECONDS: int = 15  # SSE comment sent when no update arrives
+    LIVE_CATCH_UP_OVERLAP_SECONDS: int = 300  # Re-read window for in-flight ingestion
 
     # Notifications
     ENABLE_PUSH_NOTIFICATIONS: bool = True
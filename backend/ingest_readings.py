@@ -0,0 +1,51 @@
+"""
+Meter Reading Ingestion Script
+
+Bulk loads AHK/EAC interval exports into the meter_reading table, the
+columnar meter store and the rolling baselines.
+
+Usage:
+    python -m backend.ingest_readings readings.csv [more.csv ...]
+"""
+import sys
+
+from backend.database import SessionLocal, init_db
+from backend.services.ingestion import MeterIngestionService
+from backend.services.meter_store import get_meter_store
+
+
+def main():
+    """Ingest every CSV given on the command line"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        service = MeterIngestionService(db, meter_store=get_meter_store())
+        for path in sys.argv[1:]:
+            print(f"📥 Ingesting {path}...")
+            with open(path, encoding="utf-8", newline="") as handle:
+                report = service.ingest_csv(handle)
+
+            print(f"   • Rows received:      {report['rows_received']}")
+            print(f"   • Rows written:       {report['rows_written']}")
+            print(f"   • Rejected:           {report['rows_rejected']}")
+            print(f"   • Duplicates dropped: {report['duplicates_dropped']}")
+            print(f"   • Meters:             {report['meters']}")
+            print(f"   • Throughput:         {report['rows_per_second']:,.0f} rows/s "
+                  f"({report['elapsed_seconds']}s)")
+            for error in report["errors"][:10]:
+                print(f"   ⚠️  line {error['line']}: {error['reason']}")
+
+    except Exception as e:
+        print(f"\n❌ Error during ingestion: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Wallet Concurrency Load Test
+
+Fires many concurrent credits at one wallet through the running API and
+checks that no euro was lost: the balance and total earned must grow by
+exactly the sum of the accepted credits. Optionally spreads the same load
+over several wallets to compare throughput with the single-wallet case.
+
+Usage:
+    python -m backend.load_test_wallet --user-id <uuid> --requests 1000
+    python -m backend.load_test_wallet --user-id <uuid> --user-id <uuid> --requests 1000
+"""
+from decimal import Decimal
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+
+async def _balance(client: httpx.AsyncClient, user_id: str) -> dict:
+    response = await client.get(f"/api/v1/wallet/{user_id}/balance")
+    response.raise_for_status()
+    return response.json()
+
+
+async def _credit(client: httpx.AsyncClient, user_id: str, amount: Decimal, index: int) -> bool:
+    response = await client.post(
+        f"/api/v1/wallet/{user_id}/credit",
+        json={"user_id": user_id, "amount": str(amount), "description": f"Load test credit {index}"}
+    )
+    return response.status_code == 200
+
+
+async def run(base_url: str, user_ids: list, requests: int, amount: Decimal, concurrency: int) -> bool:
+    """Run the test; returns True if every wallet balanced"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        before = {user_id: await _balance(client, user_id) for user_id in user_ids}
+
+        started = time.perf_counter()
+        targets = [user_ids[index % len(user_ids)] for index in range(requests)]
+        results = await asyncio.gather(*[
+            _credit(client, user_id, amount, index) for index, user_id in enumerate(targets)
+        ])
+        elapsed = time.perf_counter() - started
+
+        after = {user_id: await _balance(client, user_id) for user_id in user_ids}
+
+    print(f"   • Requests:   {requests} ({sum(results)} accepted, {requests - sum(results)} failed)")
+    print(f"   • Elapsed:    {elapsed:.2f}s ({requests / elapsed:,.0f} credits/s)")
+
+    balanced = True
+    for user_id in user_ids:
+        accepted = sum(ok for ok, target in zip(results, targets) if target == user_id)
+        expected = amount * accepted
+        gained = Decimal(str(after[user_id]["current_balance"])) - Decimal(str(before[user_id]["current_balance"]))
+        earned = Decimal(str(after[user_id]["total_earned"])) - Decimal(str(before[user_id]["total_earned"]))
+        ok = gained == expected and earned == expected
+        balanced = balanced and ok
+        print(f"   {'✅' if ok else '❌'} {user_id}: expected +€{expected}, balance +€{gained}, earned +€{earned}")
+    return balanced
+
+
+def main():
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-id", action="append", required=True, help="Wallet owner (repeat for several)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--amount", type=Decimal, default=Decimal("0.01"))
+    parser.add_argument("--concurrency", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"💶 {args.requests} concurrent credits of €{args.amount} to {len(args.user_id)} wallet(s)\n")
+    balanced = asyncio.run(run(args.base_url, args.user_id, args.requests, args.amount, args.concurrency))
+    if not balanced:
+        print("\n❌ Lost updates detected")
+        sys.exit(1)
+    print("\n✅ No lost updates")
+
+
+if __name__ == "__main__":
+    main()
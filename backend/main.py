@@ -5,11 +5,25 @@ Main entry point for the PowerSave backend API.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from typing import Coroutine, List, Optional
+import asyncio
 import logging
 
 from .config import get_settings
-from .database import init_db
-from .routers import waste_wallet, sessions, auth
+from .database import init_db, engine, SessionLocal
+from .routers import waste_wallet, sessions, auth, meter_readings, events
+from .services.baseline_cache import run_nightly_precompute
+from .services.batch_executor import get_batch_executor
+from .services.leader import LeaderLock, run_as_leader
+from .services.live_tracker import READINGS_CHANNEL, get_live_tracker
+from .services.meter_data import MeterDataService
+from .services.ahk_meter import get_ahk_meter_service
+from .services.history_cache import get_history_cache
+from .services.rolling_baseline import get_rolling_baseline_store
+from .services.pg_listener import listen
+from .services.session_scheduler import SessionScheduler
+from .services.user_stats import STATS_CHANNEL, get_user_stats_service
+from .services.wallet_coalescer import get_wallet_coalescer
 
 # Configure logging
 logging.basicConfig(
@@ -41,6 +55,49 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(waste_wallet.router, prefix="/api/v1/wallet", tags=["Waste Wallet"])
 app.include_router(sessions.router, prefix="/api/v1/sessions", tags=["Saving Sessions"])
+app.include_router(meter_readings.router, prefix="/api/v1/meter-readings", tags=["Meter Readings"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["Saving Events"])
+
+
+def _sync_rolling_baselines() -> None:
+    db = SessionLocal()
+    try:
+        get_rolling_baseline_store().sync(db)
+    except Exception as e:
+        logger.error(f"Rolling baseline rebuild failed: {e}")
+    finally:
+        db.close()
+
+
+async def _on_readings(payloads: Optional[List[str]]) -> None:
+    """Readings written by any process: update live sessions and rolling baselines"""
+    await asyncio.gather(
+        get_live_tracker().on_notify(engine, payloads),
+        get_rolling_baseline_store().on_notify(engine, payloads),
+    )
+
+
+def _background_jobs() -> List[Coroutine]:
+    """Jobs that run in exactly one process"""
+    loop = asyncio.get_running_loop()
+    jobs = []
+
+    if settings.BASELINE_PRECOMPUTE_ENABLED:
+        jobs.append(run_nightly_precompute(
+            session_factory=SessionLocal,
+            history_loader=MeterDataService.cohort_loader(loop)
+        ))
+
+    if settings.SCHEDULER_ENABLED:
+        app.state.session_scheduler = SessionScheduler(
+            session_factory=SessionLocal,
+            history_loader=MeterDataService.cohort_loader(loop),
+            consumption_loader=MeterDataService.consumption_loader(loop),
+            executor=get_batch_executor()
+        )
+        jobs.append(app.state.session_scheduler.run())
+
+    return jobs
 
 
 @app.on_event("startup")
@@ -50,6 +107,52 @@ async def startup_event():
     init_db()
     logger.info("Database initialized")
 
+    # Rebuild this process's rolling baselines from meter_reading before the peak
+    app.state.rolling_baseline_task = asyncio.create_task(
+        asyncio.to_thread(_sync_rolling_baselines)
+    )
+
+    if settings.HISTORY_CACHE_ENABLED:
+        # Account for history cached by earlier processes without delaying requests
+        app.state.history_cache_task = asyncio.create_task(
+            asyncio.to_thread(get_history_cache().adopt_existing)
+        )
+
+    # Live sessions, rolling baselines and cached stats in this process follow
+    # writes made by any process
+    app.state.listener_task = asyncio.create_task(listen(engine, {
+        READINGS_CHANNEL: _on_readings,
+        STATS_CHANNEL: get_user_stats_service().on_notify,
+    }))
+
+    if settings.BASELINE_PRECOMPUTE_ENABLED or settings.SCHEDULER_ENABLED:
+        # Nightly precompute and session scheduler run on the leader process only
+        app.state.background_jobs_task = asyncio.create_task(
+            run_as_leader(LeaderLock(engine), _background_jobs, settings.LEADER_CHECK_SECONDS)
+        )
+        logger.info("Background jobs scheduled on the leader process")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and close outbound connection pools"""
+    if settings.WALLET_COALESCE_ENABLED:
+        # Credits waiting for their batch have callers expecting them written
+        await get_wallet_coalescer().drain()
+
+    # Cancelling the leader task cancels the scheduler and precompute and frees the lock
+    tasks = [
+        getattr(app.state, name, None)
+        for name in ("background_jobs_task", "rolling_baseline_task", "history_cache_task", "listener_task")
+    ]
+    tasks = [task for task in tasks if task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    get_batch_executor().shutdown()
+    await get_ahk_meter_service().aclose()
+
 
 @app.get("/")
 async def root():
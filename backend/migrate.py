@@ -0,0 +1,223 @@
+"""
+Schema Migration Script
+
+init_db (create_all) creates missing tables but never changes existing
+ones. This script brings an existing database up to the current models:
+each migration runs once, in order, and is recorded in schema_migration.
+Indexes are built with CREATE INDEX CONCURRENTLY and constraints are
+validated separately from being added, so the API can keep serving while
+the script runs. Every step is idempotent, so on a database created from
+the current models the migrations only record themselves.
+
+Usage:
+    python -m backend.migrate           # apply pending migrations
+    python -m backend.migrate --list    # show applied and pending migrations
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from typing import Callable, List, NamedTuple, Sequence
+import sys
+import time
+
+from backend.database import engine, init_db
+from backend.services.streaks import StreakService
+from backend.services.wallet_rollup import WalletRollupService
+
+# pg advisory lock key, so two deploys never migrate at once ("Migrate!")
+MIGRATION_LOCK_KEY = 0x4D69677261746521
+
+Step = Callable[[Connection], None]
+
+
+class Migration(NamedTuple):
+    """One schema change, applied once"""
+    name: str
+    description: str
+    steps: Sequence[Step]
+
+
+def _sql(*statements: str) -> Step:
+    """Run statements one by one"""
+    def step(connection: Connection) -> None:
+        for statement in statements:
+            connection.execute(text(statement))
+    return step
+
+
+def _drop_if_invalid(connection: Connection, index: str) -> None:
+    # A failed concurrent build leaves an invalid index that IF NOT EXISTS would keep
+    invalid = connection.execute(text(
+        "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:index) AND NOT indisvalid"
+    ), {"index": index}).first()
+    if invalid is not None:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index}"))
+
+
+def _in_transaction(work: Callable[[Session], object]) -> Step:
+    """Run a data step in its own transaction"""
+    def step(connection: Connection) -> None:
+        with Session(bind=connection.engine) as db:
+            work(db)
+            db.commit()
+    return step
+
+
+def _index(name: str, table: str, columns: str) -> Step:
+    """CREATE INDEX CONCURRENTLY, replacing an invalid leftover"""
+    def step(connection: Connection) -> None:
+        _drop_if_invalid(connection, name)
+        connection.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+    return step
+
+
+def _partitioned_index(name: str, table: str, columns: str, suffix: str) -> Step:
+    """
+    Index a partitioned table without locking it
+
+    Partitioned tables cannot be indexed concurrently: the parent index is
+    created ON ONLY the parent (instant, invalid), each partition is
+    indexed concurrently and attached, and the parent index becomes valid
+    once every partition is attached. Partitions created later get the
+    index automatically.
+    """
+    def step(connection: Connection) -> None:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({columns})"))
+        partitions = connection.execute(text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = CAST(:table AS regclass)"
+        ), {"table": table}).scalars().all()
+        for partition in partitions:
+            index = f"{partition}_{suffix}"
+            _index(index, partition, columns)(connection)
+            connection.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {index}"))
+    return step
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        "0001_meter_reading_ingested_at",
+        "Index meter_reading.ingested_at for the rolling baseline catch-up",
+        [_partitioned_index("ix_meter_reading_ingested_at", "meter_reading", "ingested_at", "ingested_at_idx")]
+    ),
+    Migration(
+        "0002_wallet_sessions_contributed_integer",
+        "Make waste_wallet.sessions_contributed an integer counter",
+        [_sql("""
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'waste_wallet' AND column_name = 'sessions_contributed') <> 'integer' THEN
+                    ALTER TABLE waste_wallet ALTER COLUMN sessions_contributed TYPE INTEGER
+                        USING COALESCE(NULLIF(btrim(sessions_contributed), '')::INTEGER, 0);
+                END IF;
+            END $$
+        """)]
+    ),
+    Migration(
+        "0003_saving_session_event_id",
+        "Link saving sessions to their saving event",
+        [
+            _sql(
+                "ALTER TABLE saving_session ADD COLUMN IF NOT EXISTS event_id UUID",
+                # NOT VALID skips the scan under the lock; VALIDATE only takes a SHARE UPDATE EXCLUSIVE lock
+                """
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'saving_session_event_id_fkey') THEN
+                        ALTER TABLE saving_session ADD CONSTRAINT saving_session_event_id_fkey
+                            FOREIGN KEY (event_id) REFERENCES saving_event (event_id) NOT VALID;
+                    END IF;
+                END $$
+                """,
+                "ALTER TABLE saving_session VALIDATE CONSTRAINT saving_session_event_id_fkey",
+            ),
+            _index("ix_saving_session_event_id", "saving_session", "event_id"),
+        ]
+    ),
+    Migration(
+        "0004_user_streaks",
+        "Add stored streak state to users and backfill it from completed sessions",
+        [
+            _sql(
+                'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS last_participation_date DATE',
+                'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS current_streak_days INTEGER',
+                'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS longest_streak_days INTEGER',
+            ),
+            _in_transaction(StreakService.backfill),
+        ]
+    ),
+    Migration(
+        "0005_wallet_balance_non_negative",
+        "Forbid negative wallet balances",
+        [_sql(
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ck_waste_wallet_balance_non_negative') THEN
+                    ALTER TABLE waste_wallet ADD CONSTRAINT ck_waste_wallet_balance_non_negative
+                        CHECK (current_balance >= 0) NOT VALID;
+                END IF;
+            END $$
+            """,
+            # Fails, naming the constraint, if a wallet is already overdrawn
+            "ALTER TABLE waste_wallet VALIDATE CONSTRAINT ck_waste_wallet_balance_non_negative",
+        )]
+    ),
+    Migration(
+        "0006_wallet_transaction_user_created",
+        "Index wallet_transaction by (user_id, created_at) and drop the user_id index it covers",
+        [
+            _index("ix_wallet_transaction_user_created", "wallet_transaction", "user_id, created_at"),
+            # Only after the replacement is valid, so user lookups always have an index
+            _sql("DROP INDEX CONCURRENTLY IF EXISTS ix_wallet_transaction_user_id"),
+        ]
+    ),
+    Migration(
+        "0007_wallet_monthly_rollup",
+        "Fill wallet_monthly_rollup from the ledger",
+        # init_db has created the table; ledger writes keep it current from here on
+        [_in_transaction(WalletRollupService.rebuild)]
+    ),
+]
+
+
+def _applied(connection: Connection) -> List[str]:
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migration ("
+        "name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+    return connection.execute(text("SELECT name FROM schema_migration")).scalars().all()
+
+
+def main():
+    """Apply pending migrations"""
+    init_db()
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        applied = set(_applied(connection))
+        pending = [migration for migration in MIGRATIONS if migration.name not in applied]
+
+        if "--list" in sys.argv[1:]:
+            for migration in MIGRATIONS:
+                state = "pending" if migration in pending else "applied"
+                print(f"   • {migration.name} [{state}] {migration.description}")
+            return
+
+        print(f"🛠  Applying {len(pending)} of {len(MIGRATIONS)} migrations...")
+        for migration in pending:
+            started = time.perf_counter()
+            try:
+                for step in migration.steps:
+                    step(connection)
+            except Exception as e:
+                print(f"\n❌ Error in {migration.name}: {e}")
+                sys.exit(1)
+            connection.execute(
+                text("INSERT INTO schema_migration (name) VALUES (:name)"), {"name": migration.name}
+            )
+            print(f"   • {migration.name}: {migration.description} ({time.perf_counter() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,21 @@ Database models for PowerSave
 from .user import User
 from .municipality import Municipality
 from .saving_session import SavingSession
-from .wallet import WalletTransaction, WasteWallet
+from .saving_event import SavingEvent, SavingEventParticipant
+from .wallet import WalletTransaction, WasteWallet, WalletMonthlyRollup
 from .gamification import PlantCatalog, UserPlantedItem, Challenge, UserChallengeProgress, Badge, UserBadge
 from .social_fund import SocialEnergyFund
+from .meter_reading import MeterReading
 
 __all__ = [
     "User",
     "Municipality",
     "SavingSession",
+    "SavingEvent",
+    "SavingEventParticipant",
     "WalletTransaction",
     "WasteWallet",
+    "WalletMonthlyRollup",
     "PlantCatalog",
     "UserPlantedItem",
     "Challenge",
@@ -21,4 +26,5 @@ __all__ = [
     "Badge",
     "UserBadge",
     "SocialEnergyFund",
+    "MeterReading",
 ]
@@ -0,0 +1,34 @@
+"""
+Meter Reading model
+"""
+from sqlalchemy import Column, Index, String, DECIMAL, TIMESTAMP
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class MeterReading(Base):
+    """
+    Smart meter interval reading (AHK/EAC)
+
+    Range-partitioned by month on reading_at. Partitions are created on
+    demand by the ingestion service before each load.
+    """
+    __tablename__ = "meter_reading"
+    __table_args__ = (
+        # Rolling baselines catch up on readings ingested by other processes
+        Index("ix_meter_reading_ingested_at", "ingested_at"),
+        {"postgresql_partition_by": "RANGE (reading_at)"},
+    )
+
+    # Composite Primary Key (must include the partition key)
+    meter_id = Column(String(20), primary_key=True)  # AHK account number
+    reading_at = Column(TIMESTAMP, primary_key=True)  # Interval start (UTC)
+
+    consumption_kwh = Column(DECIMAL(10, 4), nullable=False)
+
+    # Metadata
+    ingested_at = Column(TIMESTAMP, server_default=func.now())
+
+    def __repr__(self):
+        return f"<MeterReading {self.meter_id} @ {self.reading_at}: {self.consumption_kwh} kWh>"
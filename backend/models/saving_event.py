@@ -0,0 +1,73 @@
+"""
+Saving Event models (grid-wide peak events and their participants)
+"""
+from sqlalchemy import Column, String, Integer, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import uuid
+
+from ..database import Base
+
+
+class SavingEvent(Base):
+    """
+    One shared saving window for many households
+
+    Timing and the double-points flag live here once; participants are
+    rows of saving_event_participant. When the event opens, every
+    participant gets its saving_session in one statement.
+    """
+    __tablename__ = "saving_event"
+
+    # Primary Key
+    event_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Status: SCHEDULED, IN_PROGRESS, COMPLETED, CANCELLED
+    status = Column(String(20), nullable=False, default="SCHEDULED", index=True)
+
+    # Shared Timing
+    scheduled_start = Column(TIMESTAMP, nullable=False, index=True)
+    scheduled_end = Column(TIMESTAMP, nullable=False)
+    started_at = Column(TIMESTAMP, nullable=True)
+    completed_at = Column(TIMESTAMP, nullable=True)
+
+    # Shared Gamification
+    is_double_points_day = Column(String(1), default="N")  # Y/N
+
+    # Optional scope (national events have none)
+    municipality_id = Column(UUID(as_uuid=True), ForeignKey("municipality.municipality_id"), nullable=True)
+
+    # Totals (filled when the event completes)
+    participant_count = Column(Integer, default=0)
+    total_saved_kwh = Column(DECIMAL(12, 4), default=0)
+    total_saved_eur = Column(DECIMAL(12, 2), default=0)
+    total_saved_co2_kg = Column(DECIMAL(12, 4), default=0)
+
+    # Metadata
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    participants = relationship("SavingEventParticipant", back_populates="event")
+
+    def __repr__(self):
+        return f"<SavingEvent {self.event_id} - {self.status} - {self.participant_count} participants>"
+
+
+class SavingEventParticipant(Base):
+    """
+    Membership of a user in a saving event
+    """
+    __tablename__ = "saving_event_participant"
+
+    event_id = Column(UUID(as_uuid=True), ForeignKey("saving_event.event_id"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.user_id"), primary_key=True, index=True)
+
+    # Where this participant's savings go
+    allocation_type = Column(String(20), default="WASTE_WALLET")
+
+    joined_at = Column(TIMESTAMP, server_default=func.now())
+
+    # Relationships
+    event = relationship("SavingEvent", back_populates="participants")
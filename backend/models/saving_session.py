@@ -17,6 +17,9 @@ class SavingSession(Base):
     session_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.user_id"), nullable=False, index=True)
 
+    # Saving event this session belongs to (None for individual sessions)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("saving_event.event_id"), nullable=True, index=True)
+
     # Status: SCHEDULED, IN_PROGRESS, COMPLETED, FAILED, CANCELLED
     status = Column(String(20), nullable=False, default="SCHEDULED", index=True)
 
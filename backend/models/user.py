@@ -1,7 +1,7 @@
 """
 User model
 """
-from sqlalchemy import Column, String, Integer, Boolean, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, DECIMAL, TIMESTAMP, Date, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -36,6 +36,11 @@ class User(Base):
     total_eur_saved = Column(DECIMAL(10, 2), default=0)
     total_co2_saved = Column(DECIMAL(10, 2), default=0)
 
+    # Streaks (consecutive days with a completed session)
+    last_participation_date = Column(Date, nullable=True)
+    current_streak_days = Column(Integer, default=0)  # Run ending at last_participation_date
+    longest_streak_days = Column(Integer, default=0)
+
     # Waste Wallet
     waste_wallet_balance = Column(DECIMAL(10, 2), default=0)
     annual_waste_fee = Column(DECIMAL(10, 2), nullable=True)
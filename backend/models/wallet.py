@@ -1,7 +1,7 @@
 """
 Wallet models for Waste Fee Offset
 """
-from sqlalchemy import Column, String, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, String, Integer, DECIMAL, TIMESTAMP, ForeignKey, CheckConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -15,6 +15,10 @@ class WasteWallet(Base):
     Waste Wallet - tracks accumulated savings for waste fee payment
     """
     __tablename__ = "waste_wallet"
+    __table_args__ = (
+        # Last line of defence: debits are conditional UPDATEs, never overdraw
+        CheckConstraint("current_balance >= 0", name="ck_waste_wallet_balance_non_negative"),
+    )
 
     wallet_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.user_id"), nullable=False, unique=True)
@@ -25,7 +29,7 @@ class WasteWallet(Base):
     total_spent = Column(DECIMAL(10, 2), default=0)
 
     # Stats
-    sessions_contributed = Column(String(50), default=0)
+    sessions_contributed = Column(Integer, default=0)
     last_payment_date = Column(TIMESTAMP, nullable=True)
     last_payment_amount = Column(DECIMAL(10, 2), default=0)
 
@@ -42,9 +46,13 @@ class WalletTransaction(Base):
     Transaction history for Waste Wallet
     """
     __tablename__ = "wallet_transaction"
+    __table_args__ = (
+        # History and monthly summaries: one user's rows in a time range
+        Index("ix_wallet_transaction_user_created", "user_id", "created_at"),
+    )
 
     transaction_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("user.user_id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.user_id"), nullable=False)
 
     # Transaction Type: CREDIT, DEBIT, DONATION, PAYMENT_TO_MUNICIPALITY
     type = Column(String(30), nullable=False)
@@ -69,3 +77,25 @@ class WalletTransaction(Base):
 
     def __repr__(self):
         return f"<WalletTransaction {self.type} - €{self.amount}>"
+
+
+class WalletMonthlyRollup(Base):
+    """
+    Monthly wallet totals per user and transaction type
+
+    Maintained by every ledger write; rebuilt with
+    ``python -m backend.rebuild_wallet_rollup``.
+    """
+    __tablename__ = "wallet_monthly_rollup"
+    __table_args__ = (
+        # Municipality-wide totals: every user's rows for one month
+        Index("ix_wallet_monthly_rollup_month", "year", "month"),
+    )
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.user_id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    type = Column(String(30), primary_key=True)
+
+    total_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,39 @@
+"""
+Wallet Rollup Rebuild Script
+
+Recomputes wallet_monthly_rollup (monthly totals per user and transaction
+type) from wallet_transaction in one set-based statement. Run once after
+deploying the rollup table, or to repair it; ledger writes keep it current
+afterwards.
+
+Usage:
+    python -m backend.rebuild_wallet_rollup
+"""
+import sys
+import time
+
+from backend.database import SessionLocal, init_db
+from backend.services.wallet_rollup import WalletRollupService
+
+
+def main():
+    """Rebuild the monthly wallet rollup"""
+    init_db()
+    db = SessionLocal()
+    try:
+        print("📊 Rebuilding monthly wallet rollup...")
+        started = time.perf_counter()
+        written = WalletRollupService.rebuild(db)
+        db.commit()
+        print(f"   • Rollup rows: {written}")
+        print(f"   • Elapsed:     {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"\n❌ Error during rebuild: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 """
 API Routers
 """
-from . import waste_wallet, sessions, auth
+from . import waste_wallet, sessions, auth, meter_readings, events
 
-__all__ = ["waste_wallet", "sessions", "auth"]
+__all__ = ["waste_wallet", "sessions", "auth", "meter_readings", "events"]
@@ -0,0 +1,140 @@
+"""
+Saving Events API Router
+
+Endpoints for grid-wide saving events: one event row, a compact
+participant table, and bulk start/settlement for the whole cohort.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import asyncio
+import uuid
+
+from ..database import get_db
+from ..schemas.event import (
+    SavingEventCreateRequest,
+    SavingEventResponse,
+    EventParticipantsRequest,
+    EventParticipantsResponse
+)
+from ..schemas.session import SessionBatchStartResponse, SessionBatchFailure
+from ..models.saving_event import SavingEvent
+from ..services.events import SavingEventService
+from ..services.session_lifecycle import SessionLifecycleService
+from ..services.batch_executor import get_batch_executor
+from ..services.meter_data import MeterDataService
+
+router = APIRouter()
+
+
+def _get_event(db: Session, event_id: uuid.UUID) -> SavingEvent:
+    event = db.query(SavingEvent).filter(SavingEvent.event_id == event_id).first()
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+    return event
+
+
+@router.post("", response_model=SavingEventResponse, status_code=status.HTTP_201_CREATED)
+async def create_event(
+    request: SavingEventCreateRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Schedule a saving event
+
+    Participants are added separately; their sessions are created when
+    the event opens.
+    """
+    event = SavingEventService.create_event(
+        db,
+        scheduled_start=request.scheduled_start,
+        duration_hours=request.duration_hours,
+        is_double_points_day=request.is_double_points_day,
+        municipality_id=request.municipality_id
+    )
+    db.commit()
+    db.refresh(event)
+
+    return event
+
+
+@router.get("/{event_id}", response_model=SavingEventResponse)
+async def get_event(
+    event_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Get event details and totals
+    """
+    return _get_event(db, event_id)
+
+
+@router.post("/{event_id}/participants", response_model=EventParticipantsResponse)
+async def add_participants(
+    event_id: uuid.UUID,
+    request: EventParticipantsRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Join many users to a scheduled event
+
+    One INSERT ... SELECT for the whole list; unknown users and users
+    already in the event are skipped.
+    """
+    joined = SavingEventService.add_participants(
+        db, event_id, request.user_ids, request.allocation_type
+    )
+    if joined is None:
+        db.rollback()
+        event = _get_event(db, event_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot join event with status {event.status}"
+        )
+    db.commit()
+
+    event = _get_event(db, event_id)
+    return EventParticipantsResponse(joined=joined, participant_count=event.participant_count)
+
+
+@router.post("/{event_id}/start", response_model=SessionBatchStartResponse)
+async def start_event(
+    event_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Open an event now and start its participants' sessions
+
+    The scheduler does the same at scheduled_start; this endpoint lets an
+    operator open an event early.
+    """
+    opened = SavingEventService.open_events(db, event_id=event_id)
+    if not opened:
+        db.rollback()
+        event = _get_event(db, event_id)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot start event with status {event.status}"
+        )
+    db.commit()
+
+    sessions = SavingEventService.event_sessions(db, event_id, "SCHEDULED")
+    started, failed = await run_in_threadpool(
+        SessionLifecycleService.start_batch,
+        db=db,
+        sessions=sessions,
+        history_loader=MeterDataService.cohort_loader(asyncio.get_running_loop()),
+        executor=get_batch_executor()
+    )
+    db.commit()
+
+    return SessionBatchStartResponse(
+        started=started,
+        failed=[
+            SessionBatchFailure(session_id=session_id, reason=reason)
+            for session_id, reason in failed.items()
+        ]
+    )
@@ -0,0 +1,77 @@
+"""
+Meter Readings API Router
+
+Endpoints for bulk ingestion of smart-meter interval data.
+"""
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import io
+
+from ..database import get_db
+from ..schemas.meter_reading import MeterReadingBatchRequest, IngestionReportResponse
+from ..services.history_cache import get_history_cache
+from ..services.ingestion import MeterIngestionService
+from ..services.live_tracker import get_live_tracker
+from ..services.meter_store import get_meter_store
+from ..services.rolling_baseline import get_rolling_baseline_store
+
+router = APIRouter()
+
+
+def _ingestion_service(db: Session) -> MeterIngestionService:
+    return MeterIngestionService(
+        db,
+        meter_store=get_meter_store(),
+        rolling_store=get_rolling_baseline_store(),
+        live_tracker=get_live_tracker()
+    )
+
+
+@router.post("/upload", response_model=IngestionReportResponse)
+async def upload_readings(
+    file: UploadFile = File(..., description="CSV with meter_id, timestamp, consumption_kwh columns"),
+    db: Session = Depends(get_db)
+):
+    """
+    Ingest a CSV export of interval readings
+
+    The file is streamed in batches; invalid rows are rejected and
+    reported, duplicates of (meter_id, timestamp) keep the last value.
+    """
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await run_in_threadpool(_ingestion_service(db).ingest_csv, lines)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    finally:
+        lines.detach()
+
+
+@router.post("/batch", response_model=IngestionReportResponse)
+async def ingest_readings(
+    request: MeterReadingBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Ingest a batch of interval readings pushed as JSON
+    """
+    rows = [
+        (reading.meter_id, reading.timestamp, reading.consumption_kwh)
+        for reading in request.readings
+    ]
+    return await run_in_threadpool(_ingestion_service(db).ingest_rows, rows)
+
+
+@router.get("/history-cache/stats")
+async def get_history_cache_stats():
+    """
+    AHK history cache hit/miss counters
+
+    Hits and misses are counted per (meter, day); upstream_calls counts
+    requests actually sent to the AHK API.
+    """
+    return get_history_cache().stats()
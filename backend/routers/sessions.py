@@ -3,25 +3,39 @@ Saving Sessions API Router
 
 Endpoints for managing energy saving sessions.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
+import asyncio
 import uuid
 
 from ..database import get_db
 from ..schemas.session import (
     SessionCreateRequest,
+    SessionBatchStartRequest,
+    SessionBatchStartResponse,
+    SessionBatchFailure,
+    SessionBatchCompleteRequest,
+    SessionBatchCompleteResponse,
     SessionResponse,
     SessionResultsResponse,
+    SessionLiveResponse,
     SessionStatsResponse
 )
 from ..models.saving_session import SavingSession
 from ..models.user import User
 from ..services.baseline import BaselineService
-from ..services.savings import SavingsCalculationService
-from ..services.wallet import WasteWalletService
+from ..services.session_lifecycle import SessionLifecycleService, SESSION_NOT_FOUND
+from ..services.baseline_cache import get_baseline_cache
+from ..services.batch_executor import get_batch_executor
+from ..services.meter_data import MeterDataService
+from ..services.live_tracker import get_live_tracker
+from ..services.rolling_baseline import get_rolling_baseline_store
+from ..services.user_stats import get_user_stats_service
 from ..config import get_settings
 
 settings = get_settings()
@@ -60,12 +74,32 @@ async def create_session(
     )
 
     db.add(session)
+    # total_sessions changed
+    get_user_stats_service().invalidate([user_id], db=db)
     db.commit()
     db.refresh(session)
 
     return session
 
 
+@router.get("/baseline-cache/stats")
+async def get_baseline_cache_stats():
+    """
+    Baseline cache hit/miss counters
+
+    Shows whether session starts are served from precomputed baselines.
+    """
+    return get_baseline_cache().stats()
+
+
+@router.get("/user-stats-cache/stats")
+async def get_user_stats_cache_stats():
+    """
+    User stats cache hit/miss counters
+    """
+    return get_user_stats_service().stats()
+
+
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(
     session_id: uuid.UUID,
@@ -138,32 +172,44 @@ async def start_session(
 
     if session.status != "SCHEDULED":
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_409_CONFLICT,
             detail=f"Cannot start session with status {session.status}"
         )
 
-    # Calculate baseline (In production, fetch from AHK API)
-    # For now, using placeholder data
-    historical_data = _get_mock_historical_data(session.user_id)
     duration_hours = int((session.scheduled_end - session.scheduled_start).seconds / 3600)
 
-    baseline = BaselineService.calculate_10_day_average(
-        historical_data=historical_data,
+    # Nightly cache / rolling state turn this into a lookup at peak time;
+    # the state follows ingestion through NOTIFY, so only wait for its first build
+    rolling_store = get_rolling_baseline_store()
+    if not rolling_store.built:
+        await asyncio.to_thread(rolling_store.ensure_built, db)
+    baseline = SessionLifecycleService.precomputed_baseline(
+        user_id=session.user_id,
         session_start=session.scheduled_start,
         session_duration_hours=duration_hours
     )
 
+    if baseline is None:
+        historical_data, = await MeterDataService.get_histories(db, [session])
+        baseline = BaselineService.calculate_10_day_average(
+            historical_data=historical_data,
+            session_start=session.scheduled_start,
+            session_duration_hours=duration_hours
+        )
+
     if not baseline or not BaselineService.validate_baseline(baseline):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to calculate valid baseline"
         )
 
-    # Update session
-    session.status = "IN_PROGRESS"
-    session.actual_start = datetime.utcnow()
-    session.baseline_kwh = baseline
-    session.baseline_calculation_method = "10_DAY_AVERAGE"
+    # Conditional UPDATE: of concurrent retries exactly one moves the session
+    if not SessionLifecycleService.mark_started(db, session_id, baseline):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Session was already started by another request"
+        )
 
     db.commit()
     db.refresh(session)
@@ -171,72 +217,156 @@ async def start_session(
     return session
 
 
-@router.post("/{session_id}/complete", response_model=SessionResultsResponse)
-async def complete_session(
-    session_id: uuid.UUID,
-    actual_consumption_kwh: Decimal,
-    db: Session = Depends(get_db)
-):
-    """
-    Complete a session and calculate results
-
-    Calculates savings, credits wallet, awards points.
-    """
-    session = db.query(SavingSession).filter(
+def _live_session(db: Session, session_id: uuid.UUID) -> Tuple[uuid.UUID, str, datetime, datetime, Decimal]:
+    """Running session with its user's meter, for the live endpoints"""
+    row = db.query(SavingSession, User.ahk_account_number).join(
+        User, User.user_id == SavingSession.user_id
+    ).filter(
         SavingSession.session_id == session_id
     ).first()
 
-    if not session:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found"
         )
 
-    if session.status != "IN_PROGRESS":
+    session, meter_id = row
+    if session.status != "IN_PROGRESS" or session.baseline_kwh is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot track session with status {session.status}"
+        )
+    if not meter_id:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot complete session with status {session.status}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User has no smart meter"
         )
 
-    # Calculate savings
-    is_double_points = session.is_double_points_day == "Y"
-    savings = SavingsCalculationService.calculate_savings(
-        baseline_kwh=session.baseline_kwh,
-        actual_kwh=actual_consumption_kwh,
-        is_double_points_day=is_double_points
+    return (session.session_id, meter_id, session.scheduled_start, session.scheduled_end, session.baseline_kwh)
+
+
+@router.get("/{session_id}/live", response_model=SessionLiveResponse)
+async def get_live_savings(
+    session_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Savings so far in a running session
+
+    Consumption is compared with the baseline pro-rated to the time the
+    readings cover. Prefer /live/stream over polling this endpoint.
+    """
+    return await run_in_threadpool(get_live_tracker().current, *_live_session(db, session_id))
+
+
+@router.get("/{session_id}/live/stream")
+async def stream_live_savings(
+    session_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent events with the savings so far in a running session
+
+    One "progress" event is sent immediately and then on every ingested
+    reading for the session; the stream ends once readings cover the whole
+    session. Updates come from the in-memory tracker, which every worker
+    keeps current from the readings ingested by any worker.
+    """
+    tracker = get_live_tracker()
+    live_session = _live_session(db, session_id)
+    # The stream does not use the request's session; give the connection back now
+    db.close()
+
+    async def events():
+        async for snapshot in tracker.watch(*live_session, keepalive=settings.LIVE_KEEPALIVE_SECONDS):
+            if snapshot is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: progress\ndata: {SessionLiveResponse(**snapshot).model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-    # Update session
-    session.status = "COMPLETED"
-    session.actual_end = datetime.utcnow()
-    session.actual_kwh = actual_consumption_kwh
-    session.saved_kwh = savings["saved_kwh"]
-    session.saved_eur = savings["saved_eur"]
-    session.saved_co2_kg = savings["saved_co2_kg"]
-    session.green_points_earned = savings["green_points_earned"]
-    session.completed_at = datetime.utcnow()
-
-    # Credit waste wallet
-    wallet_credit = Decimal("0")
-    if session.allocation_type == "WASTE_WALLET" and savings["saved_eur"] > 0:
-        wallet_credit = savings["saved_eur"]
-        WasteWalletService.credit_wallet(
-            db=db,
-            user_id=session.user_id,
-            amount=wallet_credit,
-            session_id=session_id,
-            description=f"Savings from session {session_id}"
-        )
 
-    # Update user stats
-    user = db.query(User).filter(User.user_id == session.user_id).first()
-    user.green_points_balance += savings["green_points_earned"]
-    user.total_kwh_saved += savings["saved_kwh"]
-    user.total_eur_saved += savings["saved_eur"]
-    user.total_co2_saved += savings["saved_co2_kg"]
+@router.post("/start-batch", response_model=SessionBatchStartResponse)
+async def start_sessions_batch(
+    request: SessionBatchStartRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Start many scheduled sessions at once
 
+    Used for grid-wide peak events: baselines for the whole cohort are
+    calculated in one vectorized pass and written back with a single UPDATE.
+    """
+    session_ids = list(dict.fromkeys(request.session_ids))
+    sessions = db.query(SavingSession).filter(
+        SavingSession.session_id.in_(session_ids)
+    ).all()
+
+    found_ids = {session.session_id for session in sessions}
+
+    # Baseline math is CPU-bound: keep it off the event loop and let the
+    # batch executor fan large cohorts out over worker processes
+    started, failed = await run_in_threadpool(
+        SessionLifecycleService.start_batch,
+        db=db,
+        sessions=sessions,
+        history_loader=MeterDataService.cohort_loader(asyncio.get_running_loop()),
+        executor=get_batch_executor()
+    )
     db.commit()
-    db.refresh(session)
+
+    for session_id in session_ids:
+        if session_id not in found_ids:
+            failed[session_id] = "Session not found"
+
+    return SessionBatchStartResponse(
+        started=started,
+        failed=[
+            SessionBatchFailure(session_id=session_id, reason=reason)
+            for session_id, reason in failed.items()
+        ]
+    )
+
+
+@router.post("/{session_id}/complete", response_model=SessionResultsResponse)
+async def complete_session(
+    session_id: uuid.UUID,
+    actual_consumption_kwh: Decimal = Query(..., ge=0, max_digits=10, decimal_places=4),
+    db: Session = Depends(get_db)
+):
+    """
+    Complete a session and calculate results
+
+    Calculates savings, credits wallet, awards points. The session is
+    claimed with a conditional UPDATE, so a retried request gets 409
+    instead of settling the session twice.
+    """
+    completed, failed = SessionLifecycleService.complete_batch(
+        db, [(session_id, actual_consumption_kwh)]
+    )
+
+    if session_id in failed:
+        db.rollback()
+        raise HTTPException(
+            status_code=(
+                status.HTTP_404_NOT_FOUND
+                if failed[session_id] == SESSION_NOT_FOUND
+                else status.HTTP_409_CONFLICT
+            ),
+            detail=failed[session_id]
+        )
+
+    get_user_stats_service().invalidate([completed[session_id]["user_id"]], db=db)
+    db.commit()
+
+    savings = completed[session_id]["savings"]
+    wallet_credit = completed[session_id]["wallet_credit"]
 
     # Generate congratulatory message
     if savings["saved_kwh"] > 0:
@@ -257,6 +387,38 @@ async def complete_session(
     )
 
 
+@router.post("/complete-batch", response_model=SessionBatchCompleteResponse)
+async def complete_sessions_batch(
+    request: SessionBatchCompleteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Complete many sessions at once
+
+    Used at the end of grid-wide peak events: the whole cohort is settled
+    in one vectorized pass and written with a fixed number of set-based
+    statements in a single transaction.
+    """
+    completed, failed = await run_in_threadpool(
+        SessionLifecycleService.complete_batch,
+        db=db,
+        completions=[
+            (completion.session_id, completion.actual_consumption_kwh)
+            for completion in request.completions
+        ]
+    )
+    get_user_stats_service().invalidate((result["user_id"] for result in completed.values()), db=db)
+    db.commit()
+
+    return SessionBatchCompleteResponse(
+        completed=list(completed),
+        failed=[
+            SessionBatchFailure(session_id=session_id, reason=reason)
+            for session_id, reason in failed.items()
+        ]
+    )
+
+
 @router.get("/user/{user_id}/stats", response_model=SessionStatsResponse)
 async def get_user_stats(
     user_id: uuid.UUID,
@@ -264,67 +426,15 @@ async def get_user_stats(
 ):
     """
     Get overall session statistics for user
+
+    Totals, session counts and the current streak come from one query
+    and are cached until one of the user's sessions completes.
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
+    stats = get_user_stats_service().get(db, user_id)
+    if stats is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    # Count sessions
-    total_sessions = db.query(SavingSession).filter(
-        SavingSession.user_id == user_id
-    ).count()
-
-    completed_sessions = db.query(SavingSession).filter(
-        SavingSession.user_id == user_id,
-        SavingSession.status == "COMPLETED"
-    ).count()
-
-    # Calculate average
-    avg_savings = Decimal("0")
-    if completed_sessions > 0:
-        avg_savings = user.total_kwh_saved / Decimal(str(completed_sessions))
-
-    # TODO: Calculate current streak
-    current_streak = 0
-
-    return SessionStatsResponse(
-        total_sessions=total_sessions,
-        completed_sessions=completed_sessions,
-        total_kwh_saved=user.total_kwh_saved,
-        total_eur_saved=user.total_eur_saved,
-        total_co2_saved=user.total_co2_saved,
-        total_green_points=user.green_points_balance,
-        average_savings_per_session=avg_savings,
-        current_streak_days=current_streak
-    )
-
-
-def _get_mock_historical_data(user_id: uuid.UUID) -> List[dict]:
-    """
-    Mock historical consumption data
-    In production, this would fetch from AHK API
-    """
-    from datetime import datetime, timedelta
-    import random
-
-    data = []
-    base_date = datetime.utcnow() - timedelta(days=10)
-
-    for day in range(10):
-        for hour in range(24):
-            timestamp = base_date + timedelta(days=day, hours=hour)
-            # Mock consumption: higher during peak hours (17-20)
-            if 17 <= hour <= 20:
-                consumption = random.uniform(0.6, 1.0)  # Peak hours
-            else:
-                consumption = random.uniform(0.2, 0.5)  # Off-peak
-
-            data.append({
-                "timestamp": timestamp,
-                "consumption_kwh": consumption
-            })
-
-    return data
+    return SessionStatsResponse(**stats)
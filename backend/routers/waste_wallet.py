@@ -16,15 +16,29 @@ from ..schemas.wallet import (
     DebitWalletRequest,
     DonationRequest,
     WalletCoverageResponse,
-    MonthlySummaryResponse
+    MonthlySummaryResponse,
+    MunicipalityMonthlySummaryResponse
 )
 from ..services.wallet import WasteWalletService
+from ..services.wallet_coalescer import get_wallet_coalescer
 from ..services.savings import SavingsCalculationService
 from ..models.user import User
+from ..config import get_settings
 
+settings = get_settings()
 router = APIRouter()
 
 
+@router.get("/coalescer/stats")
+async def get_wallet_coalescer_stats():
+    """
+    Wallet write coalescer metrics
+
+    Batch count, batch size histogram and average flush latency.
+    """
+    return get_wallet_coalescer().stats()
+
+
 @router.get("/{user_id}/balance", response_model=WalletBalanceResponse)
 async def get_wallet_balance(
     user_id: uuid.UUID,
@@ -67,9 +81,18 @@ async def credit_wallet(
     Credit wallet with savings from session
 
     This endpoint is typically called automatically after a successful
-    saving session completes.
+    saving session completes. Concurrent credits are group-committed by
+    the wallet write coalescer when it is enabled.
     """
     try:
+        if settings.WALLET_COALESCE_ENABLED:
+            return await get_wallet_coalescer().credit(
+                user_id=user_id,
+                amount=request.amount,
+                session_id=request.session_id,
+                description=request.description
+            )
+
         transaction = WasteWalletService.credit_wallet(
             db=db,
             user_id=user_id,
@@ -197,3 +220,29 @@ async def get_monthly_summary(
 
     summary = WasteWalletService.get_monthly_summary(db, user_id, year, month)
     return summary
+
+
+@router.get(
+    "/municipality/{municipality_id}/summary/{year}/{month}",
+    response_model=MunicipalityMonthlySummaryResponse
+)
+async def get_municipality_monthly_summary(
+    municipality_id: uuid.UUID,
+    year: int,
+    month: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get monthly wallet activity of all users in a municipality
+
+    Returns credits, debits, donations, and net change summed over the
+    municipality's users for specified month.
+    """
+    if month < 1 or month > 12:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Month must be between 1 and 12"
+        )
+
+    summary = WasteWalletService.get_municipality_monthly_summary(db, municipality_id, year, month)
+    return summary
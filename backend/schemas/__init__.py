@@ -4,6 +4,8 @@ Pydantic schemas for request/response validation
 from .wallet import WalletBalanceResponse, WalletTransactionResponse, CreditWalletRequest
 from .session import SessionCreateRequest, SessionResponse, SessionResultsResponse
 from .user import UserCreateRequest, UserResponse
+from .meter_reading import MeterReadingBatchRequest, IngestionReportResponse
+from .event import SavingEventCreateRequest, SavingEventResponse, EventParticipantsRequest
 
 __all__ = [
     "WalletBalanceResponse",
@@ -14,4 +16,9 @@ __all__ = [
     "SessionResultsResponse",
     "UserCreateRequest",
     "UserResponse",
+    "MeterReadingBatchRequest",
+    "IngestionReportResponse",
+    "SavingEventCreateRequest",
+    "SavingEventResponse",
+    "EventParticipantsRequest",
 ]
@@ -0,0 +1,51 @@
+"""
+Pydantic schemas for Saving Events
+"""
+from pydantic import BaseModel, Field
+from decimal import Decimal
+from datetime import datetime
+from typing import List, Optional
+import uuid
+
+
+class SavingEventCreateRequest(BaseModel):
+    """Request to schedule a grid-wide saving event"""
+    scheduled_start: datetime = Field(..., description="When the event starts")
+    duration_hours: int = Field(default=3, ge=1, le=6, description="Event duration in hours")
+    is_double_points_day: bool = Field(default=False, description="Apply the double points multiplier")
+    municipality_id: Optional[uuid.UUID] = Field(default=None, description="Limit to one municipality")
+
+
+class EventParticipantsRequest(BaseModel):
+    """Request to join many users to an event"""
+    user_ids: List[uuid.UUID] = Field(..., min_length=1, description="Users to add")
+    allocation_type: str = Field(
+        default="WASTE_WALLET",
+        description="Where to allocate savings: WASTE_WALLET, SOLIDARITY_FUND, GREEN_COINS, MIXED"
+    )
+
+
+class EventParticipantsResponse(BaseModel):
+    """Outcome of a bulk join"""
+    joined: int = Field(..., description="Users newly added to the event")
+    participant_count: int
+
+
+class SavingEventResponse(BaseModel):
+    """Response for a saving event"""
+    event_id: uuid.UUID
+    status: str
+    scheduled_start: datetime
+    scheduled_end: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    is_double_points_day: str = "N"
+    municipality_id: Optional[uuid.UUID] = None
+    participant_count: int = 0
+    total_saved_kwh: Optional[Decimal] = None
+    total_saved_eur: Optional[Decimal] = None
+    total_saved_co2_kg: Optional[Decimal] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
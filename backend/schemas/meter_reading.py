@@ -0,0 +1,37 @@
+"""
+Pydantic schemas for Meter Reading ingestion
+"""
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+
+class MeterReadingIn(BaseModel):
+    """A single interval reading"""
+    meter_id: str = Field(..., max_length=20, description="AHK account number")
+    timestamp: datetime = Field(..., description="Interval start (UTC)")
+    consumption_kwh: float = Field(..., description="Consumption in the interval")
+
+
+class MeterReadingBatchRequest(BaseModel):
+    """Batch of interval readings pushed by a meter data source"""
+    readings: List[MeterReadingIn] = Field(..., min_length=1)
+
+
+class IngestionError(BaseModel):
+    """A rejected reading"""
+    line: Optional[int] = Field(None, description="Line (CSV) or position (batch) of the reading")
+    reason: str
+
+
+class IngestionReportResponse(BaseModel):
+    """Outcome of an ingestion run"""
+    rows_received: int
+    rows_rejected: int
+    duplicates_dropped: int
+    rows_written: int
+    meters: int
+    batches: int
+    elapsed_seconds: float
+    rows_per_second: float = Field(..., description="Written rows per second")
+    errors: List[IngestionError] = Field(default_factory=list, description="First rejected readings")
@@ -4,7 +4,7 @@ Pydantic schemas for Saving Sessions
 from pydantic import BaseModel, Field
 from decimal import Decimal
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import uuid
 
 
@@ -18,10 +18,48 @@ class SessionCreateRequest(BaseModel):
     )
 
 
+class SessionBatchStartRequest(BaseModel):
+    """Request to start many scheduled sessions at once"""
+    session_ids: List[uuid.UUID] = Field(..., min_length=1, description="Sessions to start")
+
+
+class SessionBatchFailure(BaseModel):
+    """A session that could not be processed in a batch"""
+    session_id: uuid.UUID
+    reason: str
+
+
+class SessionBatchStartResponse(BaseModel):
+    """Outcome of a bulk session start"""
+    started: List[uuid.UUID] = Field(..., description="Sessions moved to IN_PROGRESS")
+    failed: List[SessionBatchFailure] = Field(default_factory=list)
+
+
+class SessionCompletion(BaseModel):
+    """Measured consumption for one session"""
+    session_id: uuid.UUID
+    actual_consumption_kwh: Decimal = Field(
+        ..., ge=0, max_digits=10, decimal_places=4,
+        description="Consumption during the session (kWh, at most 4 decimals like the stored column)"
+    )
+
+
+class SessionBatchCompleteRequest(BaseModel):
+    """Request to complete many sessions at once"""
+    completions: List[SessionCompletion] = Field(..., min_length=1, description="Sessions to settle")
+
+
+class SessionBatchCompleteResponse(BaseModel):
+    """Outcome of a bulk session completion"""
+    completed: List[uuid.UUID] = Field(..., description="Sessions moved to COMPLETED")
+    failed: List[SessionBatchFailure] = Field(default_factory=list)
+
+
 class SessionResponse(BaseModel):
     """Response for a saving session"""
     session_id: uuid.UUID
     user_id: uuid.UUID
+    event_id: Optional[uuid.UUID] = None
     status: str
     scheduled_start: datetime
     scheduled_end: datetime
@@ -52,6 +90,18 @@ class SessionResultsResponse(BaseModel):
     message: str = Field(..., description="Congratulatory or feedback message")
 
 
+class SessionLiveResponse(BaseModel):
+    """Savings so far in a running session"""
+    session_id: uuid.UUID
+    consumed_kwh: Decimal = Field(..., description="Metered consumption so far")
+    baseline_kwh: Decimal = Field(..., description="Baseline for the whole session")
+    prorated_baseline_kwh: Decimal = Field(..., description="Baseline for the time covered by readings")
+    saved_kwh: Decimal = Field(..., description="Pro-rated baseline minus consumption")
+    savings_percentage: Decimal
+    covered_until: Optional[datetime] = Field(None, description="End of the latest interval with a reading")
+    complete: bool = Field(..., description="Readings cover the whole session")
+
+
 class SessionStatsResponse(BaseModel):
     """User's overall session statistics"""
     total_sessions: int
@@ -62,3 +112,4 @@ class SessionStatsResponse(BaseModel):
     total_green_points: int
     average_savings_per_session: Decimal
     current_streak_days: int = Field(..., description="Consecutive days with sessions")
+    longest_streak_days: int = Field(0, description="Longest run of consecutive days with sessions")
@@ -75,3 +75,8 @@ class MonthlySummaryResponse(BaseModel):
     total_donations: Decimal
     net_change: Decimal
     transaction_count: int
+
+
+class MunicipalityMonthlySummaryResponse(MonthlySummaryResponse):
+    """Monthly wallet activity of all users in a municipality"""
+    municipality_id: uuid.UUID
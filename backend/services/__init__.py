@@ -2,13 +2,47 @@
 Business logic services
 """
 from .baseline import BaselineService
+from .consumption import ConsumptionSeries
+from .rolling_baseline import RollingBaselineStore
+from .baseline_cache import BaselineCache
+from .meter_data import MeterDataService
+from .ahk_meter import AhkMeterService
+from .history_cache import MeterHistoryCache
+from .meter_store import MeterReadingStore
+from .ingestion import MeterIngestionService
+from .live_tracker import LiveSessionTracker
 from .savings import SavingsCalculationService
 from .municipality import MunicipalityIntegrationService
 from .wallet import WasteWalletService
+from .wallet_coalescer import WalletWriteCoalescer
+from .wallet_rollup import WalletRollupService
+from .session_lifecycle import SessionLifecycleService
+from .events import SavingEventService
+from .session_scheduler import SessionScheduler
+from .streaks import StreakService
+from .batch_executor import CohortBatchExecutor
+from .leader import LeaderLock
 
 __all__ = [
     "BaselineService",
+    "ConsumptionSeries",
+    "RollingBaselineStore",
+    "BaselineCache",
+    "MeterDataService",
+    "AhkMeterService",
+    "MeterHistoryCache",
+    "MeterReadingStore",
+    "MeterIngestionService",
+    "LiveSessionTracker",
     "SavingsCalculationService",
     "MunicipalityIntegrationService",
     "WasteWalletService",
+    "WalletWriteCoalescer",
+    "WalletRollupService",
+    "SessionLifecycleService",
+    "SavingEventService",
+    "SessionScheduler",
+    "StreakService",
+    "CohortBatchExecutor",
+    "LeaderLock",
 ]
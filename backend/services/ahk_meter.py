@@ -0,0 +1,176 @@
+"""
+AHK Meter Data Service
+
+Client for the AHK/EAC smart-meter API. Historical interval data is
+fetched over one long-lived connection pool so a session start costs a
+pooled round-trip instead of a fresh TLS handshake per user.
+"""
+import httpx
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+import asyncio
+import logging
+
+import numpy as np
+
+from ..config import get_settings
+from .consumption import ConsumptionSeries, parse_epoch_us
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class AhkMeterService:
+    """
+    Pooled async client for AHK meter history
+
+    All requests share one httpx.AsyncClient with keep-alive (and HTTP/2
+    when the h2 package is installed). Concurrent fetches are bounded by a
+    semaphore, and identical requests already in flight are coalesced so
+    each (meter, window) is fetched once.
+
+    Args:
+        base_url: AHK API base URL (defaults to AHK_API_BASE_URL)
+        api_key: AHK API key (defaults to AHK_API_KEY)
+        max_concurrency: Maximum requests in flight (defaults to AHK_MAX_CONCURRENCY)
+        timeout: Request timeout in seconds (defaults to AHK_TIMEOUT_SECONDS)
+        transport: Custom httpx transport, e.g. a fake AHK server in tests
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url or settings.AHK_API_BASE_URL
+        self.api_key = api_key or settings.AHK_API_KEY
+        self.max_concurrency = max_concurrency or settings.AHK_MAX_CONCURRENCY
+        self.timeout = timeout or settings.AHK_TIMEOUT_SECONDS
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight: Dict[Tuple[str, datetime, datetime], "asyncio.Future"] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            if settings.AHK_HTTP2 and not HTTP2_AVAILABLE:
+                logger.warning("h2 is not installed, AHK client falls back to HTTP/1.1")
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"X-API-Key": self.api_key},
+                http2=settings.AHK_HTTP2 and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                timeout=self.timeout,
+                transport=self._transport
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_history(
+        self,
+        meter_id: str,
+        start: datetime,
+        end: datetime
+    ) -> Optional[ConsumptionSeries]:
+        """
+        Interval readings for one meter in [start, end)
+
+        Args:
+            meter_id: AHK account number
+            start: Window start (naive UTC)
+            end: Window end (naive UTC)
+
+        Returns:
+            ConsumptionSeries, or None if the meter is unknown or the API failed
+        """
+        key = (meter_id, start, end)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_history(meter_id, start, end))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded so one cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    async def get_histories(
+        self,
+        meter_ids: Iterable[str],
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, Optional[ConsumptionSeries]]:
+        """
+        Interval readings for many meters, fetched concurrently
+
+        Args:
+            meter_ids: AHK account numbers (duplicates are fetched once)
+            start: Window start (naive UTC)
+            end: Window end (naive UTC)
+
+        Returns:
+            Dict of meter id to ConsumptionSeries (None where unavailable)
+        """
+        unique = list(dict.fromkeys(meter_ids))
+        results = await asyncio.gather(*(self.get_history(meter_id, start, end) for meter_id in unique))
+        return dict(zip(unique, results))
+
+    async def _fetch_history(
+        self,
+        meter_id: str,
+        start: datetime,
+        end: datetime
+    ) -> Optional[ConsumptionSeries]:
+        async with self._semaphore:
+            try:
+                response = await self._get_client().get(
+                    f"/meters/{meter_id}/readings",
+                    params={"from": start.isoformat(), "to": end.isoformat()}
+                )
+            except httpx.RequestError as e:
+                logger.error(f"Failed to fetch AHK history for {meter_id}: {e}")
+                return None
+
+        if response.status_code == 404:
+            logger.warning(f"AHK meter {meter_id} not found")
+            return None
+        if response.status_code != 200:
+            logger.error(f"AHK API error for {meter_id}: {response.status_code}")
+            return None
+
+        try:
+            readings = response.json().get("readings", [])
+            timestamps, valid = parse_epoch_us([reading["timestamp"] for reading in readings])
+            if not valid.all():
+                raise ValueError(f"{int((~valid).sum())} unparseable timestamps")
+            consumption = np.array(
+                [reading["consumption_kwh"] for reading in readings], dtype=np.float64
+            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"Malformed AHK history for {meter_id}: {e}")
+            return None
+
+        return ConsumptionSeries(timestamps, consumption, meter_id=meter_id)
+
+
+@lru_cache()
+def get_ahk_meter_service() -> AhkMeterService:
+    """Get the process-wide AHK client"""
+    return AhkMeterService()
@@ -4,15 +4,110 @@ Baseline Calculation Service
 Calculates the baseline consumption for a user based on historical data.
 The baseline is used to determine savings during a session.
 """
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Sequence, Union
 from decimal import Decimal
 import statistics
 
+import numpy as np
+
 from ..config import get_settings
+from .consumption import (
+    ConsumptionSeries,
+    window_sum_matrix,
+    to_epoch_us,
+    US_PER_HOUR,
+    US_PER_DAY,
+    US_PER_WEEK,
+)
+from .fixed_point import mwh_to_kwh, MWH_PER_KWH
 
 settings = get_settings()
 
+HistoricalData = Union[List[dict], ConsumptionSeries]
+
+# Seasonal factors for Cyprus (month -> factor)
+SEASONAL_FACTORS = {
+    1: 1.15,   # January (heating)
+    2: 1.10,   # February
+    3: 1.00,   # March
+    4: 0.95,   # April
+    5: 1.05,   # May
+    6: 1.20,   # June (AC starts)
+    7: 1.30,   # July (peak AC)
+    8: 1.30,   # August (peak AC)
+    9: 1.20,   # September
+    10: 1.00,  # October
+    11: 1.05,  # November
+    12: 1.15,  # December (heating)
+}
+_SEASONAL_FACTORS_DECIMAL = {month: Decimal(str(factor)) for month, factor in SEASONAL_FACTORS.items()}
+_ONE = Decimal("1.0")
+
+
+def _as_series(historical_data: HistoricalData) -> ConsumptionSeries:
+    """Index reading dicts once; pass an existing series through"""
+    if isinstance(historical_data, ConsumptionSeries):
+        return historical_data
+    return ConsumptionSeries.from_records(historical_data)
+
+
+def _trimmed_mean(float_values: List[float]) -> float:
+    """
+    Mean of at least three values after dropping those more than 2 sample
+    standard deviations from the mean (all are kept if every value would be
+    dropped)
+    """
+    mean = statistics.mean(float_values)
+    std_dev = statistics.stdev(float_values)
+
+    # Filter outliers (values within 2 standard deviations)
+    filtered = [
+        v for v in float_values
+        if abs(v - mean) <= 2 * std_dev
+    ]
+
+    if not filtered:
+        filtered = float_values  # Keep all if all are outliers
+
+    return statistics.mean(filtered)
+
+
+def cohort_baselines(
+    series_list: Sequence[ConsumptionSeries],
+    session_start_us: int,
+    window_length_us: int
+):
+    """
+    Array core of BaselineService.calculate_many
+
+    Kept free of Decimal and datetime so batch workers can run it on
+    arrays attached from shared memory. The window sums are one vectorized
+    pass; the outlier-trimmed mean of each user's ten days goes through
+    _trimmed_mean, as for a single user, because statistics.mean rounds
+    the exact mean once and a NumPy row mean can differ in the last bit.
+
+    Returns:
+        (10-day baseline per user as float64, bool mask of users that have
+        a baseline)
+    """
+    day_starts = session_start_us - np.arange(1, 11) * US_PER_DAY
+    matrix = window_sum_matrix(series_list, day_starts, window_length_us)
+
+    valid = matrix > 0
+    eligible = valid.sum(axis=1) >= 5
+    for index, series in enumerate(series_list):
+        if len(series) < 5:
+            eligible[index] = False
+
+    # int64 / float64 is correctly rounded, the same float as float(Decimal)
+    kwh = matrix / MWH_PER_KWH
+    means = np.zeros(len(series_list), dtype=np.float64)
+    for row in np.flatnonzero(eligible).tolist():
+        means[row] = _trimmed_mean(kwh[row][valid[row]].tolist())
+
+    return means, eligible
+
 
 class BaselineService:
     """
@@ -26,7 +121,7 @@ class BaselineService:
 
     @staticmethod
     def calculate_10_day_average(
-        historical_data: List[dict],
+        historical_data: HistoricalData,
         session_start: datetime,
         session_duration_hours: int = 3
     ) -> Optional[Decimal]:
@@ -34,7 +129,8 @@ class BaselineService:
         Calculate 10-day average baseline consumption
 
         Args:
-            historical_data: List of dicts with 'timestamp' and 'consumption_kwh'
+            historical_data: List of dicts with 'timestamp' and 'consumption_kwh',
+                or a ConsumptionSeries already built for the meter
             session_start: When the session starts
             session_duration_hours: Duration of session in hours
 
@@ -44,26 +140,20 @@ class BaselineService:
         if not historical_data or len(historical_data) < 5:
             return None
 
-        # Get the same time window for the past 10 days
-        session_hour = session_start.hour
-        session_end_hour = (session_start + timedelta(hours=session_duration_hours)).hour
-
-        # Filter historical data for the same time window
-        relevant_consumptions = []
-
-        for i in range(1, 11):  # Last 10 days
-            day_start = session_start - timedelta(days=i)
-            day_end = day_start + timedelta(hours=session_duration_hours)
+        series = _as_series(historical_data)
 
-            # Sum consumption for this time window
-            day_consumption = sum(
-                Decimal(str(entry['consumption_kwh']))
-                for entry in historical_data
-                if day_start <= entry['timestamp'] < day_end
-            )
+        # Same time window for each of the past 10 days
+        day_starts = to_epoch_us(session_start) - np.arange(1, 11) * US_PER_DAY
+        day_consumptions = series.window_sums_mwh(
+            day_starts,
+            session_duration_hours * US_PER_HOUR
+        )
 
-            if day_consumption > 0:
-                relevant_consumptions.append(day_consumption)
+        relevant_consumptions = [
+            mwh_to_kwh(value)
+            for value in day_consumptions.tolist()
+            if value > 0
+        ]
 
         if len(relevant_consumptions) < 5:
             return None
@@ -77,7 +167,7 @@ class BaselineService:
 
     @staticmethod
     def calculate_same_weekday_average(
-        historical_data: List[dict],
+        historical_data: HistoricalData,
         session_start: datetime,
         session_duration_hours: int = 3,
         weeks_back: int = 4
@@ -87,7 +177,8 @@ class BaselineService:
         (e.g., average of last 4 Mondays)
 
         Args:
-            historical_data: List of dicts with 'timestamp' and 'consumption_kwh'
+            historical_data: List of dicts with 'timestamp' and 'consumption_kwh',
+                or a ConsumptionSeries already built for the meter
             session_start: When the session starts
             session_duration_hours: Duration of session
             weeks_back: Number of weeks to look back
@@ -95,33 +186,25 @@ class BaselineService:
         Returns:
             Baseline consumption in kWh
         """
-        target_weekday = session_start.weekday()
-        session_hour = session_start.hour
-
-        relevant_consumptions = []
-
-        for i in range(1, weeks_back + 1):
-            # Go back i weeks
-            historical_date = session_start - timedelta(weeks=i)
-
-            # Ensure it's the same weekday
-            if historical_date.weekday() == target_weekday:
-                day_start = historical_date.replace(
-                    hour=session_start.hour,
-                    minute=0,
-                    second=0,
-                    microsecond=0
-                )
-                day_end = day_start + timedelta(hours=session_duration_hours)
-
-                day_consumption = sum(
-                    Decimal(str(entry['consumption_kwh']))
-                    for entry in historical_data
-                    if day_start <= entry['timestamp'] < day_end
-                )
-
-                if day_consumption > 0:
-                    relevant_consumptions.append(day_consumption)
+        if not historical_data or weeks_back < 1:
+            return None
+
+        series = _as_series(historical_data)
+
+        # Going back whole weeks always lands on the same weekday; the
+        # window starts at the top of the session hour
+        hour_start = session_start.replace(minute=0, second=0, microsecond=0)
+        day_starts = to_epoch_us(hour_start) - np.arange(1, weeks_back + 1) * US_PER_WEEK
+        day_consumptions = series.window_sums_mwh(
+            day_starts,
+            session_duration_hours * US_PER_HOUR
+        )
+
+        relevant_consumptions = [
+            mwh_to_kwh(value)
+            for value in day_consumptions.tolist()
+            if value > 0
+        ]
 
         if len(relevant_consumptions) < 2:
             return None
@@ -130,6 +213,43 @@ class BaselineService:
             relevant_consumptions
         )
 
+    @staticmethod
+    def calculate_many(
+        user_histories: Sequence[HistoricalData],
+        session_start: datetime,
+        session_duration_hours: int = 3
+    ) -> List[Optional[Decimal]]:
+        """
+        Calculate 10-day average baselines for a whole cohort at once
+
+        Builds a users x days matrix of window consumption in one vectorized
+        pass and applies the same outlier removal row by row, so every
+        baseline equals calculate_10_day_average for that user.
+
+        Args:
+            user_histories: One history (reading dicts or ConsumptionSeries)
+                per user, all sharing the same session window
+            session_start: When the session starts
+            session_duration_hours: Duration of session in hours
+
+        Returns:
+            Baseline in kWh per user, None where calculate_10_day_average
+            would return None
+        """
+        if not user_histories:
+            return []
+
+        means, eligible = cohort_baselines(
+            [_as_series(history) for history in user_histories],
+            to_epoch_us(session_start),
+            session_duration_hours * US_PER_HOUR
+        )
+
+        return [
+            Decimal(str(mean)) if ok else None
+            for mean, ok in zip(means.tolist(), eligible.tolist())
+        ]
+
     @staticmethod
     def _calculate_average_with_outlier_removal(
         values: List[Decimal]
@@ -147,21 +267,7 @@ class BaselineService:
             return Decimal(str(statistics.mean(values)))
 
         # Convert to float for statistics calculations
-        float_values = [float(v) for v in values]
-
-        mean = statistics.mean(float_values)
-        std_dev = statistics.stdev(float_values)
-
-        # Filter outliers (values within 2 standard deviations)
-        filtered = [
-            v for v in float_values
-            if abs(v - mean) <= 2 * std_dev
-        ]
-
-        if not filtered:
-            filtered = float_values  # Keep all if all are outliers
-
-        return Decimal(str(statistics.mean(filtered)))
+        return Decimal(str(_trimmed_mean([float(v) for v in values])))
 
     @staticmethod
     def apply_seasonal_adjustment(
@@ -180,23 +286,7 @@ class BaselineService:
         Returns:
             Adjusted baseline
         """
-        # Seasonal factors for Cyprus
-        seasonal_factors = {
-            1: 1.15,   # January (heating)
-            2: 1.10,   # February
-            3: 1.00,   # March
-            4: 0.95,   # April
-            5: 1.05,   # May
-            6: 1.20,   # June (AC starts)
-            7: 1.30,   # July (peak AC)
-            8: 1.30,   # August (peak AC)
-            9: 1.20,   # September
-            10: 1.00,  # October
-            11: 1.05,  # November
-            12: 1.15,  # December (heating)
-        }
-
-        factor = Decimal(str(seasonal_factors.get(month, 1.0)))
+        factor = _SEASONAL_FACTORS_DECIMAL.get(month, _ONE)
         return baseline * factor
 
     @staticmethod
@@ -0,0 +1,192 @@
+"""
+Baseline Cache
+
+Precomputed session baselines keyed by (user_id, session slot, method,
+date). A nightly job fills the cache for every session scheduled that
+day, once the last lookback window (the previous evening) has been
+metered, so session starts during the peak read a baseline instead of
+calculating it. The job runs in the process that holds the background
+jobs lock, alongside the scheduler that starts the cohorts.
+"""
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import uuid
+
+from ..config import get_settings
+from ..models.saving_session import SavingSession
+from .baseline import BaselineService, HistoricalData
+from .batch_executor import CohortBatchExecutor, get_batch_executor
+from .cache import TTLCache
+from .rolling_baseline import slot_key
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class BaselineCache:
+    """
+    TTL/LRU cache of session baselines
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int, **cache_options: Any):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_bytes=max_bytes, **cache_options)
+
+    @staticmethod
+    def key(
+        user_id: uuid.UUID,
+        session_start: datetime,
+        session_duration_hours: int,
+        method: str
+    ) -> Tuple[uuid.UUID, Tuple[int, int], str, date]:
+        """Cache key for a session baseline"""
+        return (
+            user_id,
+            slot_key(session_start, session_duration_hours),
+            method,
+            session_start.date()
+        )
+
+    def get(
+        self,
+        user_id: uuid.UUID,
+        session_start: datetime,
+        session_duration_hours: int,
+        method: str = "10_DAY_AVERAGE"
+    ) -> Optional[Decimal]:
+        """Cached baseline, or None on a miss"""
+        return self._cache.get(self.key(user_id, session_start, session_duration_hours, method))
+
+    def put(
+        self,
+        user_id: uuid.UUID,
+        session_start: datetime,
+        session_duration_hours: int,
+        baseline: Decimal,
+        method: str = "10_DAY_AVERAGE"
+    ) -> None:
+        """Store a baseline"""
+        self._cache.set(self.key(user_id, session_start, session_duration_hours, method), baseline)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        return self._cache.stats()
+
+    def warm(
+        self,
+        db: Session,
+        day: date,
+        history_loader: Callable[[Sequence[SavingSession]], Sequence[HistoricalData]],
+        executor: Optional[CohortBatchExecutor] = None
+    ) -> int:
+        """
+        Precompute baselines for every session scheduled on ``day``
+
+        Sessions sharing a window are calculated together with
+        BaselineService.calculate_many, or sharded over worker processes
+        when an executor is given.
+
+        Args:
+            db: Database session
+            day: Date whose scheduled sessions should be precomputed
+            history_loader: Returns the consumption history for each session
+                of a cohort
+            executor: Optional process-pool executor for large cohorts
+
+        Returns:
+            Number of baselines cached
+        """
+        day_start = datetime.combine(day, time.min)
+        sessions = db.query(SavingSession).filter(
+            SavingSession.status == "SCHEDULED",
+            SavingSession.scheduled_start >= day_start,
+            SavingSession.scheduled_start < day_start + timedelta(days=1)
+        ).all()
+
+        cohorts: Dict[Tuple[datetime, int], List[SavingSession]] = {}
+        for session in sessions:
+            duration_hours = int((session.scheduled_end - session.scheduled_start).seconds / 3600)
+            cohorts.setdefault((session.scheduled_start, duration_hours), []).append(session)
+
+        cached = 0
+        calculate = executor.calculate_baselines if executor else BaselineService.calculate_many
+
+        for (session_start, duration_hours), cohort in cohorts.items():
+            results = calculate(
+                user_histories=history_loader(cohort),
+                session_start=session_start,
+                session_duration_hours=duration_hours
+            )
+            for session, baseline in zip(cohort, results):
+                if baseline is not None and BaselineService.validate_baseline(baseline):
+                    self.put(session.user_id, session_start, duration_hours, baseline)
+                    cached += 1
+
+        logger.info(f"Precomputed {cached} baselines for {len(sessions)} sessions on {day}")
+        return cached
+
+
+@lru_cache()
+def get_baseline_cache() -> BaselineCache:
+    """Get the process-wide baseline cache"""
+    return BaselineCache(
+        ttl_seconds=settings.BASELINE_CACHE_TTL_HOURS * 3600,
+        max_bytes=settings.BASELINE_CACHE_MAX_MB * 1024 * 1024
+    )
+
+
+def next_precompute(now: datetime) -> datetime:
+    """
+    Next nightly precompute run after ``now``
+
+    The run at BASELINE_PRECOMPUTE_HOUR warms the sessions of its own day:
+    the previous evening's window is metered by then, and the peak is
+    well inside BASELINE_CACHE_TTL_HOURS.
+    """
+    run_at = datetime.combine(now.date(), time(settings.BASELINE_PRECOMPUTE_HOUR))
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+async def run_nightly_precompute(
+    session_factory: Callable[[], Session],
+    history_loader: Callable[[Sequence[SavingSession]], Sequence[HistoricalData]]
+) -> None:
+    """
+    Fill the baseline cache every night for the same day
+
+    Runs forever; start it as a background job in a single process. A
+    process that starts after today's run time warms today immediately,
+    so a restart or failover before the peak still fills the cache. The
+    calculation itself runs in a worker thread to keep the event loop
+    responsive.
+    """
+    cache = get_baseline_cache()
+
+    def warm(day: date) -> int:
+        db = session_factory()
+        try:
+            return cache.warm(db, day, history_loader, executor=get_batch_executor())
+        finally:
+            db.close()
+
+    now = datetime.utcnow()
+    run_at = next_precompute(now)
+    if run_at.date() > now.date():
+        # Today's run time has passed; sessions still SCHEDULED today are warmed now
+        run_at = now
+
+    while True:
+        await asyncio.sleep(max(0.0, (run_at - datetime.utcnow()).total_seconds()))
+
+        try:
+            await asyncio.to_thread(warm, run_at.date())
+        except Exception as e:
+            logger.error(f"Nightly baseline precompute failed: {e}")
+
+        run_at = next_precompute(datetime.utcnow())
@@ -0,0 +1,193 @@
+"""
+Cohort Batch Executor
+
+Fans baseline math for large cohorts out over a process pool. Meter
+arrays are packed once into shared memory and every worker attaches to
+them by name, so nothing is pickled per user; workers return compact
+NumPy arrays for their shard of rows. Settlement is not fanned out:
+SavingsCalculationService.calculate_savings_batch settles a whole cohort
+in int64 NumPy inside complete_batch, well under the cost of shipping the
+columns to worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import os
+
+import numpy as np
+
+from ..config import get_settings
+from .baseline import cohort_baselines, HistoricalData, _as_series
+from .consumption import ConsumptionSeries, to_epoch_us, US_PER_HOUR
+
+settings = get_settings()
+
+# name -> (shared memory block name, dtype, shape)
+ArraySpec = Dict[str, Tuple[str, str, Tuple[int, ...]]]
+
+
+@contextmanager
+def _shared_arrays(**arrays: np.ndarray) -> Iterator[ArraySpec]:
+    """Copy arrays into shared memory blocks for the duration of a batch"""
+    blocks: List[SharedMemory] = []
+    spec: ArraySpec = {}
+    try:
+        for name, array in arrays.items():
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            spec[name] = (block.name, array.dtype.str, array.shape)
+        yield spec
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach_arrays(spec: ArraySpec) -> Tuple[Dict[str, np.ndarray], List[SharedMemory]]:
+    """Map shared memory blocks created by the parent process"""
+    arrays: Dict[str, np.ndarray] = {}
+    blocks: List[SharedMemory] = []
+    for name, (block_name, dtype, shape) in spec.items():
+        block = SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return arrays, blocks
+
+
+def _baseline_shard(
+    spec: ArraySpec,
+    row_start: int,
+    row_end: int,
+    session_start_us: int,
+    window_length_us: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Worker: 10-day baselines for rows [row_start, row_end) of the cohort"""
+    arrays, blocks = _attach_arrays(spec)
+    try:
+        timestamps = arrays["timestamps"]
+        cumulative = arrays["cumulative_mwh"]
+        offsets = arrays["offsets"]
+
+        # Row i owns timestamps[offsets[i]:offsets[i + 1]] and one extra
+        # prefix-sum element, hence the + i shift into cumulative
+        series_list = [
+            ConsumptionSeries.from_prefix_sums(
+                timestamps[offsets[row]:offsets[row + 1]],
+                cumulative[offsets[row] + row:offsets[row + 1] + row + 1]
+            )
+            for row in range(row_start, row_end)
+        ]
+        means, eligible = cohort_baselines(series_list, session_start_us, window_length_us)
+        return means.copy(), eligible.copy()
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+class CohortBatchExecutor:
+    """
+    Process-pool executor for cohort-wide baseline batches
+
+    Args:
+        max_workers: Worker processes (defaults to BATCH_WORKERS, or the
+            CPU count when that is 0)
+        min_rows_per_worker: Cohorts smaller than this per worker are run
+            inline, where the pool overhead would dominate
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_rows_per_worker: Optional[int] = None):
+        self.max_workers = max_workers or settings.BATCH_WORKERS or os.cpu_count() or 1
+        self.min_rows_per_worker = (
+            min_rows_per_worker
+            if min_rows_per_worker is not None
+            else settings.BATCH_MIN_ROWS_PER_WORKER
+        )
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=get_context("spawn")
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _shards(self, rows: int) -> List[Tuple[int, int]]:
+        """Split rows into roughly two shards per worker"""
+        shard_count = min(self.max_workers * 2, max(1, rows // max(self.min_rows_per_worker, 1)))
+        bounds = np.linspace(0, rows, shard_count + 1).astype(int)
+        return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    def _parallel(self, rows: int) -> bool:
+        return self.max_workers > 1 and rows >= 2 * self.min_rows_per_worker
+
+    def calculate_baselines(
+        self,
+        user_histories: Sequence[HistoricalData],
+        session_start: datetime,
+        session_duration_hours: int = 3
+    ) -> List[Optional[Decimal]]:
+        """
+        Same contract as BaselineService.calculate_many, sharded over processes
+
+        Args:
+            user_histories: One history per user, all sharing the session window
+            session_start: When the session starts
+            session_duration_hours: Duration of session in hours
+
+        Returns:
+            Baseline in kWh per user, None where no valid baseline exists
+        """
+        series_list = [_as_series(history) for history in user_histories]
+        session_start_us = to_epoch_us(session_start)
+        window_length_us = session_duration_hours * US_PER_HOUR
+
+        if not self._parallel(len(series_list)):
+            means, eligible = cohort_baselines(series_list, session_start_us, window_length_us)
+        else:
+            lengths = np.fromiter((len(series) for series in series_list), dtype=np.int64, count=len(series_list))
+            offsets = np.zeros(len(series_list) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+
+            with _shared_arrays(
+                timestamps=np.concatenate([series.timestamps for series in series_list]),
+                cumulative_mwh=np.concatenate([series.cumulative_mwh for series in series_list]),
+                offsets=offsets
+            ) as spec:
+                pool = self._get_pool()
+                futures = [
+                    pool.submit(_baseline_shard, spec, start, end, session_start_us, window_length_us)
+                    for start, end in self._shards(len(series_list))
+                ]
+                results = [future.result() for future in futures]
+
+            means = np.concatenate([result[0] for result in results])
+            eligible = np.concatenate([result[1] for result in results])
+
+        return [
+            Decimal(str(mean)) if ok else None
+            for mean, ok in zip(means.tolist(), eligible.tolist())
+        ]
+
+
+@lru_cache()
+def get_batch_executor() -> CohortBatchExecutor:
+    """Get the process-wide batch executor"""
+    return CohortBatchExecutor()
@@ -0,0 +1,301 @@
+"""
+Consumption Series
+
+Array-backed index over a meter's interval readings. Keeps the readings
+sorted by timestamp together with a cumulative (prefix sum) array, so the
+consumption over any [start, end) window costs two binary searches and
+one subtraction regardless of how much history is loaded.
+
+The prefix sums are int64 mWh, so window sums are exact: a float running
+total would carry its rounding error into every subtraction. Readings are
+rounded to the mWh on the way in, which is exact for the DECIMAL(10, 4)
+kWh the meters report.
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+import re
+
+import numpy as np
+
+from .fixed_point import kwh_to_mwh_array, MWH_PER_KWH
+
+# Timestamps are handled as int64 microseconds since the epoch so that
+# window boundaries compare exactly like the original datetime objects.
+US_PER_MINUTE = 60_000_000
+US_PER_HOUR = 60 * US_PER_MINUTE
+US_PER_DAY = 24 * US_PER_HOUR
+US_PER_WEEK = 7 * US_PER_DAY
+
+
+def to_epoch_us(moment: datetime) -> int:
+    """Convert a naive (UTC) datetime to int64 epoch microseconds"""
+    return int(np.datetime64(moment, "us").astype(np.int64))
+
+
+def from_epoch_us(value: int) -> datetime:
+    """Convert int64 epoch microseconds back to a naive (UTC) datetime"""
+    return np.datetime64(int(value), "us").astype(datetime)
+
+
+_UTC_OFFSET = re.compile(r"(?:Z|([+-])(\d{2}):?(\d{2}))$")
+_NAT = np.iinfo(np.int64).min
+
+
+def parse_epoch_us(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ISO 8601 strings to int64 epoch microseconds, offsets converted to UTC
+
+    A trailing Z or +HH:MM is split off and applied as an integer shift,
+    so NumPy only ever parses naive timestamps (its own timezone parsing
+    is deprecated).
+
+    Returns:
+        (epoch microseconds, bool mask of values that parsed)
+    """
+    naive = []
+    shifts = np.zeros(len(values), dtype=np.int64)
+    for index, value in enumerate(values):
+        match = _UTC_OFFSET.search(value) if isinstance(value, str) else None
+        if match is None:
+            naive.append(value)
+            continue
+        naive.append(value[:match.start()])
+        sign, hours, minutes = match.groups()
+        if sign:
+            shift = (int(hours) * 60 + int(minutes)) * US_PER_MINUTE
+            shifts[index] = shift if sign == "+" else -shift
+
+    try:
+        parsed = np.array(naive, dtype="datetime64[us]").view(np.int64)
+        # NumPy reads "" and "NaT" as not-a-time rather than failing
+        valid = parsed != _NAT
+        return np.where(valid, parsed - shifts, 0), valid
+    except (TypeError, ValueError):
+        pass
+
+    # Slow path: at least one value is malformed, find which
+    parsed = np.zeros(len(values), dtype=np.int64)
+    valid = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(naive):
+        try:
+            timestamp = np.datetime64(value, "us").astype(np.int64)
+        except (TypeError, ValueError):
+            continue
+        if timestamp != _NAT:
+            parsed[index] = timestamp - shifts[index]
+            valid[index] = True
+    return parsed, valid
+
+
+class ConsumptionSeries:
+    """
+    Sorted interval readings for one meter with a prefix-sum index
+
+    Attributes:
+        meter_id: Optional meter / AHK account identifier
+        timestamps: int64 epoch microseconds, ascending
+        cumulative_mwh: int64 running total in mWh, one element longer than
+            timestamps (cumulative_mwh[i] is the sum of the first i readings)
+    """
+
+    __slots__ = ("meter_id", "timestamps", "cumulative_mwh")
+
+    def __init__(
+        self,
+        timestamps: Sequence[int],
+        consumption_kwh: Sequence[float],
+        meter_id: Optional[str] = None
+    ):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        consumption_mwh = kwh_to_mwh_array(consumption_kwh)
+
+        if timestamps.shape != consumption_mwh.shape or timestamps.ndim != 1:
+            raise ValueError("timestamps and consumption_kwh must be 1-D arrays of equal length")
+
+        if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps = timestamps[order]
+            consumption_mwh = consumption_mwh[order]
+
+        cumulative = np.empty(len(consumption_mwh) + 1, dtype=np.int64)
+        cumulative[0] = 0
+        np.cumsum(consumption_mwh, out=cumulative[1:])
+
+        self.meter_id = meter_id
+        self.timestamps = timestamps
+        self.cumulative_mwh = cumulative
+
+    @classmethod
+    def from_records(
+        cls,
+        historical_data: List[dict],
+        meter_id: Optional[str] = None
+    ) -> "ConsumptionSeries":
+        """
+        Build a series from reading dicts
+
+        Args:
+            historical_data: List of dicts with 'timestamp' and 'consumption_kwh'
+            meter_id: Optional meter identifier
+
+        Returns:
+            ConsumptionSeries over the readings
+        """
+        count = len(historical_data)
+        timestamps = np.fromiter(
+            (entry['timestamp'] for entry in historical_data),
+            dtype="datetime64[us]",
+            count=count
+        ).view(np.int64)
+        consumption = np.fromiter(
+            (float(entry['consumption_kwh']) for entry in historical_data),
+            dtype=np.float64,
+            count=count
+        )
+        return cls(timestamps, consumption, meter_id=meter_id)
+
+    @classmethod
+    def from_prefix_sums(
+        cls,
+        timestamps: np.ndarray,
+        cumulative_mwh: np.ndarray,
+        meter_id: Optional[str] = None
+    ) -> "ConsumptionSeries":
+        """
+        Wrap already sorted timestamps and prefix sums without copying
+
+        Args:
+            timestamps: int64 epoch microseconds, ascending
+            cumulative_mwh: int64 prefix sums in mWh, len(timestamps) + 1 long
+            meter_id: Optional meter identifier
+
+        Returns:
+            ConsumptionSeries sharing the given arrays
+        """
+        if len(cumulative_mwh) != len(timestamps) + 1:
+            raise ValueError("cumulative_mwh must be one element longer than timestamps")
+
+        series = cls.__new__(cls)
+        series.meter_id = meter_id
+        series.timestamps = timestamps
+        series.cumulative_mwh = cumulative_mwh
+        return series
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def consumption_kwh(self) -> np.ndarray:
+        """Per-interval kWh recovered from the prefix sums"""
+        return np.diff(self.cumulative_mwh) / MWH_PER_KWH
+
+    @property
+    def total_kwh(self) -> float:
+        """Total consumption over the whole series"""
+        return int(self.cumulative_mwh[-1]) / MWH_PER_KWH
+
+    def window_sum(self, start: datetime, end: datetime) -> float:
+        """
+        Consumption over the half-open window [start, end)
+
+        Args:
+            start: Window start (inclusive)
+            end: Window end (exclusive)
+
+        Returns:
+            kWh consumed in the window
+        """
+        lower, upper = np.searchsorted(
+            self.timestamps,
+            [to_epoch_us(start), to_epoch_us(end)],
+            side="left"
+        )
+        if upper <= lower:
+            return 0.0
+        return int(self.cumulative_mwh[upper] - self.cumulative_mwh[lower]) / MWH_PER_KWH
+
+    def window_sums_mwh(
+        self,
+        window_starts: np.ndarray,
+        window_length_us: int
+    ) -> np.ndarray:
+        """
+        Consumption over [start, start + length) for many window starts
+
+        Args:
+            window_starts: int64 epoch microseconds
+            window_length_us: Window length in microseconds
+
+        Returns:
+            int64 array of mWh, one element per window
+        """
+        window_starts = np.asarray(window_starts, dtype=np.int64)
+        lower = np.searchsorted(self.timestamps, window_starts, side="left")
+        upper = np.searchsorted(self.timestamps, window_starts + window_length_us, side="left")
+
+        sums = self.cumulative_mwh[upper] - self.cumulative_mwh[lower]
+        sums[upper <= lower] = 0
+
+        return sums
+
+
+def window_sum_matrix(
+    series_list: Sequence[ConsumptionSeries],
+    window_starts: np.ndarray,
+    window_length_us: int
+) -> np.ndarray:
+    """
+    Consumption for every (series, window) pair in one vectorized pass
+
+    All series are clipped to the span covered by the windows and laid out
+    back to back on a single key axis (series index * span + offset), so
+    window bounds for the whole cohort come from one searchsorted call. Each
+    series keeps its own prefix sums, so every cell equals what
+    ConsumptionSeries.window_sums_mwh returns for that user.
+
+    Args:
+        series_list: One ConsumptionSeries per user
+        window_starts: int64 epoch microseconds, shared by all users
+        window_length_us: Window length in microseconds
+
+    Returns:
+        int64 matrix of mWh with shape (len(series_list), len(window_starts))
+    """
+    window_starts = np.asarray(window_starts, dtype=np.int64)
+    result = np.zeros((len(series_list), len(window_starts)), dtype=np.int64)
+    if not len(series_list) or not len(window_starts):
+        return result
+
+    origin = int(window_starts.min())
+    span = int(window_starts.max()) + window_length_us - origin + 1
+    offsets = window_starts - origin
+
+    # Keep composite keys well inside int64
+    chunk_size = max(1, (2 ** 62) // span)
+
+    for chunk_start in range(0, len(series_list), chunk_size):
+        chunk = series_list[chunk_start:chunk_start + chunk_size]
+        rows = np.arange(len(chunk), dtype=np.int64)
+
+        key_parts = []
+        cumulative_parts = []
+        for index, series in enumerate(chunk):
+            lower, upper = np.searchsorted(series.timestamps, [origin, origin + span], side="left")
+            key_parts.append(series.timestamps[lower:upper] - origin + index * span)
+            cumulative_parts.append(series.cumulative_mwh[lower:upper + 1])
+
+        keys = np.concatenate(key_parts)
+        cumulative = np.concatenate(cumulative_parts)
+
+        # Every series contributes one more prefix-sum element than keys,
+        # so a key position for row i maps to cumulative position + i
+        window_keys = (rows * span)[:, None] + offsets[None, :]
+        lower = np.searchsorted(keys, window_keys, side="left") + rows[:, None]
+        upper = np.searchsorted(keys, window_keys + window_length_us, side="left") + rows[:, None]
+
+        sums = cumulative[upper] - cumulative[lower]
+        sums[upper <= lower] = 0
+
+        result[chunk_start:chunk_start + len(chunk)] = sums
+
+    return result
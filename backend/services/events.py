@@ -0,0 +1,234 @@
+"""
+Saving Event Service
+
+Grid-wide saving events: one row carries the shared window and
+double-points flag, participants are a compact membership table, and
+every transition is a set-based statement over the whole event.
+"""
+from sqlalchemy import exists, func, insert, literal, select, update, values, column, and_
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+import uuid
+
+from ..models.saving_event import SavingEvent, SavingEventParticipant
+from ..models.saving_session import SavingSession
+from ..models.user import User
+
+
+class SavingEventService:
+    """
+    Bulk event operations
+    """
+
+    @staticmethod
+    def create_event(
+        db: Session,
+        scheduled_start: datetime,
+        duration_hours: int,
+        is_double_points_day: bool = False,
+        municipality_id: Optional[uuid.UUID] = None
+    ) -> SavingEvent:
+        """
+        Schedule a saving event (the caller commits)
+
+        Args:
+            db: Database session
+            scheduled_start: When the event starts
+            duration_hours: Event duration
+            is_double_points_day: Whether the bonus multiplier applies
+            municipality_id: Optional municipality scope
+
+        Returns:
+            The new event
+        """
+        event = SavingEvent(
+            status="SCHEDULED",
+            scheduled_start=scheduled_start,
+            scheduled_end=scheduled_start + timedelta(hours=duration_hours),
+            is_double_points_day="Y" if is_double_points_day else "N",
+            municipality_id=municipality_id,
+            participant_count=0
+        )
+        db.add(event)
+        db.flush()
+        return event
+
+    @staticmethod
+    def add_participants(
+        db: Session,
+        event_id: uuid.UUID,
+        user_ids: Sequence[uuid.UUID],
+        allocation_type: str = "WASTE_WALLET"
+    ) -> Optional[int]:
+        """
+        Join many users to a SCHEDULED event
+
+        The event row is locked with a conditional UPDATE first, so joins
+        cannot interleave with the event opening; unknown users and users
+        already in the event are skipped by the INSERT ... SELECT.
+        The caller owns the transaction.
+
+        Returns:
+            Number of users added, or None if the event is not SCHEDULED
+        """
+        locked = db.execute(
+            update(SavingEvent)
+            .where(SavingEvent.event_id == event_id, SavingEvent.status == "SCHEDULED")
+            .values(updated_at=func.now())
+            .returning(SavingEvent.event_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if locked is None:
+            return None
+
+        candidates = values(
+            column("user_id", UUID(as_uuid=True)),
+            name="candidates"
+        ).data([(user_id,) for user_id in dict.fromkeys(user_ids)])
+
+        joined = db.execute(
+            pg_insert(SavingEventParticipant)
+            .from_select(
+                ["event_id", "user_id", "allocation_type"],
+                select(literal(event_id, UUID(as_uuid=True)), User.user_id, literal(allocation_type))
+                .join(candidates, candidates.c.user_id == User.user_id)
+            )
+            .on_conflict_do_nothing(index_elements=["event_id", "user_id"])
+            .returning(SavingEventParticipant.user_id)
+        ).all()
+
+        if joined:
+            db.execute(
+                update(SavingEvent)
+                .where(SavingEvent.event_id == event_id)
+                .values(participant_count=SavingEvent.participant_count + len(joined))
+                .execution_options(synchronize_session=False)
+            )
+        return len(joined)
+
+    @staticmethod
+    def open_events(
+        db: Session,
+        now: Optional[datetime] = None,
+        event_id: Optional[uuid.UUID] = None
+    ) -> List[uuid.UUID]:
+        """
+        Open SCHEDULED events and create their participants' sessions
+
+        Each event moves to IN_PROGRESS with a conditional UPDATE, then one
+        INSERT ... SELECT creates a SCHEDULED saving_session per
+        participant with the event's window and double-points flag. The
+        sessions are then started like any other cohort.
+
+        Participation is only event-level until the event opens: each
+        household still needs its own row for its baseline, metered
+        consumption and settlement, and saving_session is where those
+        live. What stays per event is the timing, the flag and every
+        transition, each one statement for all participants.
+        The caller owns the transaction.
+
+        Args:
+            db: Database session
+            now: Open every event due by this time
+            event_id: Open this event regardless of its start time
+
+        Returns:
+            Ids of the opened events
+        """
+        condition = [SavingEvent.status == "SCHEDULED"]
+        if event_id is not None:
+            condition.append(SavingEvent.event_id == event_id)
+        else:
+            condition.append(SavingEvent.scheduled_start <= (now or datetime.utcnow()))
+
+        opened = [
+            row.event_id for row in db.execute(
+                update(SavingEvent)
+                .where(*condition)
+                .values(status="IN_PROGRESS", started_at=func.now())
+                .returning(SavingEvent.event_id)
+                .execution_options(synchronize_session=False)
+            )
+        ]
+        if not opened:
+            return []
+
+        db.execute(
+            insert(SavingSession).from_select(
+                [
+                    "session_id",
+                    "user_id",
+                    "event_id",
+                    "status",
+                    "scheduled_start",
+                    "scheduled_end",
+                    "is_double_points_day",
+                    "allocation_type",
+                ],
+                select(
+                    func.gen_random_uuid(),
+                    SavingEventParticipant.user_id,
+                    SavingEvent.event_id,
+                    literal("SCHEDULED"),
+                    SavingEvent.scheduled_start,
+                    SavingEvent.scheduled_end,
+                    SavingEvent.is_double_points_day,
+                    SavingEventParticipant.allocation_type
+                )
+                .join(SavingEventParticipant, SavingEventParticipant.event_id == SavingEvent.event_id)
+                .where(SavingEvent.event_id.in_(opened))
+            )
+        )
+        return opened
+
+    @staticmethod
+    def close_events(db: Session) -> List[uuid.UUID]:
+        """
+        Complete IN_PROGRESS events whose sessions are all settled
+
+        One UPDATE fills the event totals from its completed sessions.
+        The caller owns the transaction.
+
+        Returns:
+            Ids of the completed events
+        """
+        def session_total(column_):
+            return (
+                select(func.coalesce(func.sum(column_), 0))
+                .where(
+                    SavingSession.event_id == SavingEvent.event_id,
+                    SavingSession.status == "COMPLETED"
+                )
+                .scalar_subquery()
+            )
+
+        unsettled = exists().where(
+            and_(
+                SavingSession.event_id == SavingEvent.event_id,
+                SavingSession.status.in_(["SCHEDULED", "IN_PROGRESS"])
+            )
+        )
+        result = db.execute(
+            update(SavingEvent)
+            .where(SavingEvent.status == "IN_PROGRESS", ~unsettled)
+            .values(
+                status="COMPLETED",
+                completed_at=func.now(),
+                total_saved_kwh=session_total(SavingSession.saved_kwh),
+                total_saved_eur=session_total(SavingSession.saved_eur),
+                total_saved_co2_kg=session_total(SavingSession.saved_co2_kg)
+            )
+            .returning(SavingEvent.event_id)
+            .execution_options(synchronize_session=False)
+        )
+        return [row.event_id for row in result]
+
+    @staticmethod
+    def event_sessions(db: Session, event_id: uuid.UUID, status: str) -> List[SavingSession]:
+        """Sessions of an event in one status"""
+        return db.query(SavingSession).filter(
+            SavingSession.event_id == event_id,
+            SavingSession.status == status
+        ).all()
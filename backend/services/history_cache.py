@@ -0,0 +1,265 @@
+"""
+Meter History Cache
+
+Day-granular on-disk cache of AHK consumption history. Complete days are
+kept in a columnar segment store of their own, keyed by (meter, day), so
+a session start only asks the AHK API for the days it has not seen yet,
+typically just the current one. The cache is bounded by size with whole
+meters evicted in least-recently-used order, and old days fall out after
+the retention period.
+
+Disk access runs in worker threads so it never stalls the event loop, and
+meters join the LRU index the first time they are used; segments a
+previous process left behind are indexed by adopt_existing, off the
+request path.
+
+The store is never shared with the ingestion meter store: a day counts as
+cached because the cache wrote it whole, which would not hold for a day
+holding only part of an ingested upload, and eviction must not delete
+readings ingestion wrote.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+
+import numpy as np
+
+from ..config import get_settings
+from .ahk_meter import AhkMeterService, get_ahk_meter_service
+from .consumption import ConsumptionSeries, to_epoch_us
+from .meter_store import MeterReadingStore
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def _missing_runs(days: List[date], present: set) -> List[Tuple[date, date]]:
+    """Contiguous [first, last] runs of days not in ``present``"""
+    runs: List[Tuple[date, date]] = []
+    for day in days:
+        if day in present:
+            continue
+        if runs and runs[-1][1] == day - timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+class MeterHistoryCache:
+    """
+    (meter, day) history cache in front of the AHK API
+
+    Only days before the current UTC day are cached, since those can no
+    longer change; the current day is always fetched upstream.
+
+    Args:
+        store: Segment store holding only the cached days
+        upstream: AHK client for days that are not cached
+        max_bytes: Size cap; least recently used meters are evicted above it
+        retention_days: Days older than this are dropped from a meter on write
+        today: Current UTC date (injectable for tests)
+    """
+
+    def __init__(
+        self,
+        store: MeterReadingStore,
+        upstream: AhkMeterService,
+        max_bytes: int,
+        retention_days: int,
+        today: Callable[[], date] = _utc_today
+    ):
+        self.store = store
+        self.upstream = upstream
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self._today = today
+
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+        self.day_hits = 0
+        self.day_misses = 0
+        self.upstream_calls = 0
+        self.evictions = 0
+
+    def adopt_existing(self) -> int:
+        """
+        Index meters already on disk that have not been used yet
+
+        They join as least recently used, so they are the first to go once
+        the cache is over its cap. Walks the whole store; run it in a
+        background thread.
+
+        Returns:
+            Number of meters indexed
+        """
+        adopted = 0
+        for meter_id in self.store.meter_ids():
+            size = self.store.meter_size(meter_id)
+            with self._lock:
+                if meter_id in self._sizes:
+                    continue
+                self._sizes[meter_id] = size
+                self._sizes.move_to_end(meter_id, last=False)
+                self._bytes += size
+            adopted += 1
+        self._evict()
+        return adopted
+
+    async def get_history(
+        self,
+        meter_id: str,
+        start: datetime,
+        end: datetime
+    ) -> Optional[ConsumptionSeries]:
+        """
+        Interval readings for one meter in [start, end)
+
+        Cached days are read from the store; runs of missing days are
+        fetched upstream (concurrently) and complete days written back.
+
+        Returns:
+            ConsumptionSeries, or None if nothing is cached and upstream failed
+        """
+        first_day = start.date()
+        last_day = (end - timedelta(microseconds=1)).date()
+        last_complete_day = min(last_day, self._today() - timedelta(days=1))
+
+        days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+        present = (
+            set(await asyncio.to_thread(self.store.days_present, meter_id, first_day, last_complete_day))
+            if last_complete_day >= first_day else set()
+        )
+        runs = _missing_runs(days, present)
+
+        with self._lock:
+            self.day_hits += len(present)
+            self.day_misses += len(days) - len(present)
+            self.upstream_calls += len(runs)
+
+        # Complete days are always fetched whole so a cached day is never
+        # partial; the current day is only fetched up to ``end``
+        fetched = await asyncio.gather(*(
+            self.upstream.get_history(
+                meter_id,
+                datetime.combine(run_start, time.min),
+                datetime.combine(run_end + timedelta(days=1), time.min)
+                if run_end <= last_complete_day else end
+            )
+            for run_start, run_end in runs
+        ))
+        fetched = [series for series in fetched if series is not None and len(series)]
+
+        if not present and not fetched:
+            return None
+
+        return await asyncio.to_thread(
+            self._write_and_read, meter_id, start, end, last_complete_day, fetched, bool(present)
+        )
+
+    def _write_and_read(
+        self,
+        meter_id: str,
+        start: datetime,
+        end: datetime,
+        last_complete_day: date,
+        fetched: List[ConsumptionSeries],
+        hit: bool
+    ) -> ConsumptionSeries:
+        """Store the complete days fetched and read the window back (blocking)"""
+        # Complete days go to the store, the current day is only returned
+        complete_end_us = to_epoch_us(datetime.combine(last_complete_day + timedelta(days=1), time.min))
+        start_us = to_epoch_us(start)
+        recent: List[Tuple[np.ndarray, np.ndarray]] = []
+        wrote = False
+        for series in fetched:
+            split = int(np.searchsorted(series.timestamps, complete_end_us, side="left"))
+            if split:
+                self.store.write(meter_id, series.timestamps[:split], series.consumption_kwh[:split])
+                wrote = True
+            lower = max(split, int(np.searchsorted(series.timestamps, start_us, side="left")))
+            if lower < len(series):
+                recent.append((series.timestamps[lower:], series.consumption_kwh[lower:]))
+
+        if wrote:
+            self.store.drop_segments_before(meter_id, self._today() - timedelta(days=self.retention_days))
+        if hit or wrote:
+            self._touch(meter_id)
+
+        columns = self.store.segments(meter_id, start, end) + recent
+        if not columns:
+            return ConsumptionSeries(np.empty(0, dtype=np.int64), np.empty(0), meter_id=meter_id)
+
+        return ConsumptionSeries(
+            np.concatenate([timestamps for timestamps, _ in columns]),
+            np.concatenate([consumption for _, consumption in columns]),
+            meter_id=meter_id
+        )
+
+    async def get_histories(
+        self,
+        meter_ids: Iterable[str],
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, Optional[ConsumptionSeries]]:
+        """Same contract as AhkMeterService.get_histories, served from the cache"""
+        unique = list(dict.fromkeys(meter_ids))
+        results = await asyncio.gather(*(self.get_history(meter_id, start, end) for meter_id in unique))
+        return dict(zip(unique, results))
+
+    def _touch(self, meter_id: str) -> None:
+        """Mark a meter as recently used and evict above the size cap"""
+        size = self.store.meter_size(meter_id)
+        with self._lock:
+            self._bytes += size - self._sizes.pop(meter_id, 0)
+            self._sizes[meter_id] = size
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used meters until the cache fits its cap"""
+        evicted = []
+        with self._lock:
+            while self._bytes > self.max_bytes and len(self._sizes) > 1:
+                victim, victim_size = self._sizes.popitem(last=False)
+                self._bytes -= victim_size
+                self.evictions += 1
+                evicted.append(victim)
+
+        for victim in evicted:
+            self.store.delete_meter(victim)
+
+    def stats(self) -> Dict[str, Any]:
+        """Day hit/miss counters, upstream calls and occupancy"""
+        with self._lock:
+            lookups = self.day_hits + self.day_misses
+            return {
+                "meters": len(self._sizes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "day_hits": self.day_hits,
+                "day_misses": self.day_misses,
+                "hit_rate": round(self.day_hits / lookups, 4) if lookups else 0.0,
+                "upstream_calls": self.upstream_calls,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache()
+def get_history_cache() -> MeterHistoryCache:
+    """Get the process-wide history cache"""
+    return MeterHistoryCache(
+        store=MeterReadingStore(settings.HISTORY_CACHE_PATH, "day"),
+        upstream=get_ahk_meter_service(),
+        max_bytes=settings.HISTORY_CACHE_MAX_MB * 1024 * 1024,
+        retention_days=settings.HISTORY_CACHE_RETENTION_DAYS
+    )
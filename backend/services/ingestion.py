@@ -0,0 +1,412 @@
+"""
+Meter Reading Ingestion
+
+Bulk loading of smart-meter interval data (AHK/EAC exports or pushed
+batches). Input is consumed in fixed-size batches so memory stays flat
+regardless of file size. Each batch is validated and deduplicated on
+(meter, timestamp) with NumPy, COPY'd into a staging table and merged into
+the month-partitioned meter_reading table with one INSERT ... ON CONFLICT.
+Accepted readings are also written to the columnar meter store, to the
+rolling baselines of meters that belong to registered users and to the
+running totals of live-tracked sessions.
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import csv
+import io
+import logging
+import re
+import time
+
+import numpy as np
+
+from ..config import get_settings
+from ..models.user import User
+from .consumption import ConsumptionSeries, parse_epoch_us
+from .live_tracker import LiveSessionTracker, notify_readings
+from .meter_store import MeterReadingStore
+from .rolling_baseline import RollingBaselineStore
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ("meter_id", "timestamp", "consumption_kwh")
+MAX_REPORTED_ERRORS = 100
+
+_METER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]{1,20}$")
+
+_CREATE_STAGE = """
+    CREATE TEMP TABLE IF NOT EXISTS meter_reading_stage (
+        meter_id VARCHAR(20) NOT NULL,
+        reading_at TIMESTAMP NOT NULL,
+        consumption_kwh NUMERIC(10, 4) NOT NULL
+    ) ON COMMIT DROP
+"""
+_COPY_STAGE = "COPY meter_reading_stage (meter_id, reading_at, consumption_kwh) FROM STDIN WITH (FORMAT csv)"
+_MERGE_STAGE = """
+    INSERT INTO meter_reading (meter_id, reading_at, consumption_kwh)
+    SELECT meter_id, reading_at, consumption_kwh FROM meter_reading_stage
+    ON CONFLICT (meter_id, reading_at)
+    DO UPDATE SET consumption_kwh = EXCLUDED.consumption_kwh, ingested_at = now()
+"""
+
+
+class ReadingBatch:
+    """
+    Columnar batch of interval readings
+
+    Attributes:
+        meter_ids: Unicode array of meter / AHK account identifiers
+        timestamps_us: int64 epoch microseconds (interval start, UTC)
+        consumption_kwh: float64 kWh per interval
+    """
+
+    __slots__ = ("meter_ids", "timestamps_us", "consumption_kwh")
+
+    def __init__(self, meter_ids: np.ndarray, timestamps_us: np.ndarray, consumption_kwh: np.ndarray):
+        self.meter_ids = meter_ids
+        self.timestamps_us = timestamps_us
+        self.consumption_kwh = consumption_kwh
+
+    def __len__(self) -> int:
+        return len(self.timestamps_us)
+
+    def take(self, index: np.ndarray) -> "ReadingBatch":
+        """Rows selected by a mask or index array"""
+        return ReadingBatch(self.meter_ids[index], self.timestamps_us[index], self.consumption_kwh[index])
+
+    def deduplicate(self) -> "ReadingBatch":
+        """
+        Keep the last reading received for every (meter, timestamp)
+
+        The result is ordered by meter, then timestamp.
+        """
+        if not len(self):
+            return self
+
+        _, codes = np.unique(self.meter_ids, return_inverse=True)
+        # lexsort is stable, so equal keys keep their arrival order
+        order = np.lexsort((self.timestamps_us, codes))
+        codes = codes[order]
+        timestamps = self.timestamps_us[order]
+
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (codes[1:] != codes[:-1]) | (timestamps[1:] != timestamps[:-1])
+        return self.take(order[last])
+
+    def by_meter(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """(meter_id, timestamps, kWh) per meter of a deduplicated batch"""
+        if not len(self):
+            return
+        boundaries = np.flatnonzero(self.meter_ids[1:] != self.meter_ids[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(self)]])
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            yield str(self.meter_ids[start]), self.timestamps_us[start:end], self.consumption_kwh[start:end]
+
+
+def _parse_floats(values: Sequence[str]) -> np.ndarray:
+    """Strings to float64, NaN where a value is not a number"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        parsed = np.full(len(values), np.nan)
+        for index, value in enumerate(values):
+            try:
+                parsed[index] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return parsed
+
+
+def iter_csv_rows(lines: Iterable[str], batch_rows: int) -> Iterator[List[List[str]]]:
+    """
+    Stream a readings CSV in batches of raw rows
+
+    The header must name the meter_id, timestamp and consumption_kwh
+    columns; any other columns are ignored.
+
+    Raises:
+        ValueError: If a required column is missing
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    names = [name.strip().lower() for name in header]
+    missing = [column for column in CSV_COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+    positions = [names.index(column) for column in CSV_COLUMNS]
+    width = max(positions) + 1
+
+    rows: List[List[str]] = []
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        rows.append([row[position].strip() for position in positions])
+        if len(rows) >= batch_rows:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+class MeterIngestionService:
+    """
+    Validated, deduplicated bulk loading of interval readings
+
+    Args:
+        db: Database session; committed after every batch
+        meter_store: Columnar store to append accepted readings to
+        rolling_store: Rolling baselines to update for registered users
+        live_tracker: Live session totals to update
+        batch_rows: Rows per batch (defaults to INGEST_BATCH_ROWS)
+        max_interval_kwh: Readings above this are rejected as meter faults
+    """
+
+    _partitions: Set[date] = set()
+
+    def __init__(
+        self,
+        db: Session,
+        meter_store: Optional[MeterReadingStore] = None,
+        rolling_store: Optional[RollingBaselineStore] = None,
+        live_tracker: Optional[LiveSessionTracker] = None,
+        batch_rows: Optional[int] = None,
+        max_interval_kwh: Optional[float] = None
+    ):
+        self.db = db
+        self.meter_store = meter_store
+        self.rolling_store = rolling_store
+        self.live_tracker = live_tracker
+        self.batch_rows = batch_rows or settings.INGEST_BATCH_ROWS
+        self.max_interval_kwh = (
+            max_interval_kwh if max_interval_kwh is not None else settings.INGEST_MAX_INTERVAL_KWH
+        )
+
+    # Validation
+
+    def validate(
+        self,
+        meter_ids: Sequence[str],
+        timestamps: Sequence[str],
+        consumption_kwh: Sequence[str],
+        first_line: int = 1
+    ) -> Tuple[ReadingBatch, List[dict]]:
+        """
+        Parse and validate raw rows
+
+        Args:
+            meter_ids: Meter identifiers
+            timestamps: ISO 8601 interval start times
+            consumption_kwh: kWh per interval
+            first_line: Line number of the first row, for error reports
+
+        Returns:
+            (accepted readings, {"line", "reason"} for the first rejected rows)
+        """
+        ids = np.array(meter_ids, dtype=str)
+        timestamps_us, timestamp_ok = parse_epoch_us(timestamps)
+        kwh = _parse_floats(consumption_kwh)
+
+        meter_ok = np.fromiter(
+            (_METER_ID_PATTERN.match(meter_id) is not None for meter_id in meter_ids),
+            dtype=bool,
+            count=len(meter_ids)
+        )
+        kwh_ok = np.isfinite(kwh) & (kwh >= 0) & (kwh <= self.max_interval_kwh)
+        valid = meter_ok & timestamp_ok & kwh_ok
+
+        errors = []
+        for index in np.flatnonzero(~valid)[:MAX_REPORTED_ERRORS].tolist():
+            if not meter_ok[index]:
+                reason = "invalid meter_id"
+            elif not timestamp_ok[index]:
+                reason = "invalid timestamp"
+            else:
+                reason = f"consumption_kwh must be between 0 and {self.max_interval_kwh}"
+            errors.append({"line": first_line + index, "reason": reason})
+
+        return ReadingBatch(ids, timestamps_us, kwh).take(valid), errors
+
+    # Ingestion
+
+    def ingest_csv(self, lines: Iterable[str]) -> Dict:
+        """
+        Ingest a readings CSV (meter_id, timestamp, consumption_kwh)
+
+        Args:
+            lines: Text lines, e.g. an open file
+
+        Returns:
+            Ingestion report
+        """
+        def batches() -> Iterator[Tuple[List[str], List[str], List[str]]]:
+            for rows in iter_csv_rows(lines, self.batch_rows):
+                meter_ids, timestamps, consumption = zip(*rows)
+                yield list(meter_ids), list(timestamps), list(consumption)
+
+        # Line 1 is the header
+        return self._ingest(batches(), first_line=2)
+
+    def ingest_rows(self, rows: Iterable[Tuple[str, datetime, float]]) -> Dict:
+        """
+        Ingest already-typed readings (e.g. a JSON batch)
+
+        Args:
+            rows: (meter_id, timestamp, consumption_kwh) tuples
+
+        Returns:
+            Ingestion report
+        """
+        def batches() -> Iterator[Tuple[List[str], List[str], List[str]]]:
+            chunk: List[Tuple[str, datetime, float]] = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.batch_rows:
+                    yield self._columns(chunk)
+                    chunk = []
+            if chunk:
+                yield self._columns(chunk)
+
+        return self._ingest(batches(), first_line=1)
+
+    @staticmethod
+    def _columns(rows: List[Tuple[str, datetime, float]]) -> Tuple[List[str], List[str], List[str]]:
+        meter_ids, timestamps, consumption = zip(*rows)
+        return (
+            list(meter_ids),
+            [timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp for timestamp in timestamps],
+            list(consumption)
+        )
+
+    def _ingest(self, batches: Iterable[Tuple[List[str], List[str], List[str]]], first_line: int) -> Dict:
+        started = time.perf_counter()
+        report = {
+            "rows_received": 0,
+            "rows_rejected": 0,
+            "duplicates_dropped": 0,
+            "rows_written": 0,
+            "meters": 0,
+            "batches": 0,
+            "errors": [],
+        }
+        meters: Set[str] = set()
+
+        for meter_ids, timestamps, consumption in batches:
+            batch, errors = self.validate(
+                meter_ids, timestamps, consumption, first_line=first_line + report["rows_received"]
+            )
+            unique = batch.deduplicate()
+
+            self.write(unique)
+
+            report["rows_received"] += len(meter_ids)
+            report["rows_rejected"] += len(meter_ids) - len(batch)
+            report["duplicates_dropped"] += len(batch) - len(unique)
+            report["rows_written"] += len(unique)
+            report["batches"] += 1
+            room = MAX_REPORTED_ERRORS - len(report["errors"])
+            report["errors"].extend(errors[:room])
+            meters.update(np.unique(unique.meter_ids).tolist())
+
+        elapsed = time.perf_counter() - started
+        report["meters"] = len(meters)
+        report["elapsed_seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(report["rows_written"] / elapsed, 1) if elapsed > 0 else 0.0
+
+        logger.info(
+            f"Ingested {report['rows_written']} readings for {report['meters']} meters "
+            f"({report['rows_rejected']} rejected, {report['duplicates_dropped']} duplicates) "
+            f"in {report['elapsed_seconds']}s, {report['rows_per_second']} rows/s"
+        )
+        return report
+
+    # Writes
+
+    def write(self, batch: ReadingBatch) -> None:
+        """
+        Persist a validated, deduplicated batch and commit
+
+        The table is written first; the meter store, rolling baselines and
+        live sessions are only updated once the batch is durable. Live
+        trackers and rolling baselines in other processes are notified by
+        the same commit.
+        """
+        if not len(batch):
+            return
+
+        created = self._ensure_partitions(batch.timestamps_us)
+        self._copy_into_table(batch)
+        if self.live_tracker is not None or self.rolling_store is not None:
+            notify_readings(self.db, np.unique(batch.meter_ids).tolist())
+        self.db.commit()
+        # Only remember partitions once their DDL has committed
+        self._partitions.update(created)
+
+        if self.meter_store is not None:
+            for meter_id, timestamps, consumption in batch.by_meter():
+                self.meter_store.write(meter_id, timestamps, consumption)
+
+        if self.rolling_store is not None:
+            users = self._resolve_users(np.unique(batch.meter_ids).tolist())
+            for meter_id, timestamps, consumption in batch.by_meter():
+                user_id = users.get(meter_id)
+                if user_id is not None:
+                    self.rolling_store.ingest_series(
+                        user_id,
+                        ConsumptionSeries(timestamps, consumption, meter_id=meter_id)
+                    )
+
+        if self.live_tracker is not None:
+            for meter_id, timestamps, consumption in batch.by_meter():
+                self.live_tracker.ingest(meter_id, timestamps, consumption)
+
+    def _resolve_users(self, meter_ids: List[str]) -> Dict:
+        """AHK account number -> user_id for registered meters"""
+        return dict(
+            self.db.query(User.ahk_account_number, User.user_id)
+            .filter(User.ahk_account_number.in_(meter_ids))
+            .all()
+        )
+
+    def _ensure_partitions(self, timestamps_us: np.ndarray) -> List[date]:
+        """Create the monthly partitions a batch writes into, returns the months touched"""
+        months = np.unique(timestamps_us.astype("datetime64[us]").astype("datetime64[M]")).tolist()
+        for month in months:
+            if month in self._partitions:
+                continue
+            next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            self.db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS meter_reading_{month:%Y%m} "
+                f"PARTITION OF meter_reading "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            ))
+        return months
+
+    def _copy_into_table(self, batch: ReadingBatch) -> None:
+        """COPY a batch into a staging table and merge it into meter_reading"""
+        timestamps = np.datetime_as_string(batch.timestamps_us.astype("datetime64[us]"))
+        buffer = io.StringIO()
+        buffer.writelines(
+            f"{meter_id},{timestamp},{kwh:.4f}\n"
+            for meter_id, timestamp, kwh in zip(
+                batch.meter_ids.tolist(), timestamps.tolist(), batch.consumption_kwh.tolist()
+            )
+        )
+        buffer.seek(0)
+
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.execute(_CREATE_STAGE)
+            cursor.copy_expert(_COPY_STAGE, buffer)
+            cursor.execute(_MERGE_STAGE)
+            cursor.execute("TRUNCATE meter_reading_stage")
+        finally:
+            cursor.close()
@@ -0,0 +1,136 @@
+"""
+Leader Election
+
+Background jobs (nightly baseline precompute, session scheduler) must run
+in exactly one process even when the API runs with several uvicorn
+workers or replicas. Every process competes for a session-level Postgres
+advisory lock held on a dedicated connection; the holder runs the jobs and
+the others stand by, taking over when the holder exits or loses its
+connection (the lock is released with the connection).
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from typing import Callable, Coroutine, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key shared by all API processes ("PowerSav")
+BACKGROUND_JOBS_LOCK_KEY = 0x506F776572536176
+
+
+class LeaderLock:
+    """
+    Session-level Postgres advisory lock on a dedicated connection
+
+    Args:
+        engine: Engine to take the connection from
+        key: Advisory lock key
+    """
+
+    def __init__(self, engine: Engine, key: int = BACKGROUND_JOBS_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._connection: Optional[Connection] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if no other process holds it"""
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            connection.invalidate()
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def is_held(self) -> bool:
+        """Whether the lock connection is still alive"""
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        except Exception:
+            self._drop()
+            return False
+
+    def release(self) -> None:
+        """Release the lock and return the connection"""
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            self._connection.commit()
+            self._connection.close()
+        except Exception:
+            self._drop()
+        self._connection = None
+
+    def _drop(self) -> None:
+        # Discard the connection so the server ends the session and frees the lock
+        if self._connection is not None:
+            self._connection.invalidate()
+            self._connection.close()
+            self._connection = None
+
+
+async def run_as_leader(
+    lock: LeaderLock,
+    jobs: Callable[[], List[Coroutine]],
+    check_seconds: float
+) -> None:
+    """
+    Run ``jobs`` while this process holds ``lock``
+
+    Runs forever; start it as a background task on application startup and
+    cancel it on shutdown, which cancels the jobs and releases the lock.
+
+    Args:
+        lock: Lock shared by all processes
+        jobs: Creates the job coroutines each time leadership is gained
+        check_seconds: How often a standby retries the lock and the leader
+            checks that it still holds it
+    """
+    while True:
+        try:
+            acquired = await asyncio.to_thread(lock.try_acquire)
+        except Exception as e:
+            logger.error(f"Leader lock unavailable: {e}")
+            acquired = False
+
+        if not acquired:
+            await asyncio.sleep(check_seconds)
+            continue
+
+        logger.info("Acquired background jobs lock, starting jobs")
+        tasks = [asyncio.create_task(job) for job in jobs()]
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=check_seconds)
+                for task in done:
+                    tasks.remove(task)
+                    if not task.cancelled() and task.exception() is not None:
+                        logger.error(f"Background job failed: {task.exception()}")
+                if not await asyncio.to_thread(lock.is_held):
+                    logger.error("Lost background jobs lock, stopping jobs")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.to_thread(lock.release)
+
+        if not tasks:
+            # Every job finished on its own; nothing left to lead
+            return
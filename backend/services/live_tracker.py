@@ -0,0 +1,513 @@
+"""
+Live Session Tracker
+
+In-process running totals for sessions that are being watched. A session
+is seeded once when its first viewer arrives, from the host's meter store
+(a cache, for an immediate first answer) and then from meter_reading,
+which holds the readings every worker ingested; after that every ingested
+interval reading updates its total in O(1) (a dict lookup by meter and an
+integer add), and viewers are woken through an asyncio.Event instead of
+polling the database.
+
+Readings are kept per interval, so a re-sent reading replaces the earlier
+value instead of being counted twice.
+
+Each API worker has its own tracker. Ingestion sends a NOTIFY on the
+meter_readings channel in the transaction that writes the readings, and
+every worker listens on it (pg_listener, on_notify) and re-reads the readings of the
+meters it tracks from meter_reading, so a viewer is updated whichever
+worker ingested the data.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from functools import lru_cache
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import asyncio
+import uuid
+
+import numpy as np
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models.meter_reading import MeterReading
+from .consumption import from_epoch_us, to_epoch_us
+from .fixed_point import from_fixed, kwh_to_mwh, kwh_to_mwh_array, round_half_even
+from .meter_store import MeterReadingStore, get_meter_store
+from .pg_listener import MAX_PAYLOAD, notify
+
+settings = get_settings()
+
+# Postgres channel ingestion notifies on; the payload lists the meters
+READINGS_CHANNEL = "meter_readings"
+
+# Live figures are reported like the session columns: kWh to 4 dp, % to 1 dp
+_MWH_PER_KWH_COLUMN = 100
+_KWH_COLUMN_UNIT = 10_000
+_TENTHS_PER_PERCENT = 10
+
+
+class LiveSession:
+    """
+    Running consumption of one session
+
+    Attributes:
+        session_id: Saving session
+        meter_id: AHK account number of the session's user
+        start_us / end_us: Session window, epoch microseconds
+        baseline_mwh: Baseline for the whole window
+        consumed_mwh: Sum of the readings inside the window
+        covered_us: Time covered by the intervals that have a reading
+        covered_until_us: End of the latest interval with a reading
+        version: Bumped on every change
+    """
+
+    __slots__ = (
+        "session_id", "meter_id", "start_us", "end_us", "baseline_mwh",
+        "interval_us", "readings", "consumed_mwh", "covered_us", "covered_until_us", "version"
+    )
+
+    def __init__(
+        self,
+        session_id: uuid.UUID,
+        meter_id: str,
+        start: datetime,
+        end: datetime,
+        baseline_kwh,
+        interval_us: int
+    ):
+        self.session_id = session_id
+        self.meter_id = meter_id
+        self.start_us = to_epoch_us(start)
+        self.end_us = to_epoch_us(end)
+        self.baseline_mwh = kwh_to_mwh(baseline_kwh)
+        self.interval_us = interval_us
+        self.readings: Dict[int, int] = {}
+        self.consumed_mwh = 0
+        self.covered_us = 0
+        self.covered_until_us = self.start_us
+        self.version = 0
+
+    def apply(self, timestamp_us: int, mwh: int) -> bool:
+        """
+        Add (or replace) one interval reading
+
+        Returns:
+            False if the reading is outside the window or already applied
+        """
+        if not self.start_us <= timestamp_us < self.end_us:
+            return False
+        previous = self.readings.get(timestamp_us)
+        if previous == mwh:
+            return False
+        interval_end_us = min(timestamp_us + self.interval_us, self.end_us)
+        if previous is None:
+            self.covered_us += interval_end_us - timestamp_us
+        self.consumed_mwh += mwh - (previous or 0)
+        self.readings[timestamp_us] = mwh
+        self.covered_until_us = max(self.covered_until_us, interval_end_us)
+        self.version += 1
+        return True
+
+    @property
+    def complete(self) -> bool:
+        """Readings cover the whole window"""
+        return self.covered_us >= self.end_us - self.start_us
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Savings so far against the baseline pro-rated to the covered time
+
+        Only intervals that have a reading count, so a missing reading
+        before the latest one does not count as saved energy.
+
+        Returns:
+            Dictionary with consumed, pro-rated baseline and saved kWh, the
+            savings percentage and how far the readings reach
+        """
+        prorated_mwh = round_half_even(self.baseline_mwh * self.covered_us, self.end_us - self.start_us)
+        saved_mwh = prorated_mwh - self.consumed_mwh
+        percentage = (
+            round_half_even(saved_mwh * 100 * _TENTHS_PER_PERCENT, prorated_mwh)
+            if prorated_mwh > 0 else 0
+        )
+
+        def kwh(mwh: int):
+            return from_fixed(round_half_even(mwh, _MWH_PER_KWH_COLUMN), _KWH_COLUMN_UNIT)
+
+        return {
+            "session_id": self.session_id,
+            "consumed_kwh": kwh(self.consumed_mwh),
+            "baseline_kwh": kwh(self.baseline_mwh),
+            "prorated_baseline_kwh": kwh(prorated_mwh),
+            "saved_kwh": kwh(saved_mwh),
+            "savings_percentage": from_fixed(percentage, _TENTHS_PER_PERCENT),
+            "covered_until": from_epoch_us(self.covered_until_us) if self.readings else None,
+            "complete": self.complete,
+        }
+
+
+class LiveSessionTracker:
+    """
+    Watched sessions indexed by meter, with async subscribers
+
+    ingest() is called from ingestion worker threads and the listener;
+    subscribers live on the event loop and are woken with
+    call_soon_threadsafe.
+
+    Args:
+        meter_store: Local cache used to seed a session's readings when it
+            is first tracked
+        interval_minutes: Length of one interval reading
+        session_factory: Creates the database session a newly tracked
+            session is seeded from
+    """
+
+    def __init__(
+        self,
+        meter_store: Optional[MeterReadingStore] = None,
+        interval_minutes: Optional[int] = None,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        self.meter_store = meter_store
+        self.session_factory = session_factory
+        minutes = interval_minutes or settings.LIVE_READING_INTERVAL_MINUTES
+        self.interval_us = minutes * 60_000_000
+
+        self._sessions: Dict[uuid.UUID, LiveSession] = {}
+        self._by_meter: Dict[str, List[LiveSession]] = {}
+        self._subscribers: Dict[uuid.UUID, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = Lock()
+        self.readings_applied = 0
+        # DB time up to which readings ingested by any process have been applied
+        self._caught_up_through: Optional[datetime] = None
+
+    def track(
+        self,
+        session_id: uuid.UUID,
+        meter_id: str,
+        start: datetime,
+        end: datetime,
+        baseline_kwh
+    ) -> LiveSession:
+        """
+        Start tracking a session (no-op if already tracked)
+
+        Readings already stored are loaded once (see load); later readings
+        arrive through ingest().
+        """
+        with self._lock:
+            live, created = self._track(session_id, meter_id, start, end, baseline_kwh)
+        if created:
+            self.load(live)
+        return live
+
+    def _track(self, session_id, meter_id, start, end, baseline_kwh) -> Tuple[LiveSession, bool]:
+        """Tracked session, and whether it was just created (and still needs load)"""
+        live = self._sessions.get(session_id)
+        if live is not None:
+            return live, False
+
+        live = self._seeded(session_id, meter_id, start, end, baseline_kwh)
+
+        self._sessions[session_id] = live
+        self._by_meter.setdefault(meter_id, []).append(live)
+        return live, True
+
+    def current(
+        self,
+        session_id: uuid.UUID,
+        meter_id: str,
+        start: datetime,
+        end: datetime,
+        baseline_kwh
+    ) -> Dict[str, Any]:
+        """
+        Snapshot of a session without subscribing
+
+        Tracked sessions answer from memory; others are read from the
+        stored readings without being tracked (blocking; call it from a
+        worker thread).
+        """
+        live = self._sessions.get(session_id)
+        if live is None:
+            live = self._seeded(session_id, meter_id, start, end, baseline_kwh)
+            self._apply(live, *self._stored(live))
+        return live.snapshot()
+
+    def untrack(self, session_id: uuid.UUID) -> None:
+        """Stop tracking a session and release its readings"""
+        with self._lock:
+            live = self._sessions.pop(session_id, None)
+            if live is None:
+                return
+            watched = self._by_meter.get(live.meter_id, [])
+            watched[:] = [other for other in watched if other.session_id != session_id]
+            if not watched:
+                self._by_meter.pop(live.meter_id, None)
+            subscribers = self._subscribers.pop(session_id, set())
+        # Wake viewers so their streams can end
+        for loop, event in subscribers:
+            loop.call_soon_threadsafe(event.set)
+
+    def get(self, session_id: uuid.UUID) -> Optional[LiveSession]:
+        """Tracked session, if any"""
+        return self._sessions.get(session_id)
+
+    def _seeded(self, session_id, meter_id, start, end, baseline_kwh) -> LiveSession:
+        """New session state with the readings already in this host's meter store"""
+        live = LiveSession(session_id, meter_id, start, end, baseline_kwh, self.interval_us)
+        if self.meter_store is not None:
+            series = self.meter_store.load_series(meter_id, start, end)
+            self._apply(live, series.timestamps, series.consumption_kwh)
+        return live
+
+    def _stored(self, live: LiveSession) -> Tuple[np.ndarray, np.ndarray]:
+        """Readings of the session's window in meter_reading, from any worker"""
+        if self.session_factory is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(MeterReading.reading_at, MeterReading.consumption_kwh).where(
+                    MeterReading.meter_id == live.meter_id,
+                    MeterReading.reading_at >= from_epoch_us(live.start_us),
+                    MeterReading.reading_at < from_epoch_us(live.end_us)
+                )
+            ).all()
+        finally:
+            db.close()
+
+        timestamps = np.fromiter((to_epoch_us(reading_at) for reading_at, _ in rows), dtype=np.int64, count=len(rows))
+        consumption = np.fromiter((float(kwh) for _, kwh in rows), dtype=np.float64, count=len(rows))
+        return timestamps, consumption
+
+    def load(self, live: LiveSession) -> int:
+        """
+        Apply the readings meter_reading holds for a newly tracked session
+
+        The meter store only has what this host ingested; the table also
+        has what other workers and hosts ingested, including before this
+        process started, which catch_up (reading only newer rows) would
+        never see. Blocking; the async paths run it in a worker thread.
+
+        Returns:
+            Number of readings that changed the session
+        """
+        return self.ingest(live.meter_id, *self._stored(live))
+
+    def _apply(self, live: LiveSession, timestamps_us: np.ndarray, consumption_kwh: np.ndarray) -> int:
+        applied = 0
+        for timestamp, mwh in zip(timestamps_us.tolist(), kwh_to_mwh_array(consumption_kwh).tolist()):
+            applied += live.apply(timestamp, mwh)
+        return applied
+
+    def ingest(self, meter_id: str, timestamps_us: np.ndarray, consumption_kwh: np.ndarray) -> int:
+        """
+        Apply newly ingested readings of one meter
+
+        Meters without a tracked session cost one dict lookup.
+
+        Returns:
+            Number of readings that changed a tracked session
+        """
+        if meter_id not in self._by_meter:
+            return 0
+
+        woken = []
+        applied = 0
+        with self._lock:
+            for live in self._by_meter.get(meter_id, []):
+                changed = self._apply(live, timestamps_us, consumption_kwh)
+                if changed:
+                    applied += changed
+                    woken.extend(self._subscribers.get(live.session_id, ()))
+            self.readings_applied += applied
+
+        for loop, event in woken:
+            loop.call_soon_threadsafe(event.set)
+        return applied
+
+    def subscribe(self, session_id: uuid.UUID, keepalive: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Snapshots of a tracked session as they change
+
+        Yields the current snapshot first, then one per change, and None
+        after ``keepalive`` seconds without a change. Ends once readings
+        cover the whole window or the session is untracked; the session is
+        untracked when its last viewer leaves.
+        """
+        return self._follow(session_id, keepalive)
+
+    def watch(
+        self,
+        session_id: uuid.UUID,
+        meter_id: str,
+        start: datetime,
+        end: datetime,
+        baseline_kwh,
+        keepalive: float
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Track a session and subscribe to it in one step
+
+        Same stream as subscribe(). Tracking and subscribing happen under
+        one lock, so another viewer leaving in between cannot untrack the
+        session before this viewer is registered.
+        """
+        return self._follow(session_id, keepalive, track=(meter_id, start, end, baseline_kwh))
+
+    async def _follow(
+        self,
+        session_id: uuid.UUID,
+        keepalive: float,
+        track: Optional[Tuple] = None
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        created = False
+        with self._lock:
+            if track is not None:
+                live, created = self._track(session_id, *track)
+            elif session_id not in self._sessions:
+                return
+            self._subscribers.setdefault(session_id, set()).add(subscriber)
+
+        try:
+            if created:
+                await asyncio.to_thread(self.load, live)
+
+            version = None
+            while True:
+                # Clear before reading, so a reading applied meanwhile wakes us
+                subscriber[1].clear()
+                live = self._sessions.get(session_id)
+                if live is None:
+                    return
+                if live.version != version:
+                    version = live.version
+                    yield live.snapshot()
+                    if live.complete:
+                        return
+
+                try:
+                    await asyncio.wait_for(subscriber[1].wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                remaining = self._subscribers.get(session_id)
+                if remaining is not None:
+                    remaining.discard(subscriber)
+                last = not remaining
+            if last:
+                self.untrack(session_id)
+
+    # Readings ingested by other processes
+
+    def catch_up(self, db: Session, overlap_seconds: Optional[int] = None) -> int:
+        """
+        Apply readings of tracked meters ingested since the last catch-up
+
+        Reads meter_reading for the windows of the tracked sessions only.
+        After the first call, only rows whose ingested_at is newer than
+        the previous catch-up are read, minus an overlap for ingestion
+        transactions that were still open; re-applied readings change
+        nothing.
+
+        Args:
+            db: Database session
+            overlap_seconds: Overlap with the previous catch-up (defaults
+                to LIVE_CATCH_UP_OVERLAP_SECONDS)
+
+        Returns:
+            Number of readings that changed a tracked session
+        """
+        if overlap_seconds is None:
+            overlap_seconds = settings.LIVE_CATCH_UP_OVERLAP_SECONDS
+
+        # Same clock and type as the ingested_at default
+        started = db.execute(select(func.localtimestamp())).scalar()
+
+        with self._lock:
+            windows = [(live.meter_id, live.start_us, live.end_us) for live in self._sessions.values()]
+        if not windows:
+            self._caught_up_through = started
+            return 0
+
+        query = select(
+            MeterReading.meter_id, MeterReading.reading_at, MeterReading.consumption_kwh
+        ).where(
+            MeterReading.meter_id.in_({meter_id for meter_id, _, _ in windows}),
+            MeterReading.reading_at >= from_epoch_us(min(start_us for _, start_us, _ in windows)),
+            MeterReading.reading_at < from_epoch_us(max(end_us for _, _, end_us in windows))
+        ).order_by(MeterReading.meter_id)
+        if self._caught_up_through is not None:
+            query = query.where(
+                MeterReading.ingested_at > self._caught_up_through - timedelta(seconds=overlap_seconds)
+            )
+
+        by_meter: Dict[str, Tuple[List[int], List[float]]] = {}
+        for meter_id, reading_at, consumption_kwh in db.execute(query):
+            timestamps, consumption = by_meter.setdefault(meter_id, ([], []))
+            timestamps.append(to_epoch_us(reading_at))
+            consumption.append(float(consumption_kwh))
+
+        applied = sum(
+            self.ingest(meter_id, np.array(timestamps, dtype=np.int64), np.array(consumption))
+            for meter_id, (timestamps, consumption) in by_meter.items()
+        )
+        self._caught_up_through = started
+        return applied
+
+    def concerns(self, payloads: Iterable[str]) -> bool:
+        """Whether notification payloads may carry readings of a tracked meter"""
+        for payload in payloads:
+            if not payload:
+                return True
+            if any(meter_id in self._by_meter for meter_id in payload.split(",")):
+                return True
+        return False
+
+    async def on_notify(self, engine: Engine, payloads: Optional[List[str]]) -> None:
+        """
+        pg_listener handler for READINGS_CHANNEL
+
+        Catches up in a worker thread when a notification names a tracked
+        meter, or when notifications may have been missed.
+        """
+        if payloads is None or self.concerns(payloads):
+            await asyncio.to_thread(self._catch_up, engine)
+
+    def _catch_up(self, engine: Engine) -> None:
+        with Session(engine) as db:
+            self.catch_up(db)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tracked sessions and viewers"""
+        return {
+            "sessions": len(self._sessions),
+            "meters": len(self._by_meter),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "readings_applied": self.readings_applied,
+        }
+
+
+def notify_readings(db: Session, meter_ids: Sequence[str]) -> None:
+    """
+    Tell every process's tracker that readings of ``meter_ids`` were written
+
+    Call it in the transaction that writes them: Postgres delivers the
+    notification on commit, and drops it on rollback.
+    """
+    payload = ",".join(meter_ids)
+    # An empty payload means "any meter"
+    notify(db, READINGS_CHANNEL, payload if len(payload) <= MAX_PAYLOAD else "")
+
+
+@lru_cache()
+def get_live_tracker() -> LiveSessionTracker:
+    """Get the process-wide live session tracker"""
+    return LiveSessionTracker(meter_store=get_meter_store(), session_factory=SessionLocal)
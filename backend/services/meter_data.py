@@ -0,0 +1,200 @@
+"""
+Meter Data Service
+
+Source of historical consumption for baseline calculation. METER_DATA_SOURCE
+selects the AHK API ("ahk") or deterministic synthetic load profiles for
+local development and load tests ("synthetic"). AHK history is served
+through the on-disk history cache when enabled.
+"""
+from sqlalchemy.orm import Session, object_session
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, List, Optional, Sequence, Tuple
+import asyncio
+
+import numpy as np
+
+from ..config import get_settings
+from ..models.saving_session import SavingSession
+from ..models.user import User
+from .ahk_meter import get_ahk_meter_service
+from .baseline import HistoricalData, _as_series
+from .consumption import to_epoch_us, US_PER_MINUTE
+from .fixed_point import from_fixed, to_fixed
+from .history_cache import get_history_cache
+from .synthetic import get_synthetic_generator
+
+settings = get_settings()
+
+CohortLoader = Callable[[Sequence[SavingSession]], List[HistoricalData]]
+ConsumptionLoader = Callable[[Sequence[SavingSession]], List[Optional[Decimal]]]
+
+# actual_kwh is stored as DECIMAL(10, 4)
+_KWH_COLUMN_UNIT = 10_000
+
+
+class MeterDataService:
+    """
+    Historical consumption lookup
+    """
+
+    @staticmethod
+    def _lookback(sessions: Sequence[SavingSession]) -> Tuple[datetime, datetime]:
+        """History window covering the baseline of every session"""
+        starts = [session.scheduled_start for session in sessions]
+        return min(starts) - timedelta(days=settings.BASELINE_CALCULATION_DAYS), max(starts)
+
+    @staticmethod
+    def _accounts(db: Session, sessions: Sequence[SavingSession]) -> List[Optional[str]]:
+        """AHK account number per session, in one query"""
+        user_ids = {session.user_id for session in sessions}
+        accounts = dict(
+            db.query(User.user_id, User.ahk_account_number)
+            .filter(User.user_id.in_(user_ids))
+            .all()
+        )
+        return [accounts.get(session.user_id) for session in sessions]
+
+    @staticmethod
+    def _synthetic(accounts: Sequence[Optional[str]], start: datetime, end: datetime) -> List[HistoricalData]:
+        """Synthetic history per account, generated as one matrix"""
+        known = [account for account in accounts if account]
+        histories = dict(zip(known, get_synthetic_generator().series(known, start, end)))
+        return [histories.get(account) or [] for account in accounts]
+
+    @staticmethod
+    async def _fetch(
+        accounts: Sequence[Optional[str]],
+        start: datetime,
+        end: datetime
+    ) -> List[HistoricalData]:
+        source = get_history_cache() if settings.HISTORY_CACHE_ENABLED else get_ahk_meter_service()
+        histories = await source.get_histories(
+            [account for account in accounts if account], start, end
+        )
+        return [histories.get(account) or [] for account in accounts]
+
+    @staticmethod
+    async def get_histories(db: Session, sessions: Sequence[SavingSession]) -> List[HistoricalData]:
+        """
+        Consumption history for each session's user
+
+        With the AHK source all meters are fetched concurrently over the
+        pooled client; users without history get an empty list.
+
+        Args:
+            db: Database session
+            sessions: Sessions needing a baseline
+
+        Returns:
+            One history per session, in order
+        """
+        if not sessions:
+            return []
+
+        accounts = MeterDataService._accounts(db, sessions)
+        start, end = MeterDataService._lookback(sessions)
+        if settings.METER_DATA_SOURCE == "synthetic":
+            return MeterDataService._synthetic(accounts, start, end)
+        return await MeterDataService._fetch(accounts, start, end)
+
+    @staticmethod
+    def _load_blocking(
+        loop: asyncio.AbstractEventLoop,
+        sessions: Sequence[SavingSession],
+        start: datetime,
+        end: datetime
+    ) -> List[HistoricalData]:
+        """History per session in [start, end), waiting from a worker thread"""
+        # Resolve accounts in this thread, on the sessions' own DB session
+        accounts = MeterDataService._accounts(object_session(sessions[0]), sessions)
+        if settings.METER_DATA_SOURCE == "synthetic":
+            return MeterDataService._synthetic(accounts, start, end)
+        return asyncio.run_coroutine_threadsafe(
+            MeterDataService._fetch(accounts, start, end), loop
+        ).result()
+
+    @staticmethod
+    def _session_consumption(
+        sessions: Sequence[SavingSession],
+        histories: Sequence[HistoricalData],
+        interval_minutes: Optional[int] = None
+    ) -> List[Optional[Decimal]]:
+        """
+        Metered kWh inside each session window
+
+        A session is only measured once every interval of its window has a
+        reading; a gap would count as zero consumption and inflate savings.
+
+        Args:
+            sessions: Ended sessions
+            histories: Readings per session
+            interval_minutes: Reading interval (defaults to
+                METER_READING_INTERVAL_MINUTES)
+
+        Returns:
+            kWh per session, None while any interval is missing
+        """
+        interval_us = (interval_minutes or settings.METER_READING_INTERVAL_MINUTES) * US_PER_MINUTE
+        results: List[Optional[Decimal]] = []
+        for session, history in zip(sessions, histories):
+            series = _as_series(history)
+            start_us = to_epoch_us(session.scheduled_start)
+            end_us = to_epoch_us(session.scheduled_end)
+            expected = -(-(end_us - start_us) // interval_us)
+            first, last = np.searchsorted(series.timestamps, [start_us, end_us], side="left")
+            if last - first < expected:
+                results.append(None)
+                continue
+            kwh = series.window_sum(session.scheduled_start, session.scheduled_end)
+            results.append(from_fixed(to_fixed(kwh, _KWH_COLUMN_UNIT), _KWH_COLUMN_UNIT))
+        return results
+
+    @staticmethod
+    def cohort_loader(loop: asyncio.AbstractEventLoop) -> CohortLoader:
+        """
+        Blocking history loader for code running in worker threads
+
+        The AHK client lives on the application's event loop, so fetches
+        are scheduled there and the calling thread waits for the results.
+
+        Args:
+            loop: The running application event loop
+
+        Returns:
+            Callable mapping a cohort of sessions to their histories
+        """
+        def load(sessions: Sequence[SavingSession]) -> List[HistoricalData]:
+            if not sessions:
+                return []
+            start, end = MeterDataService._lookback(sessions)
+            return MeterDataService._load_blocking(loop, sessions, start, end)
+
+        return load
+
+    @staticmethod
+    def consumption_loader(loop: asyncio.AbstractEventLoop) -> ConsumptionLoader:
+        """
+        Blocking loader of metered consumption during each session
+
+        Used to settle sessions automatically once they have ended.
+
+        Args:
+            loop: The running application event loop
+
+        Returns:
+            Callable mapping sessions to their actual kWh (None where the
+            meter data does not cover the session yet)
+        """
+        def load(sessions: Sequence[SavingSession]) -> List[Optional[Decimal]]:
+            if not sessions:
+                return []
+            histories = MeterDataService._load_blocking(
+                loop,
+                sessions,
+                min(session.scheduled_start for session in sessions),
+                max(session.scheduled_end for session in sessions)
+            )
+            return MeterDataService._session_consumption(sessions, histories)
+
+        return load
@@ -0,0 +1,281 @@
+"""
+Meter Reading Store
+
+Local columnar store of per-meter interval data. Each meter has one
+directory with a segment file per day (or month). A segment holds N
+readings as two fixed-width columns stored back to back:
+
+    <root>/<meter_id>/<segment>.seg
+        bytes [0, 8N)      int64 epoch microseconds, ascending
+        bytes [8N, 12N)    float32 kWh per interval
+
+Reads go through numpy.memmap, so loading weeks of history maps the files
+instead of parsing or copying them, and every worker process on the host
+shares the same page cache.
+"""
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+import fcntl
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+
+from ..config import get_settings
+from .consumption import ConsumptionSeries, to_epoch_us, US_PER_DAY
+
+settings = get_settings()
+
+_METER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+$")
+_EPOCH_DAY = np.datetime64("1970-01-01", "D")
+
+
+class MeterReadingStore:
+    """
+    Columnar segment files with memory-mapped reads
+
+    Args:
+        root: Directory holding one sub-directory per meter
+        segment: "day" or "month" segment granularity
+    """
+
+    def __init__(self, root: str, segment: str = "day"):
+        if segment not in ("day", "month"):
+            raise ValueError("segment must be 'day' or 'month'")
+        self.root = root
+        self.segment = segment
+
+    # Paths
+
+    def _meter_dir(self, meter_id: str) -> str:
+        if not _METER_ID_PATTERN.match(meter_id):
+            raise ValueError(f"Invalid meter id {meter_id!r}")
+        return os.path.join(self.root, meter_id)
+
+    def segment_name(self, day: date) -> str:
+        """Segment file stem holding readings for ``day``"""
+        if self.segment == "month":
+            return day.strftime("%Y%m")
+        return day.strftime("%Y%m%d")
+
+    def _segment_path(self, meter_id: str, name: str) -> str:
+        return os.path.join(self._meter_dir(meter_id), name + ".seg")
+
+    def _segment_names(self, start: date, end: date) -> List[str]:
+        """Segment names covering [start, end] (inclusive days)"""
+        names: List[str] = []
+        day = start
+        while day <= end:
+            name = self.segment_name(day)
+            if not names or names[-1] != name:
+                names.append(name)
+            day += timedelta(days=1)
+        return names
+
+    def meter_ids(self) -> List[str]:
+        """Meters with a directory in the store"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return [
+            name for name in names
+            if _METER_ID_PATTERN.match(name) and os.path.isdir(os.path.join(self.root, name))
+        ]
+
+    def _segment_files(self, meter_id: str) -> List[str]:
+        try:
+            names = os.listdir(self._meter_dir(meter_id))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith(".seg"))
+
+    def meter_size(self, meter_id: str) -> int:
+        """Bytes stored for a meter"""
+        size = 0
+        for name in self._segment_files(meter_id):
+            try:
+                size += os.path.getsize(self._segment_path(meter_id, name))
+            except FileNotFoundError:
+                pass
+        return size
+
+    # Writes
+
+    def write(self, meter_id: str, timestamps_us: np.ndarray, consumption_kwh: np.ndarray) -> int:
+        """
+        Merge readings into the meter's segments
+
+        Readings for an existing (meter, timestamp) replace the stored value.
+        Each segment is rewritten to a temporary file and swapped in with an
+        atomic rename, so readers never see a partial segment; readers that
+        already mapped the old file keep a consistent view of it. Writers
+        of the same meter, in any thread or process, take turns on the
+        meter's lock file, so none of them merges into a segment another
+        is replacing.
+
+        Args:
+            meter_id: Meter / AHK account identifier
+            timestamps_us: int64 epoch microseconds
+            consumption_kwh: kWh per interval
+
+        Returns:
+            Number of readings written
+        """
+        timestamps_us = np.asarray(timestamps_us, dtype=np.int64)
+        consumption_kwh = np.asarray(consumption_kwh, dtype=np.float32)
+        if not len(timestamps_us):
+            return 0
+
+        os.makedirs(self._meter_dir(meter_id), exist_ok=True)
+
+        days = (timestamps_us // US_PER_DAY).astype("datetime64[D]").astype(date)
+        segment_names = np.array([self.segment_name(day) for day in days])
+
+        with self._locked(meter_id):
+            for name in np.unique(segment_names):
+                mask = segment_names == name
+                new_ts = timestamps_us[mask]
+                new_kwh = consumption_kwh[mask]
+
+                existing = self._read_segment(meter_id, name)
+                if existing is not None:
+                    new_ts = np.concatenate([existing[0], new_ts])
+                    new_kwh = np.concatenate([existing[1], new_kwh])
+
+                # Keep the last value written for every timestamp
+                order = np.argsort(new_ts, kind="stable")
+                new_ts = new_ts[order]
+                new_kwh = new_kwh[order]
+                last = np.append(new_ts[1:] != new_ts[:-1], True)
+
+                self._write_segment(meter_id, name, new_ts[last], new_kwh[last])
+
+        return len(timestamps_us)
+
+    @contextmanager
+    def _locked(self, meter_id: str) -> Iterator[None]:
+        """Exclusive lock on a meter's segments, across threads and processes"""
+        # flock belongs to the open file, so every caller opens its own
+        with open(os.path.join(self._meter_dir(meter_id), ".lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def _write_segment(self, meter_id: str, name: str, timestamps_us: np.ndarray, consumption_kwh: np.ndarray) -> None:
+        path = self._segment_path(meter_id, name)
+        descriptor, temporary = tempfile.mkstemp(dir=self._meter_dir(meter_id), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as handle:
+                handle.write(timestamps_us.astype("<i8").tobytes())
+                handle.write(consumption_kwh.astype("<f4").tobytes())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def delete_meter(self, meter_id: str) -> None:
+        """Remove every segment of a meter"""
+        shutil.rmtree(self._meter_dir(meter_id), ignore_errors=True)
+
+    def drop_segments_before(self, meter_id: str, day: date) -> None:
+        """Remove a meter's segments that end before ``day``"""
+        cutoff = self.segment_name(day)
+        names = [name for name in self._segment_files(meter_id) if name < cutoff]
+        if not names:
+            return
+        with self._locked(meter_id):
+            for name in names:
+                try:
+                    os.remove(self._segment_path(meter_id, name))
+                except FileNotFoundError:
+                    pass
+
+    # Reads
+
+    def _read_segment(self, meter_id: str, name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Memory-map one segment, None if it does not exist or is empty"""
+        path = self._segment_path(meter_id, name)
+        try:
+            count = os.path.getsize(path) // 12
+        except FileNotFoundError:
+            return None
+        if count == 0:
+            return None
+
+        timestamps = np.memmap(path, dtype="<i8", mode="r", shape=(count,))
+        consumption = np.memmap(path, dtype="<f4", mode="r", offset=8 * count, shape=(count,))
+        return timestamps, consumption
+
+    def segments(
+        self,
+        meter_id: str,
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Zero-copy column views for readings in [start, end)
+
+        Args:
+            meter_id: Meter / AHK account identifier
+            start: Window start (inclusive, naive UTC)
+            end: Window end (exclusive, naive UTC)
+
+        Returns:
+            (timestamps, kWh) memmap views per segment, in time order
+        """
+        start_us = to_epoch_us(start)
+        end_us = to_epoch_us(end)
+        views = []
+
+        last_day = (end - timedelta(microseconds=1)).date()
+        for name in self._segment_names(start.date(), last_day):
+            segment = self._read_segment(meter_id, name)
+            if segment is None:
+                continue
+            timestamps, consumption = segment
+            lower, upper = np.searchsorted(timestamps, [start_us, end_us], side="left")
+            if upper > lower:
+                views.append((timestamps[lower:upper], consumption[lower:upper]))
+
+        return views
+
+    def load_series(self, meter_id: str, start: datetime, end: datetime) -> ConsumptionSeries:
+        """
+        History for a meter as a ConsumptionSeries
+
+        The column files are mapped, not parsed; the only pass over the data
+        is building the prefix-sum index.
+        """
+        views = self.segments(meter_id, start, end)
+        if not views:
+            return ConsumptionSeries(np.empty(0, dtype=np.int64), np.empty(0), meter_id=meter_id)
+
+        return ConsumptionSeries(
+            np.concatenate([timestamps for timestamps, _ in views]),
+            np.concatenate([consumption for _, consumption in views]),
+            meter_id=meter_id
+        )
+
+    def days_present(self, meter_id: str, start: date, end: date) -> List[date]:
+        """Days in [start, end] that have at least one stored reading"""
+        present = []
+        for name in self._segment_names(start, end):
+            segment = self._read_segment(meter_id, name)
+            if segment is None:
+                continue
+            days = np.unique(segment[0] // US_PER_DAY)
+            present.extend(
+                day for day in (_EPOCH_DAY + days).astype(date).tolist()
+                if start <= day <= end
+            )
+        return present
+
+
+@lru_cache()
+def get_meter_store() -> MeterReadingStore:
+    """Get the process-wide meter reading store"""
+    return MeterReadingStore(settings.METER_STORE_PATH, settings.METER_STORE_SEGMENT)
@@ -0,0 +1,103 @@
+"""
+Postgres LISTEN/NOTIFY
+
+Per-process state (live session totals, cached user stats) is kept in
+step across API workers with notifications: the writer NOTIFYs in the
+transaction that changes the data, so the notification is delivered on
+commit and dropped on rollback, and every process LISTENs on one
+dedicated connection and hands the payloads to a handler per channel.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay under 8000 bytes
+MAX_PAYLOAD = 7900
+
+# Called with the payloads received on its channel, or with None when
+# notifications may have been missed (first connection and reconnects)
+Handler = Callable[[Optional[List[str]]], Awaitable[None]]
+
+
+def notify(db: Session, channel: str, payload: str = "") -> None:
+    """NOTIFY ``channel`` when ``db``'s transaction commits"""
+    db.execute(select(func.pg_notify(channel, payload)))
+
+
+def notify_values(db: Session, channel: str, values: Iterable[str]) -> None:
+    """NOTIFY comma-separated ``values``, split over as many payloads as needed"""
+    payload = ""
+    for value in values:
+        if payload and len(payload) + 1 + len(value) > MAX_PAYLOAD:
+            notify(db, channel, payload)
+            payload = ""
+        payload = f"{payload},{value}" if payload else value
+    if payload:
+        notify(db, channel, payload)
+
+
+def _listening_connection(engine: Engine, channels: Iterable[str]):
+    """Pool connection in autocommit mode LISTENing on ``channels``"""
+    connection = engine.raw_connection()
+    try:
+        connection.driver_connection.autocommit = True
+        cursor = connection.cursor()
+        for channel in channels:
+            cursor.execute(f"LISTEN {channel}")
+        cursor.close()
+    except Exception:
+        connection.invalidate()
+        raise
+    return connection
+
+
+async def listen(engine: Engine, handlers: Dict[str, Handler], retry_seconds: float = 5) -> None:
+    """
+    Dispatch notifications to ``handlers`` until cancelled
+
+    Start it as a background task in every API process. Each handler is
+    first called with None once LISTEN is in place, and again after every
+    reconnect, so it can catch up on what it may have missed.
+
+    Args:
+        engine: Engine to take the listening connection from
+        handlers: Handler per channel
+        retry_seconds: Wait before reconnecting after a failure
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            connection = await asyncio.to_thread(_listening_connection, engine, handlers)
+        except Exception as e:
+            logger.error(f"Notification listener unavailable: {e}")
+            await asyncio.sleep(retry_seconds)
+            continue
+
+        dbapi = connection.driver_connection
+        woken = asyncio.Event()
+        loop.add_reader(dbapi, woken.set)
+        try:
+            for handler in handlers.values():
+                await handler(None)
+            while True:
+                await woken.wait()
+                woken.clear()
+                dbapi.poll()
+                received: Dict[str, List[str]] = {}
+                for notification in dbapi.notifies:
+                    received.setdefault(notification.channel, []).append(notification.payload)
+                dbapi.notifies.clear()
+                for channel, payloads in received.items():
+                    await handlers[channel](payloads)
+        except Exception as e:
+            logger.error(f"Notification listener failed: {e}")
+        finally:
+            loop.remove_reader(dbapi)
+            # The connection is in autocommit and LISTENing; never pool it
+            connection.invalidate()
+        await asyncio.sleep(retry_seconds)
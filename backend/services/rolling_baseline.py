@@ -0,0 +1,309 @@
+"""
+Rolling Baseline Service
+
+Streaming baseline state maintained as meter readings arrive. For every
+user and tracked time-of-day slot a ring buffer holds the slot's total
+consumption for each of the most recent days, so ingesting a reading is
+O(1) and a session start only has to read back at most a few weeks of
+daily totals instead of recomputing them from raw data.
+
+Readings are kept per interval, so a re-sent or corrected reading replaces
+the earlier value exactly like the ON CONFLICT merge into meter_reading.
+The state is a per-process copy of meter_reading: each process rebuilds it
+from the table once and then catches up on readings ingested by other
+processes (sync) whenever ingestion NOTIFYs the meter_readings channel, so
+every API worker reads the same baselines without querying the table on
+the session start path.
+"""
+from sqlalchemy import BigInteger, func, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import uuid
+
+import numpy as np
+
+from ..config import get_settings
+from ..models.meter_reading import MeterReading
+from ..models.user import User
+from .baseline import BaselineService
+from .consumption import ConsumptionSeries, to_epoch_us, US_PER_HOUR, US_PER_DAY
+from .fixed_point import kwh_to_mwh, mwh_to_kwh
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (seconds after midnight, duration in hours)
+SlotKey = Tuple[int, int]
+
+
+def slot_key(session_start: datetime, session_duration_hours: int) -> SlotKey:
+    """Slot key for a session window"""
+    offset = session_start.hour * 3600 + session_start.minute * 60 + session_start.second
+    if session_start.microsecond:
+        # Slots are whole seconds; a fractional start never matches one
+        return (-1, session_duration_hours)
+    return (offset, session_duration_hours)
+
+
+class RollingBaselineState:
+    """
+    Ring buffer of daily slot readings (mWh) for one user and slot
+
+    Position ``day % history_days`` holds the readings of ``day`` (days
+    counted since the epoch, aligned to the slot start), keyed by interval
+    start. Readings for a day older than the one currently stored at its
+    position are dropped.
+    """
+
+    __slots__ = ("days", "readings")
+
+    def __init__(self, history_days: int):
+        self.days: List[int] = [-1] * history_days
+        self.readings: List[Dict[int, int]] = [{} for _ in range(history_days)]
+
+    def add(self, day: int, timestamp_us: int, mwh: int) -> bool:
+        """
+        Set the reading for one interval of ``day``, replacing a previous value
+
+        Returns:
+            False if the day has already rotated out of the buffer
+        """
+        position = day % len(self.days)
+        stored_day = self.days[position]
+
+        if stored_day != day:
+            if day < stored_day:
+                return False
+            self.days[position] = day
+            self.readings[position] = {}
+
+        self.readings[position][timestamp_us] = mwh
+        return True
+
+    def total(self, day: int) -> int:
+        """Slot total for ``day`` in mWh, 0 if no readings are held for it"""
+        position = day % len(self.days)
+        if self.days[position] != day:
+            return 0
+        return sum(self.readings[position].values())
+
+
+class RollingBaselineStore:
+    """
+    Per-user rolling baseline state for a fixed set of time-of-day slots
+
+    Supports the 10-day average and same-weekday methods of
+    BaselineService; the outlier-removal rule is applied when a baseline is
+    read, exactly as BaselineService does on freshly computed windows.
+    """
+
+    def __init__(self, slots: Iterable[Tuple[time, int]], weeks_back: int = 4):
+        self.weeks_back = weeks_back
+        # One extra day so the current day never overwrites the oldest one
+        self.history_days = max(10, 7 * weeks_back) + 1
+        self._slots: List[Tuple[SlotKey, int, int]] = []
+        for start, duration_hours in slots:
+            offset = start.hour * 3600 + start.minute * 60 + start.second
+            self._slots.append((
+                (offset, duration_hours),
+                offset * 1_000_000,
+                duration_hours * US_PER_HOUR
+            ))
+        self._states: Dict[Tuple[uuid.UUID, SlotKey], RollingBaselineState] = {}
+        self._lock = Lock()
+        # Held for a whole sync, so concurrent callers never rebuild twice
+        self._sync_lock = Lock()
+        # DB time up to which readings ingested by any process have been applied
+        self._synced_through: Optional[datetime] = None
+
+    def _state(self, user_id: uuid.UUID, key: SlotKey) -> RollingBaselineState:
+        state = self._states.get((user_id, key))
+        if state is None:
+            state = RollingBaselineState(self.history_days)
+            self._states[(user_id, key)] = state
+        return state
+
+    def _add(self, user_id: uuid.UUID, timestamp_us: int, mwh: int) -> None:
+        for key, offset_us, length_us in self._slots:
+            day, into_window = divmod(timestamp_us - offset_us, US_PER_DAY)
+            if into_window < length_us:
+                self._state(user_id, key).add(day, timestamp_us, mwh)
+
+    def ingest(self, user_id: uuid.UUID, timestamp: datetime, consumption_kwh: float) -> None:
+        """
+        Ingest a single interval reading
+
+        Args:
+            user_id: User the meter belongs to
+            timestamp: Interval start (naive UTC)
+            consumption_kwh: Consumption in the interval
+        """
+        with self._lock:
+            self._add(user_id, to_epoch_us(timestamp), kwh_to_mwh(consumption_kwh))
+
+    def ingest_series(self, user_id: uuid.UUID, series: ConsumptionSeries) -> None:
+        """Ingest every reading of a series (used to warm the state from history)"""
+        timestamps = series.timestamps.tolist()
+        consumption = np.diff(series.cumulative_mwh).tolist()
+        with self._lock:
+            for timestamp_us, mwh in zip(timestamps, consumption):
+                self._add(user_id, timestamp_us, mwh)
+
+    def sync(self, db: Session, overlap_seconds: Optional[int] = None) -> int:
+        """
+        Apply readings ingested into meter_reading since the last sync
+
+        The first call rebuilds the state from the table (last
+        ``history_days`` days of the tracked slots); later calls only read
+        rows whose ingested_at is newer than the previous sync, minus an
+        overlap that covers ingestion transactions still in flight at the
+        time. Re-applied readings replace themselves, so the overlap is
+        harmless.
+
+        Args:
+            db: Database session
+            overlap_seconds: Overlap with the previous sync (defaults to
+                ROLLING_BASELINE_SYNC_OVERLAP_SECONDS)
+
+        Returns:
+            Number of readings applied
+        """
+        if overlap_seconds is None:
+            overlap_seconds = settings.ROLLING_BASELINE_SYNC_OVERLAP_SECONDS
+
+        with self._sync_lock:
+            return self._sync(db, overlap_seconds)
+
+    @property
+    def built(self) -> bool:
+        """Whether the state has been rebuilt from meter_reading"""
+        return self._synced_through is not None
+
+    def ensure_built(self, db: Session) -> None:
+        """
+        Rebuild the state unless that has already been done
+
+        Callers arriving while the rebuild runs wait for it instead of
+        starting another one; once built this costs nothing.
+        """
+        if self.built:
+            return
+        with self._sync_lock:
+            if not self.built:
+                self._sync(db, settings.ROLLING_BASELINE_SYNC_OVERLAP_SECONDS)
+
+    async def on_notify(self, engine: Engine, payloads: Optional[List[str]]) -> None:
+        """
+        pg_listener handler for the meter_readings channel
+
+        Syncs in a worker thread; notifications that arrive meanwhile are
+        delivered together afterwards, so a burst of ingestion batches
+        costs one more sync, not one per batch.
+        """
+        await asyncio.to_thread(self._sync_from, engine)
+
+    def _sync_from(self, engine: Engine) -> None:
+        with Session(engine) as db:
+            self.sync(db)
+
+    def _sync(self, db: Session, overlap_seconds: int) -> int:
+        # Same clock and type as the ingested_at default
+        sync_started = db.execute(select(func.localtimestamp())).scalar()
+
+        epoch_seconds = func.extract("epoch", MeterReading.reading_at).cast(BigInteger)
+        in_slot = or_(*(
+            func.mod(epoch_seconds - offset_us // 1_000_000, 86400) < length_us // 1_000_000
+            for _, offset_us, length_us in self._slots
+        ))
+        query = (
+            select(User.user_id, MeterReading.reading_at, MeterReading.consumption_kwh)
+            .join(User, User.ahk_account_number == MeterReading.meter_id)
+            .where(
+                MeterReading.reading_at >= sync_started - timedelta(days=self.history_days),
+                in_slot
+            )
+        )
+        if self._synced_through is not None:
+            query = query.where(
+                MeterReading.ingested_at > self._synced_through - timedelta(seconds=overlap_seconds)
+            )
+
+        applied = 0
+        for chunk in db.execute(query.execution_options(yield_per=50_000)).partitions():
+            with self._lock:
+                for user_id, reading_at, consumption_kwh in chunk:
+                    self._add(user_id, to_epoch_us(reading_at), kwh_to_mwh(consumption_kwh))
+            applied += len(chunk)
+
+        if self._synced_through is None:
+            logger.info(f"Rebuilt rolling baselines from {applied} readings")
+        self._synced_through = sync_started
+        return applied
+
+    def lookup(
+        self,
+        user_id: uuid.UUID,
+        session_start: datetime,
+        session_duration_hours: int = 3,
+        method: str = "10_DAY_AVERAGE"
+    ) -> Optional[Decimal]:
+        """
+        Read the baseline for a session from the rolling state
+
+        Args:
+            user_id: User UUID
+            session_start: When the session starts
+            session_duration_hours: Duration of session in hours
+            method: 10_DAY_AVERAGE or SAME_WEEKDAY_AVERAGE
+
+        Returns:
+            Baseline in kWh, or None if the slot is not tracked or there is
+            not enough data (callers fall back to BaselineService)
+        """
+        if method == "SAME_WEEKDAY_AVERAGE":
+            # Same-weekday windows start at the top of the session hour
+            session_start = session_start.replace(minute=0, second=0, microsecond=0)
+            offsets = [7 * week for week in range(1, self.weeks_back + 1)]
+            minimum = 2
+        elif method == "10_DAY_AVERAGE":
+            offsets = list(range(1, 11))
+            minimum = 5
+        else:
+            raise ValueError(f"Unknown baseline method {method}")
+
+        key = slot_key(session_start, session_duration_hours)
+        state = self._states.get((user_id, key))
+        if state is None:
+            return None
+
+        session_day = (to_epoch_us(session_start) - key[0] * 1_000_000) // US_PER_DAY
+        with self._lock:
+            totals = [state.total(session_day - offset) for offset in offsets]
+
+        relevant_consumptions = [
+            mwh_to_kwh(total)
+            for total in totals
+            if total > 0
+        ]
+
+        if len(relevant_consumptions) < minimum:
+            return None
+
+        return BaselineService._calculate_average_with_outlier_removal(
+            relevant_consumptions
+        )
+
+
+@lru_cache()
+def get_rolling_baseline_store() -> RollingBaselineStore:
+    """Get the process-wide rolling baseline store (peak-hours slot)"""
+    return RollingBaselineStore(
+        slots=[(time(settings.PEAK_HOURS_START), settings.SESSION_DURATION_HOURS)]
+    )
@@ -4,18 +4,92 @@ Savings Calculation Service
 Calculates actual savings, monetary value, CO2 impact, and green points.
 """
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Sequence, Union
+
+import numpy as np
 
 from ..config import get_settings
+from .fixed_point import (
+    cents_to_eur, from_fixed, kwh_to_mwh, kwh_to_mwh_array, MWH_PER_KWH, ratio,
+    round_half_even, round_half_even_array
+)
 
 settings = get_settings()
 
+# Rates as exact integer ratios, parsed once
+_EUR_PER_KWH = ratio(settings.KWH_TO_EUR_RATE)
+_CO2_KG_PER_KWH = ratio(settings.CO2_EMISSION_FACTOR)
+_POINTS_PER_KWH = ratio(settings.GREEN_POINTS_PER_KWH)
+_DOUBLE_DAY_MULTIPLIER = ratio(settings.BONUS_MULTIPLIER_DOUBLE_DAYS)
+
+KWH_RATE = Decimal(str(settings.KWH_TO_EUR_RATE))
+CO2_FACTOR = Decimal(str(settings.CO2_EMISSION_FACTOR))
+
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+_TENTH = Decimal("0.1")
+_HUNDRED = Decimal("100")
+_TWELVE = Decimal("12")
+
+# Units of calculate_savings_fixed: hundredths of kWh, EUR and kg, tenths of a percent
+_HUNDREDTH_MWH = MWH_PER_KWH // 100
+
 
 class SavingsCalculationService:
     """
     Calculate savings from energy consumption reduction
     """
 
+    @staticmethod
+    def calculate_savings_fixed(
+        baseline_mwh: int,
+        actual_mwh: int,
+        is_double_points_day: bool = False
+    ) -> Dict[str, int]:
+        """
+        Calculate all savings metrics in integer fixed point
+
+        Each metric is rounded once, half to even, from the exact value.
+
+        Args:
+            baseline_mwh: Expected consumption (mWh)
+            actual_mwh: Actual consumption during session (mWh)
+            is_double_points_day: Whether bonus multiplier applies
+
+        Returns:
+            Dictionary with saved_kwh, saved_eur and saved_co2_kg in
+            hundredths, green_points_earned, and savings_percentage in tenths
+        """
+        saved_mwh = baseline_mwh - actual_mwh
+
+        # No savings if consumption increased
+        if saved_mwh <= 0:
+            return {
+                "saved_kwh": 0,
+                "saved_eur": 0,
+                "saved_co2_kg": 0,
+                "green_points_earned": 0,
+                "savings_percentage": 0
+            }
+
+        eur_numerator, eur_denominator = _EUR_PER_KWH
+        co2_numerator, co2_denominator = _CO2_KG_PER_KWH
+        points_numerator, points_denominator = _POINTS_PER_KWH
+
+        # Points are truncated, as int() did on the Decimal product
+        green_points_earned = (saved_mwh * points_numerator) // (points_denominator * MWH_PER_KWH)
+        if is_double_points_day:
+            multiplier_numerator, multiplier_denominator = _DOUBLE_DAY_MULTIPLIER
+            green_points_earned = (green_points_earned * multiplier_numerator) // multiplier_denominator
+
+        return {
+            "saved_kwh": round_half_even(saved_mwh, _HUNDREDTH_MWH),
+            "saved_eur": round_half_even(saved_mwh * eur_numerator, eur_denominator * _HUNDREDTH_MWH),
+            "saved_co2_kg": round_half_even(saved_mwh * co2_numerator, co2_denominator * _HUNDREDTH_MWH),
+            "green_points_earned": green_points_earned,
+            "savings_percentage": round_half_even(saved_mwh * 1000, baseline_mwh)
+        }
+
     @staticmethod
     def calculate_savings(
         baseline_kwh: Decimal,
@@ -25,6 +99,12 @@ class SavingsCalculationService:
         """
         Calculate all savings metrics
 
+        Consumption is taken at mWh resolution and the math is done by
+        calculate_savings_fixed. That is digit-identical to plain Decimal
+        arithmetic for inputs with at most six decimals, which covers the
+        DECIMAL(10, 4) columns and API input (validated to four decimals);
+        finer inputs are rounded to the nearest mWh first.
+
         Args:
             baseline_kwh: Expected consumption
             actual_kwh: Actual consumption during session
@@ -37,47 +117,76 @@ class SavingsCalculationService:
             - saved_co2_kg: CO2 emissions saved
             - green_points_earned: Gamification points
         """
-        # Calculate kWh saved
-        saved_kwh = baseline_kwh - actual_kwh
+        baseline_mwh = kwh_to_mwh(baseline_kwh)
+        actual_mwh = kwh_to_mwh(actual_kwh)
 
         # No savings if consumption increased
-        if saved_kwh <= 0:
+        if baseline_mwh <= actual_mwh:
             return {
-                "saved_kwh": Decimal("0"),
-                "saved_eur": Decimal("0"),
-                "saved_co2_kg": Decimal("0"),
+                "saved_kwh": _ZERO,
+                "saved_eur": _ZERO,
+                "saved_co2_kg": _ZERO,
                 "green_points_earned": 0,
-                "savings_percentage": Decimal("0")
+                "savings_percentage": _ZERO
             }
 
-        # Calculate monetary value (€)
-        kwh_rate = Decimal(str(settings.KWH_TO_EUR_RATE))
-        saved_eur = saved_kwh * kwh_rate
+        savings = SavingsCalculationService.calculate_savings_fixed(
+            baseline_mwh, actual_mwh, is_double_points_day
+        )
+
+        return {
+            "saved_kwh": from_fixed(savings["saved_kwh"], 100),
+            "saved_eur": cents_to_eur(savings["saved_eur"]),
+            "saved_co2_kg": from_fixed(savings["saved_co2_kg"], 100),
+            "green_points_earned": savings["green_points_earned"],
+            "savings_percentage": from_fixed(savings["savings_percentage"], 10)
+        }
+
+    @staticmethod
+    def calculate_savings_batch(
+        baseline_kwh: Union[np.ndarray, Sequence[Decimal]],
+        actual_kwh: Union[np.ndarray, Sequence[Decimal]],
+        double_points: Union[np.ndarray, Sequence[bool]]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate savings metrics for a whole cohort at once
 
-        # Calculate CO2 savings (kg)
-        co2_factor = Decimal(str(settings.CO2_EMISSION_FACTOR))
-        saved_co2_kg = saved_kwh * co2_factor
+        Row for row identical to calculate_savings_fixed, computed as int64
+        array operations instead of a Python loop.
 
-        # Calculate green points
-        points_per_kwh = settings.GREEN_POINTS_PER_KWH
-        base_points = int(saved_kwh * Decimal(str(points_per_kwh)))
+        Args:
+            baseline_kwh: Expected consumption per session
+            actual_kwh: Actual consumption per session
+            double_points: Whether the bonus multiplier applies per session
 
-        # Apply bonus multiplier if double points day
-        if is_double_points_day:
-            multiplier = Decimal(str(settings.BONUS_MULTIPLIER_DOUBLE_DAYS))
-            green_points_earned = int(base_points * multiplier)
-        else:
-            green_points_earned = base_points
+        Returns:
+            int64 columns: saved_kwh, saved_eur and saved_co2_kg in
+            hundredths, green_points_earned, savings_percentage in tenths
+        """
+        baseline_mwh = kwh_to_mwh_array(baseline_kwh)
+        actual_mwh = kwh_to_mwh_array(actual_kwh)
+        double = np.asarray(double_points, dtype=np.bool_)
 
-        # Calculate savings percentage
-        savings_percentage = (saved_kwh / baseline_kwh) * Decimal("100")
+        # Rows without savings settle to zero in every column
+        saved_mwh = np.maximum(baseline_mwh - actual_mwh, 0)
+        has_savings = saved_mwh > 0
+
+        eur_numerator, eur_denominator = _EUR_PER_KWH
+        co2_numerator, co2_denominator = _CO2_KG_PER_KWH
+        points_numerator, points_denominator = _POINTS_PER_KWH
+        multiplier_numerator, multiplier_denominator = _DOUBLE_DAY_MULTIPLIER
+
+        points = (saved_mwh * points_numerator) // (points_denominator * MWH_PER_KWH)
+        points = np.where(double, (points * multiplier_numerator) // multiplier_denominator, points)
+
+        percentage = round_half_even_array(saved_mwh * 1000, np.where(has_savings, baseline_mwh, 1))
 
         return {
-            "saved_kwh": saved_kwh.quantize(Decimal("0.01")),
-            "saved_eur": saved_eur.quantize(Decimal("0.01")),
-            "saved_co2_kg": saved_co2_kg.quantize(Decimal("0.01")),
-            "green_points_earned": green_points_earned,
-            "savings_percentage": savings_percentage.quantize(Decimal("0.1"))
+            "saved_kwh": round_half_even_array(saved_mwh, _HUNDREDTH_MWH),
+            "saved_eur": round_half_even_array(saved_mwh * eur_numerator, eur_denominator * _HUNDREDTH_MWH),
+            "saved_co2_kg": round_half_even_array(saved_mwh * co2_numerator, co2_denominator * _HUNDREDTH_MWH),
+            "green_points_earned": points,
+            "savings_percentage": np.where(has_savings, percentage, 0)
         }
 
     @staticmethod
@@ -98,10 +207,9 @@ class SavingsCalculationService:
         if allocation_percentage < 0 or allocation_percentage > 100:
             raise ValueError("Allocation percentage must be between 0 and 100")
 
-        allocation = Decimal(str(allocation_percentage)) / Decimal("100")
-        credit = saved_eur * allocation
-
-        return credit.quantize(Decimal("0.01"))
+        # cents = saved_eur * 100 * allocation_percentage / 100
+        numerator, denominator = ratio(saved_eur)
+        return cents_to_eur(round_half_even(numerator * allocation_percentage, denominator))
 
     @staticmethod
     def estimate_annual_savings(
@@ -120,21 +228,21 @@ class SavingsCalculationService:
         """
         # Monthly calculations
         monthly_kwh = avg_session_savings_kwh * Decimal(str(sessions_per_month))
-        monthly_eur = monthly_kwh * Decimal(str(settings.KWH_TO_EUR_RATE))
-        monthly_co2 = monthly_kwh * Decimal(str(settings.CO2_EMISSION_FACTOR))
+        monthly_eur = monthly_kwh * KWH_RATE
+        monthly_co2 = monthly_kwh * CO2_FACTOR
 
         # Annual calculations
-        annual_kwh = monthly_kwh * Decimal("12")
-        annual_eur = monthly_eur * Decimal("12")
-        annual_co2 = monthly_co2 * Decimal("12")
+        annual_kwh = monthly_kwh * _TWELVE
+        annual_eur = monthly_eur * _TWELVE
+        annual_co2 = monthly_co2 * _TWELVE
 
         return {
-            "monthly_kwh": monthly_kwh.quantize(Decimal("0.01")),
-            "monthly_eur": monthly_eur.quantize(Decimal("0.01")),
-            "monthly_co2_kg": monthly_co2.quantize(Decimal("0.01")),
-            "annual_kwh": annual_kwh.quantize(Decimal("0.01")),
-            "annual_eur": annual_eur.quantize(Decimal("0.01")),
-            "annual_co2_kg": annual_co2.quantize(Decimal("0.01")),
+            "monthly_kwh": monthly_kwh.quantize(_CENT),
+            "monthly_eur": monthly_eur.quantize(_CENT),
+            "monthly_co2_kg": monthly_co2.quantize(_CENT),
+            "annual_kwh": annual_kwh.quantize(_CENT),
+            "annual_eur": annual_eur.quantize(_CENT),
+            "annual_co2_kg": annual_co2.quantize(_CENT),
         }
 
     @staticmethod
@@ -154,25 +262,25 @@ class SavingsCalculationService:
         """
         if annual_waste_fee <= 0:
             return {
-                "coverage_percentage": Decimal("0"),
-                "months_covered": Decimal("0"),
-                "remaining_to_cover": Decimal("0")
+                "coverage_percentage": _ZERO,
+                "months_covered": _ZERO,
+                "remaining_to_cover": _ZERO
             }
 
         # Calculate coverage percentage
-        coverage_pct = (waste_wallet_balance / annual_waste_fee) * Decimal("100")
-        coverage_pct = min(coverage_pct, Decimal("100"))  # Cap at 100%
+        coverage_pct = (waste_wallet_balance / annual_waste_fee) * _HUNDRED
+        coverage_pct = min(coverage_pct, _HUNDRED)  # Cap at 100%
 
         # Calculate months covered
-        monthly_fee = annual_waste_fee / Decimal("12")
-        months_covered = waste_wallet_balance / monthly_fee if monthly_fee > 0 else Decimal("0")
+        monthly_fee = annual_waste_fee / _TWELVE
+        months_covered = waste_wallet_balance / monthly_fee if monthly_fee > 0 else _ZERO
 
         # Calculate remaining amount needed
         remaining = annual_waste_fee - waste_wallet_balance
-        remaining = max(remaining, Decimal("0"))  # Don't show negative
+        remaining = max(remaining, _ZERO)  # Don't show negative
 
         return {
-            "coverage_percentage": coverage_pct.quantize(Decimal("0.1")),
-            "months_covered": months_covered.quantize(Decimal("0.1")),
-            "remaining_to_cover": remaining.quantize(Decimal("0.01"))
+            "coverage_percentage": coverage_pct.quantize(_TENTH),
+            "months_covered": months_covered.quantize(_TENTH),
+            "remaining_to_cover": remaining.quantize(_CENT)
         }
@@ -0,0 +1,398 @@
+"""
+Session Lifecycle Service
+
+Set-based state transitions for saving sessions, so a whole cohort of
+sessions can be started with one history pass and one UPDATE statement,
+and settled with a fixed handful of statements regardless of its size.
+"""
+from sqlalchemy import func, select, update, values, column, Date, DECIMAL, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import uuid
+
+from ..models.saving_session import SavingSession
+from ..models.user import User
+from .baseline import BaselineService, HistoricalData
+from .baseline_cache import get_baseline_cache
+from .batch_executor import CohortBatchExecutor
+from .fixed_point import cents_to_eur, from_fixed
+from .rolling_baseline import get_rolling_baseline_store
+from .savings import SavingsCalculationService
+from .wallet import WasteWalletService
+from .streaks import StreakService
+
+SESSION_NOT_FOUND = "Session not found"
+
+
+class SessionLifecycleService:
+    """
+    Bulk session transitions
+    """
+
+    @staticmethod
+    def precomputed_baseline(
+        user_id: uuid.UUID,
+        session_start: datetime,
+        session_duration_hours: int
+    ) -> Optional[Decimal]:
+        """
+        Baseline available without touching consumption history
+
+        Checks the nightly baseline cache first, then the rolling baseline
+        state maintained from ingested readings.
+
+        Returns:
+            Valid baseline in kWh, or None if it has to be calculated
+        """
+        baseline = get_baseline_cache().get(user_id, session_start, session_duration_hours)
+        if baseline is None:
+            baseline = get_rolling_baseline_store().lookup(
+                user_id, session_start, session_duration_hours
+            )
+
+        if baseline is None or not BaselineService.validate_baseline(baseline):
+            return None
+        return baseline
+
+    @staticmethod
+    def start_batch(
+        db: Session,
+        sessions: Sequence[SavingSession],
+        history_loader: Callable[[Sequence[SavingSession]], Sequence[HistoricalData]],
+        executor: Optional[CohortBatchExecutor] = None
+    ) -> Tuple[List[uuid.UUID], Dict[uuid.UUID, str]]:
+        """
+        Calculate baselines for many SCHEDULED sessions and start them
+
+        Precomputed baselines (nightly cache, rolling state) are used as is; the
+        remaining sessions sharing the same window are grouped so each group
+        is one vectorized BaselineService.calculate_many call; all results are
+        written back with a single UPDATE ... FROM (VALUES ...) statement.
+        The caller owns the transaction.
+
+        Args:
+            db: Database session
+            sessions: Sessions to start
+            history_loader: Returns the consumption history for each session
+                of a cohort (one call per cohort, so fetches can be batched)
+            executor: Optional process-pool executor for large cohorts
+
+        Returns:
+            (started session ids, {session id: failure reason})
+        """
+        failed: Dict[uuid.UUID, str] = {}
+        baselines: List[Tuple[uuid.UUID, Decimal]] = []
+
+        cohorts: Dict[Tuple[datetime, int], List[SavingSession]] = {}
+        for session in sessions:
+            if session.status != "SCHEDULED":
+                failed[session.session_id] = f"Cannot start session with status {session.status}"
+                continue
+            duration_hours = int((session.scheduled_end - session.scheduled_start).seconds / 3600)
+            cohorts.setdefault((session.scheduled_start, duration_hours), []).append(session)
+
+        if cohorts:
+            # Kept current through NOTIFY; only the first build is waited for here
+            get_rolling_baseline_store().ensure_built(db)
+
+        for (session_start, duration_hours), sessions_in_window in cohorts.items():
+            # Sessions with a precomputed baseline need no history at all
+            cohort = []
+            for session in sessions_in_window:
+                baseline = SessionLifecycleService.precomputed_baseline(
+                    session.user_id, session_start, duration_hours
+                )
+                if baseline is not None:
+                    baselines.append((session.session_id, baseline))
+                else:
+                    cohort.append(session)
+
+            if not cohort:
+                continue
+
+            calculate = executor.calculate_baselines if executor else BaselineService.calculate_many
+            results = calculate(
+                user_histories=history_loader(cohort),
+                session_start=session_start,
+                session_duration_hours=duration_hours
+            )
+            for session, baseline in zip(cohort, results):
+                if not baseline or not BaselineService.validate_baseline(baseline):
+                    failed[session.session_id] = "Failed to calculate valid baseline"
+                else:
+                    baselines.append((session.session_id, baseline))
+
+        if not baselines:
+            return [], failed
+
+        baseline_rows = values(
+            column("session_id", UUID(as_uuid=True)),
+            column("baseline_kwh", DECIMAL(10, 4)),
+            name="baselines"
+        ).data(baselines)
+
+        result = db.execute(
+            update(SavingSession)
+            .where(
+                SavingSession.session_id == baseline_rows.c.session_id,
+                SavingSession.status == "SCHEDULED"
+            )
+            .values(
+                status="IN_PROGRESS",
+                actual_start=datetime.utcnow(),
+                baseline_kwh=baseline_rows.c.baseline_kwh,
+                baseline_calculation_method="10_DAY_AVERAGE"
+            )
+            .returning(SavingSession.session_id)
+            .execution_options(synchronize_session=False)
+        )
+        started = [row.session_id for row in result]
+
+        started_ids = set(started)
+        for session_id, _ in baselines:
+            if session_id not in started_ids:
+                failed[session_id] = "Session is no longer SCHEDULED"
+
+        return started, failed
+
+    @staticmethod
+    def mark_started(db: Session, session_id: uuid.UUID, baseline_kwh: Decimal) -> bool:
+        """
+        SCHEDULED -> IN_PROGRESS as one conditional UPDATE
+
+        Returns:
+            False if the session was not SCHEDULED (e.g. a concurrent
+            request started it first)
+        """
+        result = db.execute(
+            update(SavingSession)
+            .where(
+                SavingSession.session_id == session_id,
+                SavingSession.status == "SCHEDULED"
+            )
+            .values(
+                status="IN_PROGRESS",
+                actual_start=datetime.utcnow(),
+                baseline_kwh=baseline_kwh,
+                baseline_calculation_method="10_DAY_AVERAGE"
+            )
+            .returning(SavingSession.session_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.first() is not None
+
+    @staticmethod
+    def complete_batch(
+        db: Session,
+        completions: Sequence[Tuple[uuid.UUID, Decimal]]
+    ) -> Tuple[Dict[uuid.UUID, dict], Dict[uuid.UUID, str]]:
+        """
+        Settle many IN_PROGRESS sessions in one transaction
+
+        Same effects as completing each session on its own (savings, wallet
+        credit with its transaction, user totals), but as a fixed number of
+        statements. Sessions are claimed with a conditional
+        UPDATE ... WHERE status = 'IN_PROGRESS' RETURNING, so of two
+        concurrent completions exactly one wins, without a SELECT first.
+        The results are then written with one UPDATE ... FROM (VALUES ...),
+        followed by one upsert of the wallets, one multi-row INSERT of the
+        wallet transactions and one UPDATE of the user totals and streaks.
+        Users with a session dated before their last participation day
+        have their streak recomputed by one more statement.
+        The caller owns the transaction.
+
+        Args:
+            db: Database session
+            completions: (session id, actual consumption in kWh) pairs
+
+        Returns:
+            ({session id: {"user_id": ..., "savings": ..., "wallet_credit": ...}},
+             {session id: failure reason})
+        """
+        actual_by_session = dict(completions)
+        failed: Dict[uuid.UUID, str] = {}
+
+        completion_rows = values(
+            column("session_id", UUID(as_uuid=True)),
+            column("actual_kwh", DECIMAL(10, 4)),
+            name="completions"
+        ).data(list(actual_by_session.items()))
+
+        now = datetime.utcnow()
+        sessions = db.execute(
+            update(SavingSession)
+            .where(
+                SavingSession.session_id == completion_rows.c.session_id,
+                SavingSession.status == "IN_PROGRESS",
+                SavingSession.baseline_kwh.isnot(None)
+            )
+            .values(
+                status="COMPLETED",
+                actual_end=now,
+                completed_at=now,
+                actual_kwh=completion_rows.c.actual_kwh
+            )
+            .returning(
+                SavingSession.session_id,
+                SavingSession.user_id,
+                SavingSession.scheduled_start,
+                SavingSession.baseline_kwh,
+                SavingSession.is_double_points_day,
+                SavingSession.allocation_type
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        claimed_ids = {row.session_id for row in sessions}
+        unclaimed = [session_id for session_id in actual_by_session if session_id not in claimed_ids]
+        if unclaimed:
+            failed = SessionLifecycleService._completion_failures(db, unclaimed)
+
+        if not sessions:
+            return {}, failed
+
+        savings = SavingsCalculationService.calculate_savings_batch(
+            [row.baseline_kwh for row in sessions],
+            [actual_by_session[row.session_id] for row in sessions],
+            [row.is_double_points_day == "Y" for row in sessions]
+        )
+        saved_kwh = savings["saved_kwh"].tolist()
+        saved_eur = savings["saved_eur"].tolist()
+        saved_co2_kg = savings["saved_co2_kg"].tolist()
+        points = savings["green_points_earned"].tolist()
+        percentage = savings["savings_percentage"].tolist()
+
+        completed: Dict[uuid.UUID, dict] = {}
+        for index, row in enumerate(sessions):
+            completed[row.session_id] = {
+                "user_id": row.user_id,
+                "savings": {
+                    "saved_kwh": from_fixed(saved_kwh[index], 100),
+                    "saved_eur": cents_to_eur(saved_eur[index]),
+                    "saved_co2_kg": from_fixed(saved_co2_kg[index], 100),
+                    "green_points_earned": points[index],
+                    "savings_percentage": from_fixed(percentage[index], 10)
+                },
+                "wallet_credit": cents_to_eur(
+                    saved_eur[index] if row.allocation_type == "WASTE_WALLET" else 0
+                )
+            }
+
+        # The claim above holds the row locks, so results need no status guard
+        settled_rows = values(
+            column("session_id", UUID(as_uuid=True)),
+            column("saved_kwh", DECIMAL(10, 4)),
+            column("saved_eur", DECIMAL(10, 4)),
+            column("saved_co2_kg", DECIMAL(10, 4)),
+            column("green_points_earned", Integer),
+            name="settled"
+        ).data([
+            (
+                session_id,
+                result["savings"]["saved_kwh"],
+                result["savings"]["saved_eur"],
+                result["savings"]["saved_co2_kg"],
+                result["savings"]["green_points_earned"]
+            )
+            for session_id, result in completed.items()
+        ])
+        db.execute(
+            update(SavingSession)
+            .where(SavingSession.session_id == settled_rows.c.session_id)
+            .values(
+                saved_kwh=settled_rows.c.saved_kwh,
+                saved_eur=settled_rows.c.saved_eur,
+                saved_co2_kg=settled_rows.c.saved_co2_kg,
+                green_points_earned=settled_rows.c.green_points_earned
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        # Per-user sums in integer units: wallet credits and user totals
+        credits: Dict[uuid.UUID, List[Tuple[uuid.UUID, int]]] = {}
+        totals: Dict[uuid.UUID, List[int]] = {}
+        days: Dict[uuid.UUID, List[date]] = {}
+        for index, row in enumerate(sessions):
+            days.setdefault(row.user_id, []).append(row.scheduled_start.date())
+            total = totals.setdefault(row.user_id, [0, 0, 0, 0])
+            total[0] += points[index]
+            total[1] += saved_kwh[index]
+            total[2] += saved_eur[index]
+            total[3] += saved_co2_kg[index]
+            if row.allocation_type == "WASTE_WALLET" and saved_eur[index] > 0:
+                credits.setdefault(row.user_id, []).append((row.session_id, saved_eur[index]))
+
+        if credits:
+            WasteWalletService.credit_many(db, [
+                (user_id, cents, session_id, f"Savings from session {session_id}")
+                for user_id, user_credits in credits.items()
+                for session_id, cents in user_credits
+            ])
+
+        # Streaks advance from the user row alone, except for late sessions below
+        runs = StreakService.batch_runs(days)
+
+        user_totals = values(
+            column("user_id", UUID(as_uuid=True)),
+            column("green_points", Integer),
+            column("kwh", DECIMAL(10, 2)),
+            column("eur", DECIMAL(10, 2)),
+            column("co2_kg", DECIMAL(10, 2)),
+            column("first_day", Date),
+            column("last_day", Date),
+            column("run_length", Integer),
+            column("longest_run", Integer),
+            name="user_totals"
+        ).data([
+            (
+                user_id, total[0], from_fixed(total[1], 100), cents_to_eur(total[2]), from_fixed(total[3], 100),
+                *runs[user_id]
+            )
+            for user_id, total in sorted(totals.items())
+        ])
+        previous_row, late = StreakService.late_runs(user_totals)
+        # Core UPDATE: the ORM one cannot return a column from another FROM item
+        settled_users = db.execute(
+            update(User.__table__)
+            .where(User.user_id == user_totals.c.user_id, previous_row)
+            .values(
+                green_points_balance=func.coalesce(User.green_points_balance, 0) + user_totals.c.green_points,
+                total_kwh_saved=func.coalesce(User.total_kwh_saved, 0) + user_totals.c.kwh,
+                total_eur_saved=func.coalesce(User.total_eur_saved, 0) + user_totals.c.eur,
+                total_co2_saved=func.coalesce(User.total_co2_saved, 0) + user_totals.c.co2_kg,
+                **StreakService.completion_updates(user_totals)
+            )
+            .returning(User.user_id, late)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        # A session settled after later days were counted may join two runs;
+        # only those users are recomputed from their session history
+        late_users = [row.user_id for row in settled_users if row.late]
+        if late_users:
+            StreakService.backfill(db, late_users)
+
+        return completed, failed
+
+    @staticmethod
+    def _completion_failures(db: Session, session_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, str]:
+        """Why sessions were not claimed for completion (only runs on failures)"""
+        rows = db.execute(
+            select(SavingSession.session_id, SavingSession.status, SavingSession.baseline_kwh)
+            .where(SavingSession.session_id.in_(list(session_ids)))
+        ).all()
+        found = {row.session_id: row for row in rows}
+
+        failed: Dict[uuid.UUID, str] = {}
+        for session_id in session_ids:
+            row = found.get(session_id)
+            if row is None:
+                failed[session_id] = SESSION_NOT_FOUND
+            elif row.status != "IN_PROGRESS":
+                failed[session_id] = f"Cannot complete session with status {row.status}"
+            else:
+                failed[session_id] = "Session has no baseline"
+        return failed
@@ -0,0 +1,411 @@
+"""
+Session Scheduler
+
+In-process scheduler that starts saving sessions at scheduled_start and
+settles them after scheduled_end, without a broker or client calls.
+
+Due times are kept in a min-heap of distinct (time, action) entries, so
+10k sessions due at 17:00 are one heap entry and one wake-up. On wake-up
+the due sessions are claimed in batches with SELECT ... FOR UPDATE SKIP
+LOCKED, so several API processes can run the scheduler side by side
+without settling a session twice, and every batch goes through the
+set-based SessionLifecycleService transitions. Saving events due to start
+are opened first, so their participants start in the same batches.
+
+Sessions a run leaves behind (no baseline yet, no meter readings yet, or a
+failed batch) are retried with exponential backoff, and every refresh also
+looks for overdue rows, so nothing waits for a restart. A session that
+still has no baseline SCHEDULER_START_GRACE_HOURS after its start is
+marked FAILED. The scheduler runs only in the process holding the leader
+lock (see leader.py).
+"""
+from sqlalchemy import distinct, exists, or_, tuple_, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+import asyncio
+import heapq
+import logging
+import uuid
+
+from ..config import get_settings
+from ..models.saving_event import SavingEvent
+from ..models.saving_session import SavingSession
+from .baseline import HistoricalData
+from .batch_executor import CohortBatchExecutor
+from .events import SavingEventService
+from .meter_data import ConsumptionLoader
+from .session_lifecycle import SessionLifecycleService
+from .user_stats import get_user_stats_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+START = "start"
+COMPLETE = "complete"
+
+
+class SessionScheduler:
+    """
+    Heap-driven automatic session transitions
+
+    Args:
+        session_factory: Creates a database session per batch
+        history_loader: History per session of a cohort (for baselines)
+        consumption_loader: Metered kWh per session (for settlement)
+        executor: Optional process-pool executor for large cohorts
+        batch_size: Sessions per transaction (defaults to SCHEDULER_BATCH_SIZE)
+        settle_delay: Wait after scheduled_end for meter readings
+            (defaults to SCHEDULER_SETTLE_DELAY_MINUTES)
+        now: Current UTC time (injectable for tests)
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        history_loader: Callable[[Sequence[SavingSession]], Sequence[HistoricalData]],
+        consumption_loader: ConsumptionLoader,
+        executor: Optional[CohortBatchExecutor] = None,
+        batch_size: Optional[int] = None,
+        settle_delay: Optional[timedelta] = None,
+        now: Callable[[], datetime] = datetime.utcnow
+    ):
+        self.session_factory = session_factory
+        self.history_loader = history_loader
+        self.consumption_loader = consumption_loader
+        self.executor = executor
+        self.batch_size = batch_size or settings.SCHEDULER_BATCH_SIZE
+        self.settle_delay = (
+            settle_delay if settle_delay is not None
+            else timedelta(minutes=settings.SCHEDULER_SETTLE_DELAY_MINUTES)
+        )
+        self._now = now
+        self.start_grace = timedelta(hours=settings.SCHEDULER_START_GRACE_HOURS)
+        self.retry_delay = timedelta(seconds=settings.SCHEDULER_RETRY_SECONDS)
+        self.retry_max_delay = timedelta(seconds=settings.SCHEDULER_RETRY_MAX_SECONDS)
+        self._retry_delays: Dict[str, timedelta] = {}
+
+        self._heap: List[Tuple[datetime, str]] = []
+        self._queued: Set[Tuple[datetime, str]] = set()
+        self._lock = Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refreshed_until: Optional[datetime] = None
+
+    def schedule(self, due_at: datetime, action: str) -> None:
+        """
+        Queue a wake-up; sessions sharing a due time share one entry
+
+        Safe to call from any thread; a running loop re-plans its sleep.
+        """
+        entry = (due_at, action)
+        with self._lock:
+            if entry in self._queued:
+                return
+            self._queued.add(entry)
+            heapq.heappush(self._heap, entry)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pop_due(self, now: datetime) -> Set[str]:
+        """Remove every entry due by ``now`` and return their actions"""
+        actions = set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                self._queued.discard(entry)
+                actions.add(entry[1])
+        return actions
+
+    def next_due(self) -> Optional[datetime]:
+        """Earliest queued due time"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def is_queued(self, action: str) -> bool:
+        """Whether any wake-up for ``action`` is queued"""
+        with self._lock:
+            return any(queued_action == action for _, queued_action in self._queued)
+
+    def retry(self, action: str) -> datetime:
+        """
+        Queue a retry of ``action`` with exponential backoff
+
+        Returns:
+            When the retry is due
+        """
+        delay = self._retry_delays.get(action, self.retry_delay)
+        self._retry_delays[action] = min(delay * 2, self.retry_max_delay)
+        due_at = self._now() + delay
+        self.schedule(due_at, action)
+        return due_at
+
+    def refresh(self, db: Session) -> int:
+        """
+        Queue the distinct due times of sessions in the scheduling horizon
+
+        Covers everything since the previous refresh, so sessions created
+        in between are not missed.
+
+        Returns:
+            Number of new heap entries
+        """
+        now = self._now()
+        until = now + timedelta(hours=settings.SCHEDULER_HORIZON_HOURS)
+        since = self._refreshed_until or now
+
+        starts = db.query(distinct(SavingSession.scheduled_start)).filter(
+            SavingSession.status == "SCHEDULED",
+            SavingSession.scheduled_start > since,
+            SavingSession.scheduled_start <= until
+        ).all()
+        ends = db.query(distinct(SavingSession.scheduled_end)).filter(
+            SavingSession.status.in_(["SCHEDULED", "IN_PROGRESS"]),
+            SavingSession.scheduled_end > since - self.settle_delay,
+            SavingSession.scheduled_end <= until - self.settle_delay
+        ).all()
+
+        # Saving events only get sessions when they open
+        starts += db.query(distinct(SavingEvent.scheduled_start)).filter(
+            SavingEvent.status == "SCHEDULED",
+            SavingEvent.scheduled_start > since,
+            SavingEvent.scheduled_start <= until
+        ).all()
+        ends += db.query(distinct(SavingEvent.scheduled_end)).filter(
+            SavingEvent.status.in_(["SCHEDULED", "IN_PROGRESS"]),
+            SavingEvent.scheduled_end > since - self.settle_delay,
+            SavingEvent.scheduled_end <= until - self.settle_delay
+        ).all()
+
+        queued = len(self._queued)
+        for (due_at,) in starts:
+            self.schedule(due_at, START)
+        for (ended_at,) in ends:
+            self.schedule(ended_at + self.settle_delay, COMPLETE)
+
+        # Overdue rows (left behind by an earlier run, or created after their
+        # due time) run now unless a retry is already queued
+        if not self.is_queued(START) and db.query(or_(
+            exists().where(SavingSession.status == "SCHEDULED", SavingSession.scheduled_start <= now),
+            exists().where(SavingEvent.status == "SCHEDULED", SavingEvent.scheduled_start <= now)
+        )).scalar():
+            self.schedule(now, START)
+        if not self.is_queued(COMPLETE) and db.query(
+            exists().where(
+                SavingSession.status == "IN_PROGRESS",
+                SavingSession.scheduled_end <= now - self.settle_delay
+            )
+        ).scalar():
+            self.schedule(now, COMPLETE)
+
+        self._refreshed_until = now
+        return len(self._queued) - queued
+
+    def _claim(self, db: Session, action: str, after: Optional[Tuple[datetime, uuid.UUID]]) -> List[SavingSession]:
+        """Lock the next batch of due sessions, skipping rows other workers hold"""
+        now = self._now()
+        if action == START:
+            due_column = SavingSession.scheduled_start
+            query = db.query(SavingSession).filter(
+                SavingSession.status == "SCHEDULED",
+                SavingSession.scheduled_start <= now
+            )
+        else:
+            due_column = SavingSession.scheduled_end
+            query = db.query(SavingSession).filter(
+                SavingSession.status == "IN_PROGRESS",
+                SavingSession.scheduled_end <= now - self.settle_delay
+            )
+
+        # Keyset pagination: sessions left behind (e.g. no readings yet) are
+        # not claimed again within the same run
+        if after is not None:
+            query = query.filter(tuple_(due_column, SavingSession.session_id) > tuple_(*after))
+
+        return (
+            query
+            .order_by(due_column, SavingSession.session_id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def _process(self, db: Session, action: str, sessions: List[SavingSession]) -> Tuple[int, int]:
+        """
+        Start or settle one claimed batch inside the caller's transaction
+
+        Returns:
+            (sessions started or completed, sessions left behind for a retry)
+        """
+        if action == START:
+            started, failed = SessionLifecycleService.start_batch(
+                db=db,
+                sessions=sessions,
+                history_loader=self.history_loader,
+                executor=self.executor
+            )
+            # No baseline is usually a meter data outage: stay SCHEDULED and
+            # retry, and only give up once the grace period has passed
+            no_baseline = {
+                session_id for session_id, reason in failed.items()
+                if reason == "Failed to calculate valid baseline"
+            }
+            give_up_before = self._now() - self.start_grace
+            expired = [
+                session.session_id for session in sessions
+                if session.session_id in no_baseline and session.scheduled_start <= give_up_before
+            ]
+            if expired:
+                db.execute(
+                    update(SavingSession)
+                    .where(
+                        SavingSession.session_id.in_(expired),
+                        SavingSession.status == "SCHEDULED"
+                    )
+                    .values(status="FAILED", error_message="Failed to calculate valid baseline")
+                    .execution_options(synchronize_session=False)
+                )
+            return len(started), len(no_baseline) - len(expired)
+
+        actuals = self.consumption_loader(sessions)
+        completions = [
+            (session.session_id, actual)
+            for session, actual in zip(sessions, actuals)
+            if actual is not None
+        ]
+        waiting = len(sessions) - len(completions)
+        if waiting:
+            logger.info(f"{waiting} ended sessions do not have complete meter readings yet")
+        if not completions:
+            return 0, waiting
+        completed, _ = SessionLifecycleService.complete_batch(db, completions)
+        return len(completed), waiting
+
+    def run_due(self, action: str) -> Tuple[int, int]:
+        """
+        Start or settle every session that is due, one transaction per batch
+
+        Returns:
+            (sessions started or completed, sessions left behind for a retry)
+        """
+        processed = 0
+        left_behind = 0
+        after: Optional[Tuple[datetime, uuid.UUID]] = None
+        due_attribute = "scheduled_start" if action == START else "scheduled_end"
+
+        # Due events first create their participants' SCHEDULED sessions
+        if action == START:
+            self._event_transition(action)
+
+        while True:
+            db = self.session_factory()
+            try:
+                sessions = self._claim(db, action, after)
+                if not sessions:
+                    db.rollback()
+                    break
+                batch_processed, batch_left_behind = self._process(db, action, sessions)
+                processed += batch_processed
+                left_behind += batch_left_behind
+                after = (getattr(sessions[-1], due_attribute), sessions[-1].session_id)
+                if action == COMPLETE:
+                    get_user_stats_service().invalidate((session.user_id for session in sessions), db=db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            if len(sessions) < self.batch_size:
+                break
+
+        if action == COMPLETE:
+            self._event_transition(action)
+
+        return processed, left_behind
+
+    def _event_transition(self, action: str) -> None:
+        """Open due saving events, or close those whose sessions are all settled"""
+        db = self.session_factory()
+        try:
+            if action == START:
+                events = SavingEventService.open_events(db, now=self._now())
+            else:
+                events = SavingEventService.close_events(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if events:
+            logger.info(f"Session scheduler: {action} {len(events)} saving events")
+
+    async def run(self) -> None:
+        """
+        Scheduler loop; runs forever as a background task
+
+        Sleeps until the earliest due time or the next refresh, whichever
+        comes first. Batches run in a worker thread.
+        """
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+        # Catch up on anything that fell due while the API was down
+        now = self._now()
+        self.schedule(now, START)
+        self.schedule(now, COMPLETE)
+
+        refresh_interval = timedelta(seconds=settings.SCHEDULER_REFRESH_SECONDS)
+        next_refresh = now
+
+        while True:
+            now = self._now()
+            if now >= next_refresh:
+                try:
+                    await asyncio.to_thread(self._refresh_once)
+                except Exception as e:
+                    logger.error(f"Session scheduler refresh failed: {e}")
+                next_refresh = now + refresh_interval
+
+            # Starts run first so caught-up sessions can settle in the same wake-up
+            for action in sorted(self.pop_due(now), key=[START, COMPLETE].index):
+                try:
+                    processed, left_behind = await asyncio.to_thread(self.run_due, action)
+                    if processed:
+                        logger.info(f"Session scheduler: {action} {processed} sessions")
+                except Exception as e:
+                    logger.error(f"Session scheduler {action} failed: {e}")
+                    left_behind = 1
+
+                if left_behind:
+                    due_at = self.retry(action)
+                    logger.info(f"Session scheduler: {action} retry at {due_at.isoformat()}")
+                else:
+                    self._retry_delays.pop(action, None)
+
+            wake_at = min(filter(None, [self.next_due(), next_refresh]))
+            timeout = max((wake_at - self._now()).total_seconds(), 0)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _refresh_once(self) -> int:
+        db = self.session_factory()
+        try:
+            return self.refresh(db)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queued wake-ups"""
+        next_due = self.next_due()
+        return {
+            "queued": len(self._queued),
+            "next_due": next_due.isoformat() if next_due else None,
+        }
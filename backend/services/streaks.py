@@ -0,0 +1,171 @@
+"""
+Streak Service
+
+Per-user streak state (last participation day, current and longest run of
+consecutive days with a completed session) kept on the user row. Session
+settlement advances it with a few CASE expressions per user, without
+reading the user's session history; the backfill computes it in one
+window-function pass over saving_session, for every user or for the few
+whose settled sessions fall before their last recorded day.
+"""
+from sqlalchemy import Date, Integer, case, cast, func, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.orm import Session, aliased
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import uuid
+
+from ..models.saving_session import SavingSession
+from ..models.user import User
+
+# (first day, last day, length) of the latest run, longest run
+BatchRun = Tuple[date, date, int, int]
+
+# The user row as the settlement UPDATE found it: a FROM item is read from
+# the statement's snapshot, so RETURNING can compare against the old values
+_previous = aliased(User, name="previous")
+
+
+class StreakService:
+    """
+    Incremental streak tracking
+    """
+
+    @staticmethod
+    def batch_runs(days_by_user: Dict[uuid.UUID, Iterable[date]]) -> Dict[uuid.UUID, BatchRun]:
+        """
+        Runs of consecutive days among the sessions settled in one batch
+
+        Args:
+            days_by_user: Participation days per user in the batch
+
+        Returns:
+            {user id: (first day, last day, length of the latest run,
+            length of the longest run)}
+        """
+        runs: Dict[uuid.UUID, BatchRun] = {}
+        for user_id, days in days_by_user.items():
+            first = last = None
+            length = longest = 0
+            for day in sorted(set(days)):
+                if last is not None and day == last + timedelta(days=1):
+                    length += 1
+                else:
+                    first, length = day, 1
+                last = day
+                longest = max(longest, length)
+            runs[user_id] = (first, last, length, longest)
+        return runs
+
+    @staticmethod
+    def completion_updates(runs) -> Dict[str, Any]:
+        """
+        SET expressions advancing the user's streak by a batch run
+
+        ``runs`` is a VALUES clause (or table) with first_day, last_day,
+        run_length and longest_run columns, joined to "user". A run that
+        starts at most one day after the last recorded day extends the
+        streak, anything later starts a new one. Runs starting on or before
+        that day may close a gap in the stored streak, which these
+        expressions cannot see: late_runs() flags them for backfill().
+        """
+        last = User.last_participation_date
+        current = func.coalesce(User.current_streak_days, 0)
+
+        streak = case(
+            (last.is_(None), runs.c.run_length),
+            (last >= runs.c.last_day, current),
+            (last >= runs.c.first_day - 1, current + (runs.c.last_day - last)),
+            else_=runs.c.run_length
+        )
+        return {
+            "last_participation_date": func.greatest(last, runs.c.last_day),
+            "current_streak_days": streak,
+            "longest_streak_days": func.greatest(
+                func.coalesce(User.longest_streak_days, 0), streak, runs.c.longest_run
+            ),
+        }
+
+    @staticmethod
+    def late_runs(runs):
+        """
+        WHERE clause and RETURNING column for runs that reach back into the streak
+
+        Add the clause to the UPDATE applying completion_updates() and
+        return the column: it is true for users whose batch run starts on
+        or before their previous last participation day.
+        """
+        return (
+            _previous.user_id == runs.c.user_id,
+            (runs.c.first_day <= _previous.last_participation_date).label("late")
+        )
+
+    @staticmethod
+    def backfill(db: Session, user_ids: Optional[Sequence[uuid.UUID]] = None) -> int:
+        """
+        Recompute the streak state from the completed sessions
+
+        One UPDATE ... FROM over a window query: consecutive days share
+        ``day - row_number()`` per user, so every run is one group. The
+        caller owns the transaction.
+
+        Args:
+            db: Database session
+            user_ids: Only recompute these users (defaults to every user
+                with a completed session)
+
+        Returns:
+            Number of users updated
+        """
+        completed = [SavingSession.status == "COMPLETED"]
+        if user_ids is not None:
+            completed.append(SavingSession.user_id.in_(user_ids))
+        days = (
+            select(SavingSession.user_id, cast(SavingSession.scheduled_start, Date).label("day"))
+            .where(*completed)
+            .distinct()
+            .cte("completed_days")
+        )
+        islands = (
+            select(
+                days.c.user_id,
+                days.c.day,
+                # date - integer is a date; row_number() is bigint
+                (
+                    days.c.day
+                    - cast(func.row_number().over(partition_by=days.c.user_id, order_by=days.c.day), Integer)
+                ).label("island")
+            )
+            .cte("islands")
+        )
+        runs = (
+            select(
+                islands.c.user_id,
+                func.max(islands.c.day).label("last_day"),
+                func.count().label("length")
+            )
+            .group_by(islands.c.user_id, islands.c.island)
+            .cte("runs")
+        )
+        streaks = (
+            select(
+                runs.c.user_id,
+                func.max(runs.c.last_day).label("last_day"),
+                array_agg(aggregate_order_by(runs.c.length, runs.c.last_day.desc()))[1].label("current"),
+                func.max(runs.c.length).label("longest")
+            )
+            .group_by(runs.c.user_id)
+            .cte("streaks")
+        )
+
+        result = db.execute(
+            update(User)
+            .where(User.user_id == streaks.c.user_id)
+            .values(
+                last_participation_date=streaks.c.last_day,
+                current_streak_days=streaks.c.current,
+                longest_streak_days=streaks.c.longest
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
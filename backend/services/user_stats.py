@@ -0,0 +1,166 @@
+"""
+User Stats
+
+Home-screen statistics for a user in one round trip: the user's totals
+and stored streak state, with session counts via COUNT(*) FILTER.
+Results are cached per user and invalidated when one of the user's
+sessions changes. Each API worker has its own cache, so invalidations
+are also sent on the user_stats channel and applied by every worker's
+listener (pg_listener, on_notify).
+"""
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import time
+import uuid
+
+from ..config import get_settings
+from ..models.saving_session import SavingSession
+from ..models.user import User
+from .cache import TTLCache
+from .pg_listener import notify_values
+
+settings = get_settings()
+
+# Postgres channel invalidations are sent on; the payload lists user ids
+STATS_CHANNEL = "user_stats"
+
+
+class UserStatsService:
+    """
+    Cached per-user session statistics
+
+    Args:
+        ttl_seconds: Lifetime of a cached entry
+        max_bytes: Approximate memory cap of the cache
+        clock: Monotonic time source (injectable for tests)
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int, clock: Callable[[], float] = time.monotonic):
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, max_bytes=max_bytes, clock=clock)
+
+    @staticmethod
+    def stats_query(user_id: uuid.UUID):
+        """The single statement behind get()"""
+        counts = (
+            select(
+                func.count().label("total_sessions"),
+                func.count().filter(SavingSession.status == "COMPLETED").label("completed_sessions")
+            )
+            .where(SavingSession.user_id == user_id)
+            .subquery("counts")
+        )
+
+        return (
+            select(
+                User.total_kwh_saved,
+                User.total_eur_saved,
+                User.total_co2_saved,
+                User.green_points_balance,
+                User.last_participation_date,
+                User.current_streak_days,
+                User.longest_streak_days,
+                counts.c.total_sessions,
+                counts.c.completed_sessions
+            )
+            .select_from(User)
+            .join(counts, true())
+            .where(User.user_id == user_id)
+        )
+
+    @staticmethod
+    def from_row(row, today: date) -> Dict[str, Any]:
+        """
+        Response fields from a stats_query row
+
+        The streak is current if its last day is today or yesterday.
+        """
+        completed = row.completed_sessions
+        total_kwh = row.total_kwh_saved or Decimal("0")
+        average = total_kwh / Decimal(completed) if completed else Decimal("0")
+        last_day = row.last_participation_date
+        current = last_day is not None and last_day >= today - timedelta(days=1)
+
+        return {
+            "total_sessions": row.total_sessions,
+            "completed_sessions": completed,
+            "total_kwh_saved": total_kwh,
+            "total_eur_saved": row.total_eur_saved or Decimal("0"),
+            "total_co2_saved": row.total_co2_saved or Decimal("0"),
+            "total_green_points": row.green_points_balance or 0,
+            "average_savings_per_session": average,
+            "current_streak_days": (row.current_streak_days or 0) if current else 0,
+            "longest_streak_days": row.longest_streak_days or 0,
+        }
+
+    def get(self, db: Session, user_id: uuid.UUID, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """
+        Statistics for a user
+
+        Args:
+            db: Database session
+            user_id: User
+            today: Reference day for the streak (defaults to UTC today)
+
+        Returns:
+            Statistics dictionary, or None if the user does not exist
+        """
+        today = today or datetime.utcnow().date()
+        cached = self._cache.get(user_id)
+        # A streak can lapse at midnight, so entries only serve their own day
+        if cached is not None and cached[0] == today:
+            return cached[1]
+
+        row = db.execute(self.stats_query(user_id)).first()
+        if row is None:
+            return None
+
+        stats = self.from_row(row, today)
+        self._cache.set(user_id, (today, stats))
+        return stats
+
+    def invalidate(self, user_ids: Iterable[uuid.UUID], db: Optional[Session] = None) -> None:
+        """
+        Drop the cached stats of users whose sessions changed
+
+        Args:
+            user_ids: Users to drop
+            db: Session of the transaction that changed them; when given,
+                every other process drops them too once it commits (call
+                before the commit)
+        """
+        user_ids = set(user_ids)
+        for user_id in user_ids:
+            self._cache.invalidate(user_id)
+        if db is not None and user_ids:
+            notify_values(db, STATS_CHANNEL, sorted(str(user_id) for user_id in user_ids))
+
+    async def on_notify(self, payloads: Optional[List[str]]) -> None:
+        """
+        pg_listener handler for STATS_CHANNEL
+
+        Invalidations may have been missed when payloads is None, so the
+        whole cache is dropped then.
+        """
+        if payloads is None:
+            self._cache.clear()
+            return
+        for payload in payloads:
+            for user_id in payload.split(","):
+                self._cache.invalidate(uuid.UUID(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters"""
+        return self._cache.stats()
+
+
+@lru_cache()
+def get_user_stats_service() -> UserStatsService:
+    """Get the process-wide user stats service"""
+    return UserStatsService(
+        ttl_seconds=settings.USER_STATS_CACHE_TTL_SECONDS,
+        max_bytes=settings.USER_STATS_CACHE_MAX_MB * 1024 * 1024
+    )
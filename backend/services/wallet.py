@@ -2,15 +2,23 @@
 Waste Wallet Service
 
 Manages Waste Wallet balance, transactions, and payments
+
+Balances only change through single statements that do the arithmetic in
+the database (upserts and conditional UPDATEs), so concurrent requests
+on one wallet never overwrite each other, and wallets only contend on
+their own row lock.
 """
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from decimal import Decimal
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, List, Optional, Sequence, Tuple
 import uuid
 
 from ..models.wallet import WasteWallet, WalletTransaction
-from ..models.user import User
+from .fixed_point import cents_to_eur, eur_to_cents, eur_to_column_cents
+from .wallet_rollup import WalletRollupService
 
 
 class WasteWalletService:
@@ -33,19 +41,60 @@ class WasteWalletService:
         wallet = db.query(WasteWallet).filter(WasteWallet.user_id == user_id).first()
 
         if not wallet:
-            wallet = WasteWallet(
-                user_id=user_id,
-                current_balance=Decimal("0"),
-                total_earned=Decimal("0"),
-                total_spent=Decimal("0"),
-                sessions_contributed=0
+            # Concurrent first requests may both get here; the loser's insert is a no-op
+            db.execute(
+                pg_insert(WasteWallet)
+                .values(
+                    wallet_id=uuid.uuid4(),
+                    user_id=user_id,
+                    current_balance=Decimal("0"),
+                    total_earned=Decimal("0"),
+                    total_spent=Decimal("0"),
+                    sessions_contributed=0
+                )
+                .on_conflict_do_nothing(index_elements=[WasteWallet.user_id])
             )
-            db.add(wallet)
             db.commit()
-            db.refresh(wallet)
+            wallet = db.query(WasteWallet).filter(WasteWallet.user_id == user_id).one()
 
         return wallet
 
+    @staticmethod
+    def _record(db: Session, wallet_change, transaction: dict) -> Optional[WalletTransaction]:
+        """
+        Apply a balance change and insert its transaction in one statement
+
+        ``wallet_change`` is an INSERT/UPDATE of waste_wallet RETURNING
+        current_balance; it runs as a data-modifying CTE whose returned
+        balance becomes the transaction's balance_after, so the write costs
+        one round trip. Nothing is inserted if the change matched no row.
+        The caller commits.
+
+        Returns:
+            The inserted transaction, or None if the wallet was not changed
+        """
+        wallet = wallet_change.cte("wallet")
+        table = WalletTransaction.__table__
+        fields = {"transaction_id": uuid.uuid4(), **transaction}
+
+        ledger = (
+            insert(WalletTransaction)
+            .from_select(
+                [*fields, "balance_after"],
+                select(
+                    *[literal(value, table.c[name].type) for name, value in fields.items()],
+                    wallet.c.current_balance
+                )
+            )
+            .returning(*table.c)
+            .cte("ledger")
+        )
+        row = db.execute(
+            select(ledger).add_cte(WalletRollupService.apply(ledger))
+        ).first()
+
+        return WalletTransaction(**row._mapping) if row is not None else None
+
     @staticmethod
     def credit_wallet(
         db: Session,
@@ -57,6 +106,10 @@ class WasteWalletService:
         """
         Credit amount to waste wallet
 
+        The wallet is created or incremented with INSERT ... ON CONFLICT
+        (user_id) DO UPDATE, and the transaction is inserted from the
+        balance it returns, in the same statement.
+
         Args:
             db: Database session
             user_id: User UUID
@@ -66,35 +119,134 @@ class WasteWalletService:
 
         Returns:
             Created transaction
+
+        Raises:
+            ValueError: If the amount rounds to less than one cent
         """
-        if amount <= 0:
+        # Checked after rounding: the columns would store 0.004 as 0.00
+        amount_cents = eur_to_column_cents(amount)
+        if amount_cents <= 0:
             raise ValueError("Credit amount must be positive")
+        amount = cents_to_eur(amount_cents)
 
-        # Get wallet
-        wallet = WasteWalletService.get_or_create_wallet(db, user_id)
-
-        # Update balance
-        wallet.current_balance += amount
-        wallet.total_earned += amount
-        if session_id:
-            wallet.sessions_contributed += 1
-
-        # Create transaction
-        transaction = WalletTransaction(
+        wallet = pg_insert(WasteWallet).values(
+            wallet_id=uuid.uuid4(),
             user_id=user_id,
-            type="CREDIT",
-            amount=amount,
-            balance_after=wallet.current_balance,
-            description=description,
-            session_id=session_id
+            current_balance=amount,
+            total_earned=amount,
+            total_spent=Decimal("0"),
+            sessions_contributed=1 if session_id else 0
         )
-
-        db.add(transaction)
+        wallet = wallet.on_conflict_do_update(
+            index_elements=[WasteWallet.user_id],
+            set_={
+                "current_balance": WasteWallet.current_balance + wallet.excluded.current_balance,
+                "total_earned": WasteWallet.total_earned + wallet.excluded.total_earned,
+                "sessions_contributed": (
+                    func.coalesce(WasteWallet.sessions_contributed, 0) + wallet.excluded.sessions_contributed
+                ),
+                "updated_at": func.now(),
+            }
+        ).returning(WasteWallet.current_balance)
+
+        transaction = WasteWalletService._record(db, wallet, {
+            "user_id": user_id,
+            "type": "CREDIT",
+            "amount": amount,
+            "description": description,
+            "session_id": session_id,
+        })
         db.commit()
-        db.refresh(transaction)
 
         return transaction
 
+    @staticmethod
+    def credit_many(
+        db: Session,
+        credits: Sequence[Tuple[uuid.UUID, int, Optional[uuid.UUID], str]]
+    ) -> List[WalletTransaction]:
+        """
+        Credit many wallets with two statements (the caller commits)
+
+        Wallets are created or incremented with one upsert of the per-user
+        sums; the balance it returns gives every transaction its
+        balance_after, and all transactions go in one multi-row INSERT.
+
+        Args:
+            db: Database session
+            credits: (user id, amount in cents, session id, description)
+                in the order they should appear in each ledger
+
+        Returns:
+            Created transactions, in input order
+        """
+        by_user: Dict[uuid.UUID, List[int]] = {}
+        for user_id, cents, session_id, _ in credits:
+            total = by_user.setdefault(user_id, [0, 0])
+            total[0] += cents
+            total[1] += 1 if session_id else 0
+
+        wallet_rows = pg_insert(WasteWallet).values([
+            {
+                "wallet_id": uuid.uuid4(),
+                "user_id": user_id,
+                "current_balance": cents_to_eur(total[0]),
+                "total_earned": cents_to_eur(total[0]),
+                "total_spent": cents_to_eur(0),
+                "sessions_contributed": total[1],
+            }
+            for user_id, total in sorted(by_user.items())
+        ])
+        balances = dict(db.execute(
+            wallet_rows.on_conflict_do_update(
+                index_elements=[WasteWallet.user_id],
+                set_={
+                    "current_balance": WasteWallet.current_balance + wallet_rows.excluded.current_balance,
+                    "total_earned": WasteWallet.total_earned + wallet_rows.excluded.total_earned,
+                    "sessions_contributed": (
+                        func.coalesce(WasteWallet.sessions_contributed, 0)
+                        + wallet_rows.excluded.sessions_contributed
+                    ),
+                    "updated_at": func.now(),
+                }
+            )
+            .returning(WasteWallet.user_id, WasteWallet.current_balance)
+        ).all())
+
+        # Balance before this batch, then forward through its credits
+        running = {
+            user_id: eur_to_cents(balances[user_id]) - total[0]
+            for user_id, total in by_user.items()
+        }
+        transactions = []
+        for user_id, cents, session_id, description in credits:
+            running[user_id] += cents
+            transactions.append({
+                "transaction_id": uuid.uuid4(),
+                "user_id": user_id,
+                "type": "CREDIT",
+                "amount": cents_to_eur(cents),
+                "balance_after": cents_to_eur(running[user_id]),
+                "description": description,
+                "session_id": session_id,
+            })
+
+        ledger = (
+            insert(WalletTransaction)
+            .values(transactions)
+            .returning(*WalletTransaction.__table__.c)
+            .cte("ledger")
+        )
+        rows = db.execute(
+            select(ledger).add_cte(WalletRollupService.apply(ledger))
+        ).all()
+        # RETURNING order is not guaranteed for multi-row inserts
+        position = {transaction["transaction_id"]: index for index, transaction in enumerate(transactions)}
+        return [
+            WalletTransaction(**row._mapping)
+            for row in sorted(rows, key=lambda row: position[row.transaction_id])
+        ]
+
     @staticmethod
     def debit_wallet(
         db: Session,
@@ -105,6 +257,10 @@ class WasteWalletService:
         """
         Debit amount from waste wallet
 
+        The balance is decremented with a conditional UPDATE ... WHERE
+        current_balance >= amount, and the transaction is inserted from
+        the balance it returns, in the same statement.
+
         Args:
             db: Database session
             user_id: User UUID
@@ -117,36 +273,38 @@ class WasteWalletService:
         Raises:
             ValueError: If insufficient balance
         """
-        if amount <= 0:
+        amount_cents = eur_to_column_cents(amount)
+        if amount_cents <= 0:
             raise ValueError("Debit amount must be positive")
-
-        # Get wallet
-        wallet = WasteWalletService.get_or_create_wallet(db, user_id)
-
-        # Check balance
-        if wallet.current_balance < amount:
-            raise ValueError(
-                f"Insufficient balance. Available: €{wallet.current_balance}, Required: €{amount}"
+        amount = cents_to_eur(amount_cents)
+
+        wallet = (
+            update(WasteWallet)
+            .where(WasteWallet.user_id == user_id, WasteWallet.current_balance >= amount)
+            .values(
+                current_balance=WasteWallet.current_balance - amount,
+                total_spent=func.coalesce(WasteWallet.total_spent, 0) + amount,
+                last_payment_date=datetime.utcnow(),
+                last_payment_amount=amount
             )
-
-        # Update balance
-        wallet.current_balance -= amount
-        wallet.total_spent += amount
-        wallet.last_payment_date = datetime.utcnow()
-        wallet.last_payment_amount = amount
-
-        # Create transaction
-        transaction = WalletTransaction(
-            user_id=user_id,
-            type="PAYMENT_TO_MUNICIPALITY",
-            amount=amount,
-            balance_after=wallet.current_balance,
-            description=description
+            .returning(WasteWallet.current_balance)
         )
 
-        db.add(transaction)
+        transaction = WasteWalletService._record(db, wallet, {
+            "user_id": user_id,
+            "type": "PAYMENT_TO_MUNICIPALITY",
+            "amount": amount,
+            "description": description,
+        })
+        if transaction is None:
+            # Only the failure path reads the balance, for the message
+            available = db.execute(
+                select(WasteWallet.current_balance).where(WasteWallet.user_id == user_id)
+            ).scalar() or Decimal("0")
+            raise ValueError(
+                f"Insufficient balance. Available: €{available}, Required: €{amount}"
+            )
         db.commit()
-        db.refresh(transaction)
 
         return transaction
 
@@ -160,6 +318,9 @@ class WasteWalletService:
         """
         Donate amount from wallet to Social Energy Fund
 
+        Same conditional UPDATE as debit_wallet, so concurrent donations
+        and payments can never spend the same euros twice.
+
         Args:
             db: Database session
             user_id: User UUID
@@ -172,33 +333,31 @@ class WasteWalletService:
         Raises:
             ValueError: If insufficient balance
         """
-        if amount <= 0:
+        amount_cents = eur_to_column_cents(amount)
+        if amount_cents <= 0:
             raise ValueError("Donation amount must be positive")
-
-        # Get wallet
-        wallet = WasteWalletService.get_or_create_wallet(db, user_id)
-
-        # Check balance
-        if wallet.current_balance < amount:
-            raise ValueError(f"Insufficient balance for donation")
-
-        # Update balance
-        wallet.current_balance -= amount
-        wallet.total_spent += amount
-
-        # Create transaction
-        transaction = WalletTransaction(
-            user_id=user_id,
-            type="DONATION",
-            amount=amount,
-            balance_after=wallet.current_balance,
-            description=f"Donation to Energy Solidarity Fund",
-            donation_recipient_id=recipient_fund_id
+        amount = cents_to_eur(amount_cents)
+
+        wallet = (
+            update(WasteWallet)
+            .where(WasteWallet.user_id == user_id, WasteWallet.current_balance >= amount)
+            .values(
+                current_balance=WasteWallet.current_balance - amount,
+                total_spent=func.coalesce(WasteWallet.total_spent, 0) + amount
+            )
+            .returning(WasteWallet.current_balance)
         )
 
-        db.add(transaction)
+        transaction = WasteWalletService._record(db, wallet, {
+            "user_id": user_id,
+            "type": "DONATION",
+            "amount": amount,
+            "description": "Donation to Energy Solidarity Fund",
+            "donation_recipient_id": recipient_fund_id,
+        })
+        if transaction is None:
+            raise ValueError("Insufficient balance for donation")
         db.commit()
-        db.refresh(transaction)
 
         return transaction
 
@@ -257,6 +416,9 @@ class WasteWalletService:
         """
         Get monthly summary of wallet activity
 
+        Read from wallet_monthly_rollup: at most one row per transaction
+        type, however long the user's history.
+
         Args:
             db: Database session
             user_id: User UUID
@@ -266,36 +428,25 @@ class WasteWalletService:
         Returns:
             Dictionary with monthly stats
         """
-        from sqlalchemy import extract, func
+        return WalletRollupService.user_month(db, user_id, year, month)
 
-        # Get transactions for the month
-        transactions = (
-            db.query(WalletTransaction)
-            .filter(
-                WalletTransaction.user_id == user_id,
-                extract('year', WalletTransaction.created_at) == year,
-                extract('month', WalletTransaction.created_at) == month
-            )
-            .all()
-        )
+    @staticmethod
+    def get_municipality_monthly_summary(
+        db: Session,
+        municipality_id: uuid.UUID,
+        year: int,
+        month: int
+    ) -> dict:
+        """
+        Get monthly wallet activity of all users in a municipality
 
-        # Calculate totals
-        total_credits = sum(
-            t.amount for t in transactions if t.type == "CREDIT"
-        )
-        total_debits = sum(
-            t.amount for t in transactions if t.type in ["PAYMENT_TO_MUNICIPALITY", "DEBIT"]
-        )
-        total_donations = sum(
-            t.amount for t in transactions if t.type == "DONATION"
-        )
+        Args:
+            db: Database session
+            municipality_id: Municipality UUID
+            year: Year
+            month: Month (1-12)
 
-        return {
-            "year": year,
-            "month": month,
-            "total_credits": total_credits,
-            "total_debits": total_debits,
-            "total_donations": total_donations,
-            "net_change": total_credits - total_debits - total_donations,
-            "transaction_count": len(transactions)
-        }
+        Returns:
+            Dictionary with monthly stats
+        """
+        return WalletRollupService.municipality_month(db, municipality_id, year, month)
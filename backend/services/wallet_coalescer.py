@@ -0,0 +1,226 @@
+"""
+Wallet Write Coalescer
+
+Group commit for wallet credits. Concurrent requests hand their credit to
+the coalescer and await it; credits arriving within a few milliseconds of
+each other are written together by WasteWalletService.credit_many (one
+wallet upsert, one multi-row INSERT) and committed once, so a burst of
+credits at session end costs one fsync per batch instead of one per
+credit.
+"""
+from sqlalchemy.orm import Session
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+import uuid
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models.wallet import WalletTransaction
+from .fixed_point import eur_to_column_cents
+from .wallet import WasteWalletService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+Credit = Tuple[uuid.UUID, int, Optional[uuid.UUID], str]
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 10, 100, 1000)
+
+
+class CommitOutcomeUnknown(Exception):
+    """COMMIT was sent but its result never arrived; the credits may be in the ledger"""
+
+
+class WalletWriteCoalescer:
+    """
+    Collects wallet credits and flushes them as one transaction
+
+    A batch is flushed when it reaches ``max_batch`` credits or
+    ``max_delay_ms`` after its first credit, whichever comes first.
+    Batches are written in a worker thread. If a batch fails before its
+    COMMIT is sent, nothing was written and its credits are retried one
+    by one, so a single bad credit (e.g. an unknown user) only fails its
+    own caller. If the COMMIT itself fails, the batch may have been
+    written, so its callers get CommitOutcomeUnknown and nothing is
+    retried.
+
+    Args:
+        session_factory: Creates a database session per batch
+        max_delay_ms: Longest a credit waits for others to join its batch
+        max_batch: Credits per batch
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_delay_ms: Optional[float] = None,
+        max_batch: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.max_delay = (
+            max_delay_ms if max_delay_ms is not None else settings.WALLET_COALESCE_MAX_DELAY_MS
+        ) / 1000
+        self.max_batch = max_batch or settings.WALLET_COALESCE_MAX_BATCH
+
+        self._pending: List[Tuple[Credit, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks
+        self._writers: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.credits = 0
+        self.largest_batch = 0
+        self.fallbacks = 0
+        self.failed_credits = 0
+        self.flush_seconds = 0.0
+        self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    async def credit(
+        self,
+        user_id: uuid.UUID,
+        amount: Decimal,
+        session_id: Optional[uuid.UUID] = None,
+        description: str = "Savings from session"
+    ) -> WalletTransaction:
+        """
+        Credit a wallet as part of the next batch
+
+        Same contract as WasteWalletService.credit_wallet; the amount is
+        rounded to cents the way the DECIMAL(10, 2) columns round it.
+
+        Raises:
+            ValueError: If the amount rounds to less than one cent
+            CommitOutcomeUnknown: If the batch's COMMIT failed
+        """
+        amount_cents = eur_to_column_cents(amount)
+        if amount_cents <= 0:
+            raise ValueError("Credit amount must be positive")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((user_id, amount_cents, session_id, description), future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Hand the pending credits to a writer task"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            writer = asyncio.get_running_loop().create_task(self._write(batch))
+            self._writers.add(writer)
+            writer.add_done_callback(self._writers.discard)
+
+    async def drain(self) -> None:
+        """Write the pending credits now and wait for every batch in flight (shutdown)"""
+        self._flush()
+        await asyncio.gather(*self._writers, return_exceptions=True)
+
+    async def _write(self, batch: List[Tuple[Credit, asyncio.Future]]) -> None:
+        started = time.perf_counter()
+        credits = [credit for credit, _ in batch]
+        try:
+            results = await asyncio.to_thread(self._commit, credits)
+        except CommitOutcomeUnknown as e:
+            logger.error(f"Commit of a wallet batch of {len(batch)} credits failed, not retrying: {e}")
+            self._fail(batch, e)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch, e)
+                return
+            # Rolled back before COMMIT: none of these credits were written
+            logger.warning(f"Wallet batch of {len(batch)} credits failed, retrying one by one: {e}")
+            self.fallbacks += 1
+            for item in batch:
+                await self._write([item])
+            return
+
+        self._record_batch(len(batch), time.perf_counter() - started)
+        for (_, future), transaction in zip(batch, results):
+            self._settle(future, result=transaction)
+
+    def _commit(self, credits: List[Credit]) -> List[WalletTransaction]:
+        """
+        Write and commit one batch (runs in a worker thread)
+
+        Raises:
+            CommitOutcomeUnknown: If the COMMIT failed; any other error
+                means the transaction was rolled back
+        """
+        db = self.session_factory()
+        try:
+            try:
+                transactions = WasteWalletService.credit_many(db, credits)
+            except Exception:
+                db.rollback()
+                raise
+            try:
+                db.commit()
+            except Exception as e:
+                raise CommitOutcomeUnknown(str(e)) from e
+            return transactions
+        finally:
+            db.close()
+
+    def _fail(self, batch: List[Tuple[Credit, asyncio.Future]], error: BaseException) -> None:
+        self.failed_credits += len(batch)
+        for _, future in batch:
+            self._settle(future, error=error)
+
+    @staticmethod
+    def _settle(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        # The caller may have gone away (e.g. client disconnect)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _record_batch(self, size: int, seconds: float) -> None:
+        self.batches += 1
+        self.credits += size
+        self.largest_batch = max(self.largest_batch, size)
+        self.flush_seconds += seconds
+        bucket = next(
+            (index for index, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+            len(BATCH_SIZE_BUCKETS)
+        )
+        self.batch_sizes[bucket] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch size and flush latency metrics"""
+        labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "batches": self.batches,
+            "credits": self.credits,
+            "average_batch_size": round(self.credits / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "batch_size_histogram": dict(zip(labels, self.batch_sizes)),
+            "average_flush_ms": round(self.flush_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+            "failed_credits": self.failed_credits,
+            "pending": len(self._pending),
+            "writing": len(self._writers),
+            "max_delay_ms": self.max_delay * 1000,
+            "max_batch": self.max_batch,
+        }
+
+
+@lru_cache()
+def get_wallet_coalescer() -> WalletWriteCoalescer:
+    """Get the process-wide wallet write coalescer"""
+    return WalletWriteCoalescer(session_factory=SessionLocal)
@@ -0,0 +1,168 @@
+"""
+Wallet Monthly Rollup
+
+Per-user monthly totals by transaction type, kept in wallet_monthly_rollup.
+Every ledger write upserts its rows into the rollup in the same statement
+(a data-modifying CTE over the inserted transactions), so monthly summaries
+read a handful of rows instead of scanning the ledger. rebuild() recomputes
+the table from wallet_transaction for existing data.
+"""
+from sqlalchemy import Integer, cast, delete, extract, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Tuple
+import uuid
+
+from ..models.user import User
+from ..models.wallet import WalletMonthlyRollup, WalletTransaction
+
+# Transaction types counted as debits in summaries
+DEBIT_TYPES = ("PAYMENT_TO_MUNICIPALITY", "DEBIT")
+
+
+class WalletRollupService:
+    """
+    Monthly wallet totals
+    """
+
+    @staticmethod
+    def _monthly_totals(transactions):
+        """Ledger rows (table or CTE) grouped by rollup key"""
+        year = cast(extract("year", transactions.c.created_at), Integer)
+        month = cast(extract("month", transactions.c.created_at), Integer)
+        return (
+            select(
+                transactions.c.user_id,
+                year,
+                month,
+                transactions.c.type,
+                func.sum(transactions.c.amount),
+                func.count()
+            )
+            .group_by(transactions.c.user_id, year, month, transactions.c.type)
+        )
+
+    @staticmethod
+    def apply(ledger):
+        """
+        Upsert adding newly inserted transactions to the rollup
+
+        ``ledger`` is the CTE of an INSERT INTO wallet_transaction ...
+        RETURNING; attach the result to the outer statement with
+        ``add_cte`` so it runs in the same statement. Rows are grouped
+        first, as ON CONFLICT cannot touch a row twice.
+        """
+        rollup = pg_insert(WalletMonthlyRollup).from_select(
+            ["user_id", "year", "month", "type", "total_amount", "transaction_count"],
+            WalletRollupService._monthly_totals(ledger)
+        )
+        return rollup.on_conflict_do_update(
+            index_elements=[
+                WalletMonthlyRollup.user_id,
+                WalletMonthlyRollup.year,
+                WalletMonthlyRollup.month,
+                WalletMonthlyRollup.type
+            ],
+            set_={
+                "total_amount": WalletMonthlyRollup.total_amount + rollup.excluded.total_amount,
+                "transaction_count": WalletMonthlyRollup.transaction_count + rollup.excluded.transaction_count,
+            }
+        ).cte("rollup")
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Recompute the rollup from the ledger
+
+        Replaces the table contents in one DELETE and one INSERT ...
+        SELECT under an EXCLUSIVE lock: reads continue, ledger writes
+        (which upsert the rollup) wait until the caller commits, so none
+        is counted twice or missed.
+
+        Returns:
+            Number of rollup rows written
+        """
+        db.execute(text(f"LOCK TABLE {WalletMonthlyRollup.__tablename__} IN EXCLUSIVE MODE"))
+        db.execute(delete(WalletMonthlyRollup))
+        result = db.execute(
+            pg_insert(WalletMonthlyRollup).from_select(
+                ["user_id", "year", "month", "type", "total_amount", "transaction_count"],
+                WalletRollupService._monthly_totals(WalletTransaction.__table__)
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def summarize(year: int, month: int, totals: Iterable[Tuple[str, Decimal, int]]) -> Dict[str, Any]:
+        """
+        Monthly summary fields from (type, amount, count) rows
+        """
+        totals = list(totals)
+        amounts = {kind: amount for kind, amount, _ in totals}
+        zero = Decimal("0.00")
+        total_credits = amounts.get("CREDIT", zero)
+        total_debits = sum((amounts.get(kind, zero) for kind in DEBIT_TYPES), zero)
+        total_donations = amounts.get("DONATION", zero)
+
+        return {
+            "year": year,
+            "month": month,
+            "total_credits": total_credits,
+            "total_debits": total_debits,
+            "total_donations": total_donations,
+            "net_change": total_credits - total_debits - total_donations,
+            "transaction_count": sum(int(count) for _, _, count in totals)
+        }
+
+    @staticmethod
+    def user_month(db: Session, user_id: uuid.UUID, year: int, month: int) -> Dict[str, Any]:
+        """
+        A user's monthly summary: a primary key range lookup
+
+        Args:
+            db: Database session
+            user_id: User UUID
+            year: Year
+            month: Month (1-12)
+        """
+        totals = db.execute(
+            select(
+                WalletMonthlyRollup.type,
+                WalletMonthlyRollup.total_amount,
+                WalletMonthlyRollup.transaction_count
+            )
+            .where(
+                WalletMonthlyRollup.user_id == user_id,
+                WalletMonthlyRollup.year == year,
+                WalletMonthlyRollup.month == month
+            )
+        ).all()
+        return WalletRollupService.summarize(year, month, totals)
+
+    @staticmethod
+    def municipality_month(db: Session, municipality_id: uuid.UUID, year: int, month: int) -> Dict[str, Any]:
+        """
+        Monthly totals over all users of a municipality
+
+        Args:
+            db: Database session
+            municipality_id: Municipality UUID
+            year: Year
+            month: Month (1-12)
+        """
+        totals = db.execute(
+            select(
+                WalletMonthlyRollup.type,
+                func.sum(WalletMonthlyRollup.total_amount),
+                func.sum(WalletMonthlyRollup.transaction_count)
+            )
+            .join(User, User.user_id == WalletMonthlyRollup.user_id)
+            .where(
+                User.municipality_id == municipality_id,
+                WalletMonthlyRollup.year == year,
+                WalletMonthlyRollup.month == month
+            )
+            .group_by(WalletMonthlyRollup.type)
+        ).all()
+        return {"municipality_id": municipality_id, **WalletRollupService.summarize(year, month, totals)}
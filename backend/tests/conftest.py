@@ -0,0 +1,89 @@
+"""
+Shared test doubles
+
+FakeDB stands in for a SQLAlchemy session in unit tests that check which
+statements a service issues. It compiles each statement for Postgres,
+records it and answers with canned rows. What those statements do to real
+rows is covered by tests/test_postgres_integration.py.
+"""
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from sqlalchemy.dialects import postgresql
+
+Rows = Union[list, Callable[[Dict[str, Any]], list]]
+
+
+class FakeResult(list):
+    """Canned rows with the Result accessors the services use"""
+
+    def __init__(self, rows=(), rowcount: Optional[int] = None):
+        super().__init__(rows)
+        self.rowcount = len(self) if rowcount is None else rowcount
+
+    def all(self):
+        return list(self)
+
+    def first(self):
+        return self[0] if self else None
+
+    def scalar(self):
+        return self[0][0] if self else None
+
+    def partitions(self):
+        return [list(self)] if self else []
+
+
+class FakeDB:
+    """
+    Records compiled statements and answers them with canned rows
+
+    Responses are matched in the order they were added; a statement no
+    response matches gets an empty result.
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.params: List[Dict[str, Any]] = []
+        self.responses = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def respond(
+        self,
+        rows: Rows,
+        prefix: str = "",
+        contains: Optional[str] = None,
+        rowcount: Optional[int] = None
+    ) -> "FakeDB":
+        """
+        Answer statements starting with ``prefix`` (and containing ``contains``)
+
+        ``rows`` may be a callable taking the statement's bound parameters.
+        """
+        self.responses.append((prefix, contains, rows, rowcount))
+        return self
+
+    def execute(self, statement):
+        compiled = statement.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        self.statements.append(sql)
+        self.params.append(compiled.params)
+
+        for prefix, contains, rows, rowcount in self.responses:
+            if sql.startswith(prefix) and (contains is None or contains in sql):
+                return FakeResult(rows(compiled.params) if callable(rows) else rows, rowcount)
+        return FakeResult()
+
+    def executed(self, prefix: str) -> List[Dict[str, Any]]:
+        """Bound parameters of every statement starting with ``prefix``"""
+        return [params for sql, params in zip(self.statements, self.params) if sql.startswith(prefix)]
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,159 @@
+"""
+Unit tests for the AHK Meter Data Service (against a fake AHK server)
+"""
+import pytest
+import asyncio
+import warnings
+from datetime import datetime, timedelta
+
+import httpx
+
+from backend.services.ahk_meter import AhkMeterService
+
+
+class FakeAhkServer:
+    """In-process AHK API: hourly 0.5 kWh readings for known meters"""
+
+    def __init__(self, meters, delay=0.0):
+        self.meters = set(meters)
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        if request.headers.get("X-API-Key") != "test-key":
+            return httpx.Response(401)
+        meter_id = request.url.path.split("/")[-2]
+        if meter_id == "BROKEN":
+            return httpx.Response(503)
+        if meter_id not in self.meters:
+            return httpx.Response(404)
+
+        start = datetime.fromisoformat(request.url.params["from"])
+        end = datetime.fromisoformat(request.url.params["to"])
+        hours = int((end - start).total_seconds() // 3600)
+        return httpx.Response(200, json={
+            "meter_id": meter_id,
+            "readings": [
+                {"timestamp": (start + timedelta(hours=hour)).isoformat(), "consumption_kwh": 0.5}
+                for hour in range(hours)
+            ]
+        })
+
+
+def _service(server, **options):
+    return AhkMeterService(
+        base_url="http://ahk.test/api",
+        api_key="test-key",
+        transport=httpx.MockTransport(server),
+        **options
+    )
+
+
+START = datetime(2025, 3, 1)
+END = datetime(2025, 3, 11)
+
+
+class TestAhkMeterService:
+    """Tests for pooled, batched history fetches"""
+
+    @pytest.mark.asyncio
+    async def test_get_history_parses_readings(self):
+        """Readings come back as a ConsumptionSeries"""
+        service = _service(FakeAhkServer(["AHK1"]))
+        series = await service.get_history("AHK1", START, END)
+        await service.aclose()
+
+        assert series.meter_id == "AHK1"
+        assert len(series) == 240
+        assert series.window_sum(START, START + timedelta(hours=3)) == pytest.approx(1.5)
+
+    @pytest.mark.asyncio
+    async def test_unknown_and_failing_meters_return_none(self):
+        """404s and server errors do not raise"""
+        service = _service(FakeAhkServer(["AHK1"]))
+        histories = await service.get_histories(["AHK1", "AHK404", "BROKEN"], START, END)
+        await service.aclose()
+
+        assert histories["AHK1"] is not None
+        assert histories["AHK404"] is None
+        assert histories["BROKEN"] is None
+
+    @pytest.mark.asyncio
+    async def test_offsets_are_converted_without_warnings(self):
+        """UTC offsets are applied to the readings and unparseable timestamps reject the history"""
+        def server(readings):
+            return lambda request: httpx.Response(200, json={"readings": readings})
+
+        offsets = _service(server([
+            {"timestamp": "2025-03-01T00:00:00Z", "consumption_kwh": 0.5},
+            {"timestamp": "2025-03-01T03:00:00+02:00", "consumption_kwh": 0.5},
+        ]))
+        malformed = _service(server([{"timestamp": "", "consumption_kwh": 0.5}]))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            series = await offsets.get_history("AHK1", START, END)
+            rejected = await malformed.get_history("AHK1", START, END)
+        await offsets.aclose()
+        await malformed.aclose()
+
+        assert len(series) == 2
+        assert series.window_sum(START, START + timedelta(hours=2)) == 1.0
+        assert rejected is None
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """No more than max_concurrency requests are in flight"""
+        server = FakeAhkServer([f"AHK{i}" for i in range(20)], delay=0.01)
+        service = _service(server, max_concurrency=4)
+        histories = await service.get_histories([f"AHK{i}" for i in range(20)], START, END)
+        await service.aclose()
+
+        assert all(history is not None for history in histories.values())
+        assert len(server.requests) == 20
+        assert server.max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_duplicate_requests_are_coalesced(self):
+        """Concurrent requests for the same meter and window share one fetch"""
+        server = FakeAhkServer(["AHK1", "AHK2"], delay=0.01)
+        service = _service(server)
+        first, second, other = await asyncio.gather(
+            service.get_history("AHK1", START, END),
+            service.get_history("AHK1", START, END),
+            service.get_histories(["AHK1", "AHK2", "AHK2"], START, END),
+        )
+        await service.aclose()
+
+        assert first is second
+        assert other["AHK1"] is first
+        assert len(server.requests) == 2
+
+        # Completed fetches are not cached
+        await service.get_history("AHK1", START, END)
+        assert len(server.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_client_is_reused(self):
+        """All requests go through one long-lived client"""
+        service = _service(FakeAhkServer(["AHK1"]))
+        await service.get_history("AHK1", START, END)
+        client = service._client
+        await service.get_history("AHK1", START, END + timedelta(days=1))
+
+        assert service._client is client
+        await service.aclose()
+        assert service._client is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -2,12 +2,71 @@
 Unit tests for Baseline Calculation Service
 """
 import pytest
+import random
+import statistics
 from datetime import datetime, timedelta
 from decimal import Decimal
 
 from backend.services.baseline import BaselineService
 
 
+def _legacy_window_sums(historical_data, day_starts, duration_hours):
+    """Per-window list scan, as the baseline was originally computed"""
+    sums = []
+    for day_start in day_starts:
+        day_end = day_start + timedelta(hours=duration_hours)
+        sums.append(sum(
+            Decimal(str(entry["consumption_kwh"]))
+            for entry in historical_data
+            if day_start <= entry["timestamp"] < day_end
+        ))
+    return [value for value in sums if value > 0]
+
+
+def _legacy_average(values):
+    """The original outlier removal, on the original Decimal window sums"""
+    if len(values) < 3:
+        return Decimal(str(statistics.mean(values)))
+    float_values = [float(v) for v in values]
+    mean = statistics.mean(float_values)
+    std_dev = statistics.stdev(float_values)
+    filtered = [v for v in float_values if abs(v - mean) <= 2 * std_dev] or float_values
+    return Decimal(str(statistics.mean(filtered)))
+
+
+def _legacy_10_day_average(historical_data, session_start, duration_hours=3):
+    if not historical_data or len(historical_data) < 5:
+        return None
+    sums = _legacy_window_sums(
+        historical_data, [session_start - timedelta(days=i) for i in range(1, 11)], duration_hours
+    )
+    return _legacy_average(sums) if len(sums) >= 5 else None
+
+
+def _legacy_same_weekday_average(historical_data, session_start, duration_hours=3, weeks_back=4):
+    hour_start = session_start.replace(minute=0, second=0, microsecond=0)
+    sums = _legacy_window_sums(
+        historical_data, [hour_start - timedelta(weeks=i) for i in range(1, weeks_back + 1)], duration_hours
+    )
+    return _legacy_average(sums) if len(sums) >= 2 else None
+
+
+def _random_history(seed, days=35):
+    """Shuffled hourly readings with a few gaps, to the 4 decimals meters report"""
+    rng = random.Random(seed)
+    base = datetime(2025, 3, 1, 0, 0)
+    data = [
+        {
+            "timestamp": base + timedelta(hours=hour),
+            "consumption_kwh": round(rng.uniform(0.2, 1.0), 4)
+        }
+        for hour in range(days * 24)
+        if rng.random() > 0.05
+    ]
+    rng.shuffle(data)
+    return data
+
+
 class TestBaselineService:
     """Tests for baseline calculation"""
 
@@ -110,6 +169,113 @@ class TestBaselineService:
         assert baseline is not None
         assert 1.6 <= baseline <= 2.0
 
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_10_day_average_matches_list_scan(self, seed):
+        """Vectorized window sums agree with a per-window list scan"""
+        historical_data = _random_history(seed)
+        session_start = datetime(2025, 4, 2, 17, 0, 0, 250000)
+
+        baseline = BaselineService.calculate_10_day_average(
+            historical_data=historical_data,
+            session_start=session_start,
+            session_duration_hours=3
+        )
+
+        assert baseline == _legacy_10_day_average(historical_data, session_start, 3)
+
+    @pytest.mark.parametrize("seed", [4, 5])
+    def test_same_weekday_average_matches_list_scan(self, seed):
+        """Vectorized weekday windows agree with a per-window list scan"""
+        historical_data = _random_history(seed)
+        session_start = datetime(2025, 4, 4, 17, 30)
+
+        baseline = BaselineService.calculate_same_weekday_average(
+            historical_data=historical_data,
+            session_start=session_start,
+            session_duration_hours=3,
+            weeks_back=4
+        )
+
+        assert baseline == _legacy_same_weekday_average(historical_data, session_start, 3, 4)
+
+    def test_window_excludes_end_boundary(self):
+        """Readings at the window end belong to the next window"""
+        base_date = datetime(2025, 1, 1, 17, 0)
+        historical_data = []
+
+        for day in range(1, 11):
+            session_start = base_date - timedelta(days=day)
+            for hour_offset in range(4):  # 17:00-20:00 inclusive
+                historical_data.append({
+                    "timestamp": session_start + timedelta(hours=hour_offset),
+                    "consumption_kwh": Decimal("0.5")
+                })
+
+        baseline = BaselineService.calculate_10_day_average(
+            historical_data=historical_data,
+            session_start=base_date,
+            session_duration_hours=3
+        )
+
+        assert baseline == Decimal("1.5")
+
+    def test_calculate_many_matches_single(self):
+        """Cohort calculation agrees with per-user calculation"""
+        session_start = datetime(2025, 4, 2, 17, 0)
+        histories = [_random_history(seed) for seed in range(10, 16)]
+
+        # Sparse history: only 4 of the last 10 days have data -> None
+        histories.append([
+            entry for entry in _random_history(20)
+            if entry["timestamp"].day % 3 == 0
+        ])
+        # Too few readings -> None
+        histories.append(_random_history(21)[:3])
+        # One extreme day that outlier removal has to drop
+        outlier = [
+            {
+                "timestamp": session_start - timedelta(days=day) + timedelta(hours=hour),
+                "consumption_kwh": 10.0 if day == 5 else 0.5
+            }
+            for day in range(1, 11)
+            for hour in range(3)
+        ]
+        histories.append(outlier)
+
+        results = BaselineService.calculate_many(histories, session_start, 3)
+
+        assert len(results) == len(histories)
+        for history, result in zip(histories, results):
+            assert result == BaselineService.calculate_10_day_average(history, session_start, 3)
+            assert str(result) == str(_legacy_10_day_average(history, session_start, 3))
+
+        assert results[-1] == Decimal("1.5")
+
+    def test_random_inputs_match_legacy_digit_for_digit(self):
+        """Many random histories and windows give exactly the original results"""
+        rng = random.Random(2000)
+        for trial in range(300):
+            base = datetime(2025, 3, 1) + timedelta(minutes=15 * rng.randrange(96))
+            step = timedelta(minutes=rng.choice([15, 30, 60]))
+            history = [
+                {"timestamp": base + step * index, "consumption_kwh": rng.randrange(1, 30000) / 10000}
+                for index in range(int(timedelta(days=30) / step))
+                if rng.random() > 0.1
+            ]
+            session_start = base + timedelta(days=30, minutes=15 * rng.randrange(96))
+            hours = rng.randint(1, 4)
+
+            assert str(BaselineService.calculate_10_day_average(history, session_start, hours)) == str(
+                _legacy_10_day_average(history, session_start, hours)
+            ), trial
+            assert BaselineService.calculate_same_weekday_average(history, session_start, hours, 4) == (
+                _legacy_same_weekday_average(history, session_start, hours, 4)
+            ), trial
+
+    def test_calculate_many_empty(self):
+        """Empty cohort returns no baselines"""
+        assert BaselineService.calculate_many([], datetime(2025, 1, 1, 17, 0)) == []
+
     def test_seasonal_adjustment_summer(self):
         """Test seasonal adjustment for summer months"""
         baseline = Decimal("2.0")
@@ -0,0 +1,56 @@
+"""
+Unit tests for the Cohort Batch Executor
+"""
+import pytest
+from datetime import datetime
+
+import numpy as np
+
+from backend.services.baseline import BaselineService
+from backend.services.batch_executor import CohortBatchExecutor
+from backend.services.consumption import ConsumptionSeries, to_epoch_us, US_PER_HOUR
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = CohortBatchExecutor(max_workers=2, min_rows_per_worker=10)
+    yield executor
+    executor.shutdown()
+
+
+def _cohort(users=60):
+    rng = np.random.default_rng(42)
+    timestamps = to_epoch_us(datetime(2025, 3, 1)) + np.arange(35 * 24) * US_PER_HOUR
+    return [
+        ConsumptionSeries(timestamps[: 24 * 35 - index], rng.uniform(0.2, 1.0, 24 * 35 - index))
+        for index in range(users)
+    ]
+
+
+class TestCohortBatchExecutor:
+    """Tests for process-pool fan-out"""
+
+    def test_baselines_match_inline(self, executor):
+        """Sharded baselines equal the single-process and per-user calculations"""
+        cohort = _cohort()
+        session_start = datetime(2025, 4, 2, 17, 0)
+
+        baselines = executor.calculate_baselines(cohort, session_start, 3)
+
+        assert baselines == BaselineService.calculate_many(cohort, session_start, 3)
+        assert [str(baseline) for baseline in baselines] == [
+            str(BaselineService.calculate_10_day_average(series, session_start, 3)) for series in cohort
+        ]
+
+    def test_small_cohort_runs_inline(self):
+        """Cohorts below the parallel threshold never start a pool"""
+        executor = CohortBatchExecutor(max_workers=4, min_rows_per_worker=1000)
+        cohort = _cohort(users=5)
+
+        executor.calculate_baselines(cohort, datetime(2025, 4, 2, 17, 0), 3)
+
+        assert executor._pool is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+"""
+Unit tests for the TTL/LRU cache and the baseline cache
+"""
+import pytest
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from backend.config import get_settings
+from backend.services.cache import TTLCache, approximate_size
+from backend.services.baseline_cache import BaselineCache, next_precompute
+
+settings = get_settings()
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Tests for expiry, eviction and counters"""
+
+    def test_hit_and_miss_counters(self):
+        """Lookups are counted"""
+        cache = TTLCache(ttl_seconds=60, max_bytes=10_000)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_entries_expire(self):
+        """Entries past their TTL are misses"""
+        clock = FakeClock()
+        cache = TTLCache(ttl_seconds=10, max_bytes=10_000, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10.0
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+
+    def test_lru_eviction_at_memory_cap(self):
+        """Least recently used entries go first when the cap is reached"""
+        entry_size = approximate_size(("k", 0), 0)
+        cache = TTLCache(ttl_seconds=60, max_bytes=entry_size * 3)
+        for index in range(3):
+            cache.set(("k", index), index)
+
+        cache.get(("k", 0))  # refresh 0, so 1 is now least recently used
+        cache.set(("k", 3), 3)
+
+        assert cache.get(("k", 1)) is None
+        assert cache.get(("k", 0)) == 0
+        assert cache.get(("k", 3)) == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate(self):
+        """Invalidated entries are gone"""
+        cache = TTLCache(ttl_seconds=60, max_bytes=10_000)
+        cache.set("a", 1)
+        cache.invalidate("a")
+
+        assert cache.get("a") is None
+        assert cache.stats()["approximate_bytes"] == 0
+
+
+class TestBaselineCache:
+    """Tests for baseline keys and the nightly schedule"""
+
+    def test_key_includes_slot_method_and_date(self):
+        """Different slot, method or date do not share an entry"""
+        cache = BaselineCache(ttl_seconds=60, max_bytes=100_000)
+        user_id = uuid.uuid4()
+        cache.put(user_id, datetime(2025, 7, 1, 17, 0), 3, Decimal("1.8"))
+
+        assert cache.get(user_id, datetime(2025, 7, 1, 17, 0), 3) == Decimal("1.8")
+        assert cache.get(user_id, datetime(2025, 7, 1, 18, 0), 3) is None
+        assert cache.get(user_id, datetime(2025, 7, 1, 17, 0), 2) is None
+        assert cache.get(user_id, datetime(2025, 7, 2, 17, 0), 3) is None
+        assert cache.get(user_id, datetime(2025, 7, 1, 17, 0), 3, method="SAME_WEEKDAY_AVERAGE") is None
+
+    def test_nightly_entries_are_alive_at_the_peak(self):
+        """The precompute runs after the last lookback window and its entries outlive the peak start"""
+        run_at = next_precompute(datetime(2025, 7, 1, 0, 30))
+        peak_start = datetime.combine(run_at.date(), time(settings.PEAK_HOURS_START))
+        last_window_end = datetime.combine(run_at.date() - timedelta(days=1), time(settings.PEAK_HOURS_END))
+        settle_delay = timedelta(minutes=settings.SCHEDULER_SETTLE_DELAY_MINUTES)
+        assert last_window_end + settle_delay <= run_at < peak_start
+
+        clock = FakeClock()
+        cache = BaselineCache(
+            ttl_seconds=settings.BASELINE_CACHE_TTL_HOURS * 3600,
+            max_bytes=100_000,
+            clock=clock
+        )
+        user_id = uuid.uuid4()
+        cache.put(user_id, peak_start, settings.SESSION_DURATION_HOURS, Decimal("1.8"))
+
+        clock.now += (peak_start - run_at).total_seconds()
+        assert cache.get(user_id, peak_start, settings.SESSION_DURATION_HOURS) == Decimal("1.8")
+
+    def test_next_precompute_rolls_over_after_the_run(self):
+        """A run that has already happened today is scheduled for tomorrow"""
+        today_run = datetime(2025, 7, 1, settings.BASELINE_PRECOMPUTE_HOUR)
+
+        assert next_precompute(today_run - timedelta(minutes=1)) == today_run
+        assert next_precompute(today_run) == today_run + timedelta(days=1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
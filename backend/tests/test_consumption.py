@@ -0,0 +1,102 @@
+"""
+Unit tests for the Consumption Series index
+"""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from backend.services.baseline import BaselineService
+from backend.services.consumption import ConsumptionSeries, to_epoch_us, from_epoch_us, US_PER_HOUR
+
+
+class TestConsumptionSeries:
+    """Tests for prefix-sum window queries"""
+
+    def _hourly_series(self, hours=48):
+        base = datetime(2025, 1, 1, 0, 0)
+        records = [
+            {"timestamp": base + timedelta(hours=h), "consumption_kwh": 0.25 * (h % 4 + 1)}
+            for h in range(hours)
+        ]
+        return base, records
+
+    def test_window_sum(self):
+        """Sum over [start, end) uses only the readings inside the window"""
+        base, records = self._hourly_series()
+        series = ConsumptionSeries.from_records(records)
+
+        # Hours 17, 18, 19 -> 0.5 + 0.75 + 1.0
+        total = series.window_sum(base + timedelta(hours=17), base + timedelta(hours=20))
+        assert total == 2.25
+
+    def test_window_sum_empty(self):
+        """Windows outside the data sum to zero"""
+        base, records = self._hourly_series()
+        series = ConsumptionSeries.from_records(records)
+
+        assert series.window_sum(base - timedelta(days=3), base - timedelta(days=2)) == 0.0
+        assert series.window_sum(base + timedelta(days=5), base + timedelta(days=6)) == 0.0
+
+    def test_unsorted_input(self):
+        """Readings are sorted before the prefix sums are built"""
+        base, records = self._hourly_series()
+        series = ConsumptionSeries.from_records(list(reversed(records)))
+
+        assert np.all(np.diff(series.timestamps) > 0)
+        assert series.total_kwh == pytest.approx(sum(r["consumption_kwh"] for r in records))
+
+    def test_window_sums_vectorized(self):
+        """Many windows are answered in one call"""
+        base, records = self._hourly_series()
+        series = ConsumptionSeries.from_records(records)
+
+        starts = to_epoch_us(base) + np.array([0, 24]) * US_PER_HOUR
+        sums = series.window_sums_mwh(starts, 4 * US_PER_HOUR)
+
+        assert sums.tolist() == [2_500_000, 2_500_000]
+
+    def test_window_sums_are_exact(self):
+        """Integer prefix sums carry no cancellation error into late windows"""
+        base = datetime(2025, 1, 1)
+        records = [
+            {"timestamp": base + timedelta(minutes=15 * index), "consumption_kwh": round(0.1 + (index % 7) / 1000, 4)}
+            for index in range(40 * 96)
+        ]
+        series = ConsumptionSeries.from_records(records)
+
+        start = base + timedelta(days=39, hours=17)
+        expected = sum(
+            Decimal(str(record["consumption_kwh"]))
+            for record in records
+            if start <= record["timestamp"] < start + timedelta(hours=3)
+        )
+        assert Decimal(str(series.window_sum(start, start + timedelta(hours=3)))) == expected
+
+    def test_epoch_round_trip(self):
+        """Epoch microsecond conversion is lossless"""
+        moment = datetime(2025, 6, 1, 17, 0, 0, 123456)
+        assert from_epoch_us(to_epoch_us(moment)) == moment
+
+    def test_baseline_accepts_series(self):
+        """BaselineService gives the same result for records and a series"""
+        base_date = datetime(2025, 1, 1, 17, 0)
+        historical_data = [
+            {
+                "timestamp": base_date - timedelta(days=day) + timedelta(hours=hour),
+                "consumption_kwh": Decimal("0.5")
+            }
+            for day in range(1, 11)
+            for hour in range(3)
+        ]
+        series = ConsumptionSeries.from_records(historical_data)
+
+        from_records = BaselineService.calculate_10_day_average(historical_data, base_date, 3)
+        from_series = BaselineService.calculate_10_day_average(series, base_date, 3)
+
+        assert from_series == from_records == Decimal("1.5")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
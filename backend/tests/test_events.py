@@ -0,0 +1,77 @@
+"""
+Unit tests for the Saving Event Service
+"""
+import pytest
+import uuid
+from collections import namedtuple
+
+from backend.services.events import SavingEventService
+from backend.tests.conftest import FakeDB
+
+Row = namedtuple("Row", "event_id user_id")
+
+
+def _fake_db(events=(), joined=()):
+    """Locks or opens ``events`` and joins ``joined``"""
+    return (
+        FakeDB()
+        .respond([Row(event_id, None) for event_id in events], prefix="UPDATE saving_event ", contains="RETURNING")
+        .respond([Row(None, user_id) for user_id in joined], prefix="INSERT INTO saving_event_participant")
+    )
+
+
+def _prefixes(db):
+    return [sql.split(" (")[0].split(" SET")[0] for sql in db.statements]
+
+
+class TestAddParticipants:
+    """Tests for bulk joins"""
+
+    def test_joins_in_one_insert(self):
+        """Lock, one INSERT ... SELECT for all users, one counter update"""
+        event_id = uuid.uuid4()
+        users = [uuid.uuid4() for _ in range(1000)]
+        db = _fake_db(events=[event_id], joined=users[:900])
+
+        assert SavingEventService.add_participants(db, event_id, users + users[:10]) == 900
+        assert _prefixes(db) == [
+            "UPDATE saving_event", "INSERT INTO saving_event_participant", "UPDATE saving_event"
+        ]
+        insert_sql, params = db.statements[1], db.params[1]
+        assert "ON CONFLICT (event_id, user_id) DO NOTHING" in insert_sql
+        # Duplicate ids in the request are collapsed before the statement
+        candidates = [value for value in params.values() if isinstance(value, uuid.UUID) and value != event_id]
+        assert len(candidates) == 1000
+
+    def test_refuses_events_past_scheduled(self):
+        """The conditional lock fails and nothing is inserted"""
+        db = _fake_db(events=[])
+
+        assert SavingEventService.add_participants(db, uuid.uuid4(), [uuid.uuid4()]) is None
+        assert len(db.statements) == 1
+
+
+class TestOpenAndClose:
+    """Tests for event transitions"""
+
+    def test_open_materializes_sessions_in_one_statement(self):
+        """Opened events get their participants' sessions via INSERT ... SELECT"""
+        event_id = uuid.uuid4()
+        db = _fake_db(events=[event_id])
+
+        assert SavingEventService.open_events(db, event_id=event_id) == [event_id]
+        assert _prefixes(db) == ["UPDATE saving_event", "INSERT INTO saving_session"]
+        insert_sql = db.statements[1]
+        assert "SELECT gen_random_uuid()" in insert_sql
+        assert "JOIN saving_event_participant" in insert_sql
+
+    def test_open_nothing_due(self):
+        """No event due means no session insert"""
+        db = _fake_db(events=[])
+
+        assert SavingEventService.open_events(db) == []
+        assert len(db.statements) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
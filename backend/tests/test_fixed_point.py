@@ -0,0 +1,119 @@
+"""
+Unit tests for fixed-point money and energy arithmetic
+"""
+import pytest
+import random
+from decimal import Decimal
+
+import numpy as np
+
+from backend.config import get_settings
+from backend.services.fixed_point import (
+    cents_to_eur,
+    eur_to_cents,
+    eur_to_column_cents,
+    kwh_to_mwh,
+    mwh_to_kwh,
+    ratio,
+    round_half_even,
+    round_half_even_array,
+)
+from backend.services.savings import SavingsCalculationService
+
+settings = get_settings()
+
+
+def _decimal_savings(baseline_kwh: Decimal, actual_kwh: Decimal, is_double_points_day: bool) -> dict:
+    """The previous all-Decimal calculation, as the reference"""
+    saved_kwh = baseline_kwh - actual_kwh
+    if saved_kwh <= 0:
+        return {
+            "saved_kwh": Decimal("0"),
+            "saved_eur": Decimal("0"),
+            "saved_co2_kg": Decimal("0"),
+            "green_points_earned": 0,
+            "savings_percentage": Decimal("0")
+        }
+
+    base_points = int(saved_kwh * Decimal(str(settings.GREEN_POINTS_PER_KWH)))
+    if is_double_points_day:
+        points = int(base_points * Decimal(str(settings.BONUS_MULTIPLIER_DOUBLE_DAYS)))
+    else:
+        points = base_points
+
+    return {
+        "saved_kwh": saved_kwh.quantize(Decimal("0.01")),
+        "saved_eur": (saved_kwh * Decimal(str(settings.KWH_TO_EUR_RATE))).quantize(Decimal("0.01")),
+        "saved_co2_kg": (saved_kwh * Decimal(str(settings.CO2_EMISSION_FACTOR))).quantize(Decimal("0.01")),
+        "green_points_earned": points,
+        "savings_percentage": (saved_kwh / baseline_kwh * Decimal("100")).quantize(Decimal("0.1"))
+    }
+
+
+class TestFixedPoint:
+    """Tests for conversions and rounding"""
+
+    def test_round_half_even(self):
+        """Ties go to the even neighbour, in both directions"""
+        assert [round_half_even(n, 2) for n in (-5, -3, -1, 1, 3, 5)] == [-2, -2, 0, 0, 2, 2]
+        assert round_half_even(7, 3) == 2
+        assert round_half_even(8, 3) == 3
+        assert round_half_even(-7, 3) == -2
+        assert round_half_even(5, -2) == -2
+
+    def test_round_half_even_array_matches_scalar(self):
+        """Vectorized rounding agrees with the scalar version"""
+        numerators = np.arange(-1000, 1000, dtype=np.int64)
+        for denominator in (1, 2, 7, 10, 100):
+            expected = [round_half_even(int(n), denominator) for n in numerators]
+            assert round_half_even_array(numerators, denominator).tolist() == expected
+
+    def test_ratio_reads_floats_as_written(self):
+        """0.3 is three tenths, not its binary expansion"""
+        assert ratio(0.3) == (3, 10)
+        assert ratio(Decimal("1.25")) == (5, 4)
+        assert ratio(2) == (2, 1)
+
+    def test_boundary_round_trip(self):
+        """DECIMAL(10, 4) kWh and DECIMAL(10, 2) EUR survive the round trip"""
+        assert kwh_to_mwh(Decimal("2.3456")) == 2_345_600
+        assert mwh_to_kwh(2_345_600) == Decimal("2.3456")
+        assert eur_to_cents(Decimal("10.005")) == 1000
+        assert eur_to_cents(Decimal("10.015")) == 1002
+        assert cents_to_eur(1002) == Decimal("10.02")
+        assert str(cents_to_eur(500)) == "5.00"
+
+    def test_column_cents_round_half_away_from_zero(self):
+        """Amounts are rounded the way Postgres stores them in DECIMAL(10, 2)"""
+        assert eur_to_column_cents(Decimal("10.005")) == 1001
+        assert eur_to_column_cents(Decimal("10.015")) == 1002
+        assert eur_to_column_cents(Decimal("-0.005")) == -1
+        assert eur_to_column_cents(Decimal("0.004")) == 0
+        assert eur_to_column_cents("2.34") == 234
+
+    @pytest.mark.parametrize("is_double_points_day", [False, True])
+    def test_savings_match_decimal_reference(self, is_double_points_day):
+        """Integer savings equal the Decimal calculation at DB precision"""
+        rng = random.Random(12)
+        for _ in range(5000):
+            baseline = Decimal(rng.randint(0, 100_000)).scaleb(-4)
+            actual = Decimal(rng.randint(0, 100_000)).scaleb(-4)
+            if baseline == 0:
+                continue
+
+            result = SavingsCalculationService.calculate_savings(baseline, actual, is_double_points_day)
+            assert result == _decimal_savings(baseline, actual, is_double_points_day)
+
+    def test_fixed_savings_units(self):
+        """Fixed-point results are hundredths, points and tenths of a percent"""
+        result = SavingsCalculationService.calculate_savings_fixed(
+            kwh_to_mwh(Decimal("2.0")), kwh_to_mwh(Decimal("1.5"))
+        )
+
+        assert result == {
+            "saved_kwh": 50,
+            "saved_eur": 15,
+            "saved_co2_kg": 35,
+            "green_points_earned": 5,
+            "savings_percentage": 250
+        }
@@ -0,0 +1,188 @@
+"""
+Unit tests for the Meter History Cache
+"""
+import pytest
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+from backend.services.consumption import ConsumptionSeries, to_epoch_us, US_PER_HOUR
+from backend.services import history_cache as history_cache_module
+from backend.services.history_cache import MeterHistoryCache, get_history_cache
+from backend.services.meter_store import MeterReadingStore, get_meter_store
+
+
+class FakeUpstream:
+    """AHK stand-in: hourly readings worth 0.25 kWh, records every request"""
+
+    def __init__(self, known=("AHK1", "AHK2", "AHK3")):
+        self.known = set(known)
+        self.calls = []
+
+    @staticmethod
+    def columns(start, hours):
+        timestamps = to_epoch_us(start) + np.arange(hours, dtype=np.int64) * US_PER_HOUR
+        return timestamps, np.full(hours, 0.25)
+
+    async def get_history(self, meter_id, start, end):
+        self.calls.append((meter_id, start, end))
+        if meter_id not in self.known:
+            return None
+        hours = int((end - start).total_seconds() // 3600)
+        return ConsumptionSeries(*self.columns(start, hours), meter_id=meter_id)
+
+
+class Clock:
+    def __init__(self, today):
+        self.today = today
+
+    def __call__(self):
+        return self.today
+
+
+def _cache(tmp_path, upstream, today, max_bytes=10 ** 9):
+    return MeterHistoryCache(
+        store=MeterReadingStore(str(tmp_path)),
+        upstream=upstream,
+        max_bytes=max_bytes,
+        retention_days=35,
+        today=Clock(today)
+    )
+
+
+class TestMeterHistoryCache:
+    """Tests for day-granular caching in front of the AHK API"""
+
+    @pytest.mark.asyncio
+    async def test_second_day_fetches_only_new_days(self, tmp_path):
+        """Yesterday's lookback is reused, only the new days go upstream"""
+        upstream = FakeUpstream()
+        cache = _cache(tmp_path, upstream, today=date(2025, 3, 11))
+
+        first = await cache.get_history("AHK1", datetime(2025, 3, 1, 17), datetime(2025, 3, 11, 17))
+        assert len(first) == 10 * 24
+        assert first.total_kwh == pytest.approx(0.25 * 240)
+
+        upstream.calls.clear()
+        cache._today = Clock(date(2025, 3, 12))
+        second = await cache.get_history("AHK1", datetime(2025, 3, 2, 17), datetime(2025, 3, 12, 17))
+
+        assert len(second) == 10 * 24
+        # One run: the day that became complete (11th) plus today up to the window end
+        assert upstream.calls == [("AHK1", datetime(2025, 3, 11), datetime(2025, 3, 12, 17))]
+        assert cache.stats()["day_hits"] == 9
+
+    @pytest.mark.asyncio
+    async def test_cached_days_are_whole(self, tmp_path):
+        """A day cached from a mid-day window serves other windows correctly"""
+        upstream = FakeUpstream()
+        cache = _cache(tmp_path, upstream, today=date(2025, 3, 11))
+        await cache.get_history("AHK1", datetime(2025, 3, 1, 17), datetime(2025, 3, 2))
+
+        upstream.calls.clear()
+        series = await cache.get_history("AHK1", datetime(2025, 3, 1), datetime(2025, 3, 2))
+
+        assert upstream.calls == []
+        assert len(series) == 24
+
+    @pytest.mark.asyncio
+    async def test_current_day_is_not_cached(self, tmp_path):
+        """Readings for today are always fetched upstream"""
+        upstream = FakeUpstream()
+        cache = _cache(tmp_path, upstream, today=date(2025, 3, 11))
+        await cache.get_history("AHK1", datetime(2025, 3, 11), datetime(2025, 3, 11, 12))
+        await cache.get_history("AHK1", datetime(2025, 3, 11), datetime(2025, 3, 11, 12))
+
+        assert len(upstream.calls) == 2
+        assert cache.store.days_present("AHK1", date(2025, 3, 11), date(2025, 3, 11)) == []
+
+    @pytest.mark.asyncio
+    async def test_unknown_meter(self, tmp_path):
+        """Meters unknown upstream and absent from the cache give None"""
+        cache = _cache(tmp_path, FakeUpstream(), today=date(2025, 3, 11))
+        histories = await cache.get_histories(["AHK1", "AHK404"], datetime(2025, 3, 1), datetime(2025, 3, 3))
+
+        assert len(histories["AHK1"]) == 48
+        assert histories["AHK404"] is None
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_size(self, tmp_path):
+        """Least recently used meters are evicted above the size cap"""
+        upstream = FakeUpstream()
+        day_bytes = 24 * 12
+        cache = _cache(tmp_path, upstream, today=date(2025, 3, 11), max_bytes=2 * 2 * day_bytes)
+        window = (datetime(2025, 3, 1), datetime(2025, 3, 3))
+
+        await cache.get_history("AHK1", *window)
+        await cache.get_history("AHK2", *window)
+        await cache.get_history("AHK1", *window)  # AHK1 is now most recent
+        await cache.get_history("AHK3", *window)
+
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= stats["max_bytes"]
+        assert sorted(cache.store.meter_ids()) == ["AHK1", "AHK3"]
+
+    @pytest.mark.asyncio
+    async def test_retention_drops_old_days(self, tmp_path):
+        """Days past the retention period are removed on write"""
+        upstream = FakeUpstream()
+        cache = _cache(tmp_path, upstream, today=date(2025, 3, 11))
+        await cache.get_history("AHK1", datetime(2025, 3, 1), datetime(2025, 3, 3))
+
+        cache._today = Clock(date(2025, 4, 20))
+        await cache.get_history("AHK1", datetime(2025, 4, 10), datetime(2025, 4, 11))
+
+        assert cache.store.days_present("AHK1", date(2025, 3, 1), date(2025, 4, 30)) == [date(2025, 4, 10)]
+
+    def test_construction_does_not_scan_the_store(self, tmp_path, monkeypatch):
+        """Creating the cache touches no files; meters are indexed when used"""
+        store = MeterReadingStore(str(tmp_path))
+        store.write("AHK1", np.array([to_epoch_us(datetime(2025, 3, 1))]), np.array([0.5]))
+        monkeypatch.setattr(MeterReadingStore, "meter_ids", lambda self: pytest.fail("scanned the store"))
+
+        cache = _cache(tmp_path, FakeUpstream(), today=date(2025, 3, 11))
+
+        assert cache.stats()["meters"] == 0
+
+    @pytest.mark.asyncio
+    async def test_meters_are_indexed_on_first_use(self, tmp_path):
+        """A meter already on disk joins the index the first time it is read"""
+        MeterReadingStore(str(tmp_path)).write("AHK1", *FakeUpstream().columns(datetime(2025, 3, 1), 24))
+        upstream = FakeUpstream()
+        cache = _cache(tmp_path, upstream, today=date(2025, 3, 11))
+
+        await cache.get_history("AHK1", datetime(2025, 3, 1), datetime(2025, 3, 2))
+
+        assert upstream.calls == []
+        assert cache.stats()["meters"] == 1
+        assert cache.stats()["bytes"] == 24 * 12
+
+    def test_adopted_meters_are_evicted_first(self, tmp_path):
+        """Meters left by a previous process count towards the cap as least recently used"""
+        store = MeterReadingStore(str(tmp_path))
+        for meter_id in ("AHK1", "AHK2"):
+            store.write(meter_id, *FakeUpstream().columns(datetime(2025, 3, 1), 24))
+        cache = _cache(tmp_path, FakeUpstream(), today=date(2025, 3, 11), max_bytes=24 * 12)
+        cache._touch("AHK2")
+
+        assert cache.adopt_existing() == 1
+        assert cache.stats()["evictions"] == 1
+        assert store.meter_ids() == ["AHK2"]
+
+    def test_does_not_share_the_ingestion_store(self, monkeypatch):
+        """Cached days and ingested readings live under separate roots"""
+        get_history_cache.cache_clear()
+        monkeypatch.setattr(history_cache_module, "get_ahk_meter_service", lambda: FakeUpstream())
+        try:
+            cache = get_history_cache()
+        finally:
+            get_history_cache.cache_clear()
+
+        assert os.path.abspath(cache.store.root) != os.path.abspath(get_meter_store().root)
+        assert cache.store.segment == "day"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
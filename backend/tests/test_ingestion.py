@@ -0,0 +1,204 @@
+"""
+Unit tests for the Meter Reading Ingestion Service
+"""
+import pytest
+import io
+import uuid
+import warnings
+from datetime import date, datetime, time
+
+from backend.services.consumption import to_epoch_us
+from backend.services.ingestion import MeterIngestionService, iter_csv_rows
+from backend.services.live_tracker import LiveSessionTracker
+from backend.services.meter_store import MeterReadingStore
+from backend.services.rolling_baseline import RollingBaselineStore
+
+
+class _FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql):
+        self.log.append(("execute", " ".join(sql.split())))
+
+    def copy_expert(self, sql, buffer):
+        self.log.append(("copy", buffer.read()))
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, log):
+        self.connection = self
+        self.log = log
+
+    def cursor(self):
+        return _FakeCursor(self.log)
+
+
+class _FakeDB:
+    """Records the SQL a batch write issues"""
+
+    def __init__(self):
+        self.log = []
+        self.commits = 0
+
+    def connection(self):
+        # Session.connection().connection is the DBAPI connection
+        return _FakeConnection(self.log)
+
+    def execute(self, statement):
+        self.log.append(("execute", str(statement)))
+
+    def commit(self):
+        self.commits += 1
+
+
+def _csv(rows, header="meter_id,timestamp,consumption_kwh"):
+    return io.StringIO("\n".join([header] + rows) + "\n")
+
+
+class TestValidation:
+    """Tests for row parsing and validation"""
+
+    def test_rejects_invalid_rows_with_line_numbers(self):
+        """Bad meter ids, timestamps and kWh values are reported by line"""
+        service = MeterIngestionService(_FakeDB(), max_interval_kwh=50)
+        batch, errors = service.validate(
+            ["AHK1", "../x", "AHK1", "AHK1", "AHK1", "AHK1"],
+            ["2025-01-01T00:00", "2025-01-01T00:15", "yesterday", "2025-01-01T00:45", "2025-01-01T01:00", "2025-01-01T01:15"],
+            ["0.25", "0.25", "0.25", "-1", "nan", "75"],
+            first_line=2
+        )
+
+        assert len(batch) == 1
+        assert [error["line"] for error in errors] == [3, 4, 5, 6, 7]
+        assert errors[0]["reason"] == "invalid meter_id"
+        assert errors[1]["reason"] == "invalid timestamp"
+
+    def test_offsets_are_converted_to_utc(self):
+        """Timestamps with an explicit offset are stored as naive UTC"""
+        service = MeterIngestionService(_FakeDB())
+        batch, errors = service.validate(["AHK1"], ["2025-01-01T02:15:00+02:00"], ["0.5"])
+
+        assert not errors
+        assert batch.timestamps_us[0] == to_epoch_us(datetime(2025, 1, 1, 0, 15))
+
+    def test_offsets_parse_without_numpy_timezone_parsing(self):
+        """Z, +HH:MM and naive timestamps in one batch parse exactly and without warnings"""
+        service = MeterIngestionService(_FakeDB())
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            batch, errors = service.validate(
+                ["AHK1"] * 5,
+                ["2025-01-01T00:15:00Z", "2025-01-01T02:30:00+02:00", "2024-12-31T19:15:00-05:30",
+                 "2025-01-01T01:00:00", ""],
+                ["0.5"] * 5
+            )
+
+        assert [error["reason"] for error in errors] == ["invalid timestamp"]
+        assert batch.timestamps_us.tolist() == [
+            to_epoch_us(datetime(2025, 1, 1, 0, 15)),
+            to_epoch_us(datetime(2025, 1, 1, 0, 30)),
+            to_epoch_us(datetime(2025, 1, 1, 0, 45)),
+            to_epoch_us(datetime(2025, 1, 1, 1, 0)),
+        ]
+
+    def test_deduplicate_keeps_last_reading(self):
+        """The last value received for a (meter, timestamp) wins"""
+        service = MeterIngestionService(_FakeDB())
+        batch, _ = service.validate(
+            ["B", "A", "B", "A"],
+            ["2025-01-01T00:00", "2025-01-01T00:00", "2025-01-01T00:00", "2025-01-01T00:15"],
+            ["1", "2", "3", "4"]
+        )
+        unique = batch.deduplicate()
+
+        assert unique.meter_ids.tolist() == ["A", "A", "B"]
+        assert unique.consumption_kwh.tolist() == [2.0, 4.0, 3.0]
+
+    def test_csv_requires_columns(self):
+        """A header without the required columns is rejected"""
+        with pytest.raises(ValueError):
+            list(iter_csv_rows(_csv([], header="meter,time,kwh"), batch_rows=10))
+
+    def test_csv_columns_by_name(self):
+        """Extra columns are ignored and order follows the header"""
+        rows = list(iter_csv_rows(
+            _csv(["0.5,x,AHK1,2025-01-01T00:00"], header="consumption_kwh,quality,meter_id,timestamp"),
+            batch_rows=10
+        ))
+        assert rows == [[["AHK1", "2025-01-01T00:00", "0.5"]]]
+
+
+class TestIngestion:
+    """Tests for batched writes"""
+
+    def test_ingest_csv_report_and_copy(self):
+        """Batches are committed one by one and COPY'd deduplicated"""
+        db = _FakeDB()
+        service = MeterIngestionService(db, batch_rows=2)
+        report = service.ingest_csv(_csv([
+            "AHK1,2025-01-31T23:45:00,0.5",
+            "AHK1,2025-01-31T23:45:00,0.75",
+            "AHK1,2025-02-01T00:00:00,0.25",
+            "AHK2,bad,0.25",
+        ]))
+
+        assert report["rows_received"] == 4
+        assert report["rows_written"] == 2
+        assert report["duplicates_dropped"] == 1
+        assert report["rows_rejected"] == 1
+        assert report["errors"] == [{"line": 5, "reason": "invalid timestamp"}]
+        assert report["batches"] == 2
+        assert db.commits == 2
+
+        copies = [entry[1] for entry in db.log if entry[0] == "copy"]
+        assert copies == [
+            "AHK1,2025-01-31T23:45:00.000000,0.7500\n",
+            "AHK1,2025-02-01T00:00:00.000000,0.2500\n",
+        ]
+        partitions = [entry[1] for entry in db.log if "PARTITION OF" in entry[1]]
+        assert any("FROM ('2025-02-01') TO ('2025-03-01')" in sql for sql in partitions)
+        assert date(2025, 2, 1) in MeterIngestionService._partitions
+
+    def test_feeds_meter_store_and_rolling_baselines(self, tmp_path):
+        """Accepted readings reach the columnar store and registered users' baselines"""
+        user_id = uuid.uuid4()
+        rolling = RollingBaselineStore(slots=[(time(17), 3)], weeks_back=1)
+        service = MeterIngestionService(
+            _FakeDB(),
+            meter_store=MeterReadingStore(str(tmp_path)),
+            rolling_store=rolling
+        )
+        service._resolve_users = lambda meter_ids: {"AHK1": user_id}
+
+        rows = [
+            ("AHK1", datetime(2025, 3, day, hour), 1.0)
+            for day in range(1, 13)
+            for hour in range(24)
+        ] + [("AHK2", datetime(2025, 3, 1, 17), 1.0)]
+        report = service.ingest_rows(rows)
+
+        assert report["rows_written"] == len(rows)
+        assert report["meters"] == 2
+        stored = service.meter_store.load_series("AHK1", datetime(2025, 3, 1), datetime(2025, 3, 13))
+        assert len(stored) == 12 * 24
+        assert rolling.lookup(user_id, datetime(2025, 3, 12, 17), 3) == pytest.approx(3.0)
+
+    def test_notifies_other_processes_before_commit(self):
+        """Live trackers elsewhere hear about the batch from its own commit"""
+        db = _FakeDB()
+        tracker = LiveSessionTracker(interval_minutes=60)
+        service = MeterIngestionService(db, live_tracker=tracker)
+        db.commit = lambda: db.log.append(("commit", None))
+
+        service.ingest_rows([("AHK2", datetime(2025, 3, 1, 17), 1.0), ("AHK1", datetime(2025, 3, 1, 17), 1.0)])
+
+        notify = next(index for index, entry in enumerate(db.log) if "pg_notify" in str(entry[1]))
+        assert db.log[notify + 1] == ("commit", None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
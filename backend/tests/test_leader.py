@@ -0,0 +1,99 @@
+"""
+Unit tests for leader election of background jobs
+"""
+import pytest
+import asyncio
+
+from backend.services.leader import run_as_leader
+
+
+class FakeLock:
+    """Lock that is granted after a number of attempts"""
+
+    def __init__(self, grant_after=0):
+        self.attempts = 0
+        self.grant_after = grant_after
+        self.held = False
+        self.released = 0
+
+    def try_acquire(self):
+        self.attempts += 1
+        self.held = self.attempts > self.grant_after
+        return self.held
+
+    def is_held(self):
+        return self.held
+
+    def release(self):
+        self.held = False
+        self.released += 1
+
+
+class TestRunAsLeader:
+    """Tests for running jobs in the lock holder only"""
+
+    @pytest.mark.asyncio
+    async def test_standby_does_not_run_jobs(self):
+        """Jobs start only once the lock is acquired"""
+        lock = FakeLock(grant_after=2)
+        started = asyncio.Event()
+
+        async def job():
+            started.set()
+            await asyncio.sleep(3600)
+
+        task = asyncio.create_task(run_as_leader(lock, lambda: [job()], check_seconds=0.01))
+        await asyncio.wait_for(started.wait(), timeout=1)
+        assert lock.attempts == 3
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_cancel_stops_jobs_and_releases(self):
+        """Shutdown cancels the running jobs and gives the lock up"""
+        lock = FakeLock()
+        cancelled = asyncio.Event()
+
+        async def job():
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        task = asyncio.create_task(run_as_leader(lock, lambda: [job()], check_seconds=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert cancelled.is_set()
+        assert lock.released == 1
+
+    @pytest.mark.asyncio
+    async def test_lost_lock_stops_jobs_until_regained(self):
+        """Jobs stop when the lock connection is lost and restart on reacquisition"""
+        lock = FakeLock()
+        runs = []
+
+        async def job():
+            runs.append(len(runs))
+            if len(runs) == 1:
+                lock.held = False
+            await asyncio.sleep(3600)
+
+        task = asyncio.create_task(run_as_leader(lock, lambda: [job()], check_seconds=0.01))
+        for _ in range(100):
+            if len(runs) == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        assert runs == [0, 1]
+        assert lock.released >= 1
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
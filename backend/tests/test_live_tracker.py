@@ -0,0 +1,232 @@
+"""
+Unit tests for the Live Session Tracker
+"""
+import pytest
+import asyncio
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+
+from backend.services.consumption import ConsumptionSeries, to_epoch_us, US_PER_HOUR
+from backend.services.live_tracker import LiveSessionTracker
+from backend.tests.conftest import FakeDB
+
+START = datetime(2025, 7, 1, 17)
+END = datetime(2025, 7, 1, 20)
+SESSION = uuid.uuid4()
+
+
+class _FakeStore:
+    def __init__(self, readings):
+        self.readings = readings
+        self.loads = 0
+
+    def load_series(self, meter_id, start, end):
+        self.loads += 1
+        timestamps, kwh = zip(*self.readings) if self.readings else ((), ())
+        return ConsumptionSeries(list(timestamps), list(kwh), meter_id=meter_id)
+
+
+def _hour(offset):
+    return to_epoch_us(START) + offset * US_PER_HOUR
+
+
+def _ingest(tracker, meter_id, readings):
+    timestamps, kwh = zip(*readings)
+    return tracker.ingest(meter_id, np.array(timestamps, dtype=np.int64), np.array(kwh))
+
+
+class TestIncrementalTotals:
+    """Tests for running totals"""
+
+    def test_seeds_once_then_updates_per_reading(self):
+        """Stored readings are loaded once; later ones are added incrementally"""
+        store = _FakeStore([(_hour(0), 0.5)])
+        tracker = LiveSessionTracker(meter_store=store, interval_minutes=60)
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+
+        snapshot = tracker.get(SESSION).snapshot()
+        assert store.loads == 1
+        assert snapshot["consumed_kwh"] == Decimal("0.5000")
+        assert snapshot["prorated_baseline_kwh"] == Decimal("1.0000")
+        assert snapshot["savings_percentage"] == Decimal("50.0")
+
+        # One new reading, one outside the window
+        assert _ingest(tracker, "M1", [(_hour(1), 0.75), (_hour(5), 9.0)]) == 1
+        snapshot = tracker.get(SESSION).snapshot()
+        assert snapshot["consumed_kwh"] == Decimal("1.2500")
+        assert snapshot["saved_kwh"] == Decimal("0.7500")
+        assert snapshot["covered_until"] == datetime(2025, 7, 1, 19)
+        assert not snapshot["complete"]
+
+    def test_resent_reading_replaces_the_previous_value(self):
+        """Corrections are not double-counted"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+
+        _ingest(tracker, "M1", [(_hour(0), 0.5)])
+        _ingest(tracker, "M1", [(_hour(0), 0.25)])
+
+        assert tracker.get(SESSION).snapshot()["consumed_kwh"] == Decimal("0.2500")
+
+    def test_untracked_meters_are_ignored(self):
+        """Readings of meters nobody watches are skipped"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+
+        assert _ingest(tracker, "M2", [(_hour(0), 0.5)]) == 0
+        assert tracker.stats()["readings_applied"] == 0
+
+    def test_missing_interval_is_not_prorated(self):
+        """A gap before the latest reading does not count as saved energy"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+
+        _ingest(tracker, "M1", [(_hour(0), 0.5), (_hour(2), 0.5)])
+
+        snapshot = tracker.get(SESSION).snapshot()
+        assert snapshot["prorated_baseline_kwh"] == Decimal("2.0000")
+        assert snapshot["saved_kwh"] == Decimal("1.0000")
+        assert snapshot["covered_until"] == END
+        assert not snapshot["complete"]
+
+
+def _fake_db(now, rows):
+    """Answers the meter_reading queries with ``rows`` and the clock with ``now``"""
+    return FakeDB().respond(rows, contains="meter_reading").respond([(now,)])
+
+
+class TestCatchUp:
+    """Tests for readings ingested by other processes"""
+
+    def test_reads_tracked_meters_then_only_new_rows(self):
+        """The first catch-up reads the windows; later ones filter on ingested_at"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+        db = _fake_db(datetime(2025, 7, 1, 18, 30), [
+            ("M1", datetime(2025, 7, 1, 17), Decimal("0.5000")),
+            ("M1", datetime(2025, 7, 1, 18), Decimal("0.2500")),
+        ])
+
+        assert tracker.catch_up(db) == 2
+        assert "ingested_at" not in db.statements[-1]
+        assert tracker.get(SESSION).snapshot()["consumed_kwh"] == Decimal("0.7500")
+
+        # Re-read rows inside the overlap change nothing
+        assert tracker.catch_up(db) == 0
+        assert "ingested_at >" in db.statements[-1]
+
+    def test_skips_the_database_when_nothing_is_tracked(self):
+        """An idle worker only reads the clock"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        db = _fake_db(datetime(2025, 7, 1, 18), [])
+
+        assert tracker.catch_up(db) == 0
+        assert len(db.statements) == 1
+
+    def test_notifications_for_other_meters_are_ignored(self):
+        """Only payloads naming a tracked meter, or too long to list them, trigger a catch-up"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+
+        assert not tracker.concerns(["M2,M3"])
+        assert tracker.concerns(["M2", "M3,M1"])
+        assert tracker.concerns([""])
+
+
+class TestSeeding:
+    """Tests for the readings a newly tracked session starts from"""
+
+    def test_new_session_is_seeded_from_the_table(self):
+        """Readings other workers ingested reach the session even if the local store lacks them"""
+        store = _FakeStore([(_hour(0), 0.4)])
+        db = _fake_db(datetime(2025, 7, 1, 19), [
+            (datetime(2025, 7, 1, 17), Decimal("0.5000")),
+            (datetime(2025, 7, 1, 18), Decimal("0.2500")),
+        ])
+        tracker = LiveSessionTracker(meter_store=store, interval_minutes=60, session_factory=lambda: db)
+
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+
+        assert tracker.get(SESSION).snapshot()["consumed_kwh"] == Decimal("0.7500")
+        assert len(db.statements) == 1
+        assert "meter_reading.meter_id = %(meter_id_1)s" in db.statements[0]
+
+    def test_untracked_snapshot_reads_the_table(self):
+        """current() answers from the table without tracking the session"""
+        db = _fake_db(datetime(2025, 7, 1, 19), [(datetime(2025, 7, 1, 17), Decimal("0.5000"))])
+        tracker = LiveSessionTracker(interval_minutes=60, session_factory=lambda: db)
+
+        snapshot = tracker.current(SESSION, "M1", START, END, Decimal("3.0000"))
+
+        assert snapshot["consumed_kwh"] == Decimal("0.5000")
+        assert tracker.get(SESSION) is None
+
+    @pytest.mark.asyncio
+    async def test_first_viewer_gets_the_seeded_snapshot(self):
+        """watch() loads the table before the first snapshot"""
+        db = _fake_db(datetime(2025, 7, 1, 19), [(datetime(2025, 7, 1, 18), Decimal("0.2500"))])
+        tracker = LiveSessionTracker(interval_minutes=60, session_factory=lambda: db)
+        stream = tracker.watch(SESSION, "M1", START, END, Decimal("3.0000"), keepalive=5)
+
+        snapshot = await asyncio.wait_for(stream.__anext__(), 1)
+
+        assert snapshot["consumed_kwh"] == Decimal("0.2500")
+        await stream.aclose()
+        assert tracker.get(SESSION) is None
+
+
+class TestSubscribe:
+    """Tests for pushed updates"""
+
+    @pytest.mark.asyncio
+    async def test_streams_until_window_is_covered(self):
+        """Each ingest wakes the viewer; the last viewer untracks the session"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        tracker.track(SESSION, "M1", START, END, Decimal("3.0000"))
+        received = []
+
+        async def watch():
+            async for snapshot in tracker.subscribe(SESSION, keepalive=5):
+                received.append(snapshot)
+
+        task = asyncio.create_task(watch())
+        await asyncio.sleep(0.01)
+        # Ingestion runs in worker threads
+        await asyncio.to_thread(_ingest, tracker, "M1", [(_hour(0), 0.5), (_hour(1), 0.5)])
+        await asyncio.sleep(0.01)
+        await asyncio.to_thread(_ingest, tracker, "M1", [(_hour(2), 0.5)])
+        await asyncio.wait_for(task, 1)
+
+        assert [snapshot["consumed_kwh"] for snapshot in received] == [
+            Decimal("0.0000"), Decimal("1.0000"), Decimal("1.5000")
+        ]
+        assert received[-1]["complete"]
+        assert tracker.get(SESSION) is None
+        assert tracker.stats()["subscribers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_watch_tracks_and_subscribes_together(self):
+        """A viewer leaving cannot untrack the session under a viewer that is joining"""
+        tracker = LiveSessionTracker(interval_minutes=60)
+        first = tracker.watch(SESSION, "M1", START, END, Decimal("3.0000"), keepalive=5)
+        second = tracker.watch(SESSION, "M1", START, END, Decimal("3.0000"), keepalive=5)
+
+        await first.__anext__()
+        await second.__anext__()
+        await first.aclose()
+
+        assert tracker.get(SESSION) is not None
+        _ingest(tracker, "M1", [(_hour(0), 0.5)])
+        snapshot = await asyncio.wait_for(second.__anext__(), 1)
+        assert snapshot["consumed_kwh"] == Decimal("0.5000")
+
+        await second.aclose()
+        assert tracker.get(SESSION) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
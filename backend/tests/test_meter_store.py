@@ -0,0 +1,105 @@
+"""
+Unit tests for the columnar Meter Reading Store
+"""
+import pytest
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+from backend.services.consumption import to_epoch_us, US_PER_HOUR
+from backend.services.meter_store import MeterReadingStore
+
+
+def _hourly(start, hours, kwh=0.5):
+    timestamps = to_epoch_us(start) + np.arange(hours, dtype=np.int64) * US_PER_HOUR
+    return timestamps, np.full(hours, kwh, dtype=np.float32)
+
+
+class TestMeterReadingStore:
+    """Tests for segment writes and memory-mapped reads"""
+
+    @pytest.mark.parametrize("segment", ["day", "month"])
+    def test_round_trip_across_segments(self, tmp_path, segment):
+        """Readings spanning several segments come back in order"""
+        store = MeterReadingStore(str(tmp_path), segment=segment)
+        timestamps, consumption = _hourly(datetime(2025, 1, 30), 24 * 5)
+        store.write("AHK001", timestamps, consumption)
+
+        series = store.load_series("AHK001", datetime(2025, 1, 30), datetime(2025, 2, 4))
+
+        assert series.timestamps.tolist() == timestamps.tolist()
+        assert series.total_kwh == pytest.approx(0.5 * 24 * 5)
+
+    def test_reads_are_memory_mapped(self, tmp_path):
+        """Segment views are backed by the files, not copies"""
+        store = MeterReadingStore(str(tmp_path))
+        store.write("AHK001", *_hourly(datetime(2025, 1, 1), 24))
+
+        views = store.segments("AHK001", datetime(2025, 1, 1, 6), datetime(2025, 1, 1, 9))
+
+        assert len(views) == 1
+        timestamps, consumption = views[0]
+        assert isinstance(timestamps.base, np.memmap) or isinstance(timestamps, np.memmap)
+        assert len(timestamps) == 3
+        assert consumption.dtype == np.float32
+
+    def test_rewrite_replaces_duplicates(self, tmp_path):
+        """Writing the same (meter, timestamp) again keeps the latest value"""
+        store = MeterReadingStore(str(tmp_path))
+        store.write("AHK001", *_hourly(datetime(2025, 1, 1), 24, kwh=0.5))
+        store.write("AHK001", *_hourly(datetime(2025, 1, 1, 12), 24, kwh=1.0))
+
+        series = store.load_series("AHK001", datetime(2025, 1, 1), datetime(2025, 1, 3))
+
+        assert len(series) == 36
+        assert series.total_kwh == pytest.approx(12 * 0.5 + 24 * 1.0)
+
+    def test_concurrent_writers_keep_every_reading(self, tmp_path):
+        """Threads writing the same segment do not drop each other's readings"""
+        store = MeterReadingStore(str(tmp_path), segment="month")
+        timestamps, consumption = _hourly(datetime(2025, 1, 1), 24 * 20)
+        barrier = threading.Barrier(8)
+
+        def write(worker):
+            barrier.wait()
+            for hour in range(worker, 24 * 20, 8):
+                store.write("AHK001", timestamps[hour:hour + 1], consumption[hour:hour + 1])
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        series = store.load_series("AHK001", datetime(2025, 1, 1), datetime(2025, 1, 21))
+        assert series.timestamps.tolist() == timestamps.tolist()
+        assert not [name for name in (tmp_path / "AHK001").iterdir() if name.suffix == ".tmp"]
+
+    def test_days_present(self, tmp_path):
+        """Only days with stored readings are reported"""
+        store = MeterReadingStore(str(tmp_path))
+        store.write("AHK001", *_hourly(datetime(2025, 1, 1), 24))
+        store.write("AHK001", *_hourly(datetime(2025, 1, 3), 24))
+
+        assert store.days_present("AHK001", date(2025, 1, 1), date(2025, 1, 4)) == [
+            date(2025, 1, 1),
+            date(2025, 1, 3),
+        ]
+
+    def test_missing_meter_is_empty(self, tmp_path):
+        """Unknown meters load as an empty series"""
+        store = MeterReadingStore(str(tmp_path))
+        series = store.load_series("AHK404", datetime(2025, 1, 1), datetime(2025, 1, 2))
+
+        assert len(series) == 0
+
+    def test_rejects_path_like_meter_ids(self, tmp_path):
+        """Meter ids cannot escape the store directory"""
+        store = MeterReadingStore(str(tmp_path))
+        with pytest.raises(ValueError):
+            store.write("../etc", *_hourly(datetime(2025, 1, 1), 1))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,40 @@
+"""
+Unit tests for Postgres notifications
+"""
+import pytest
+
+from backend.services.pg_listener import MAX_PAYLOAD, notify_values
+from backend.tests.conftest import FakeDB
+
+
+def _payloads(db):
+    assert all("pg_notify" in sql for sql in db.statements)
+    return [list(params.values())[1] for params in db.params]
+
+
+class TestNotifyValues:
+    """Tests for splitting values over payloads"""
+
+    def test_values_are_split_under_the_payload_limit(self):
+        """Every value is sent once, whole, in payloads NOTIFY accepts"""
+        db = FakeDB()
+        values = [f"{index:036d}" for index in range(500)]
+
+        notify_values(db, "user_stats", values)
+
+        payloads = _payloads(db)
+        assert len(payloads) > 1
+        assert all(len(payload) <= MAX_PAYLOAD for payload in payloads)
+        assert ",".join(payloads).split(",") == values
+
+    def test_nothing_to_send(self):
+        """No values, no notification"""
+        db = FakeDB()
+
+        notify_values(db, "user_stats", [])
+
+        assert db.statements == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
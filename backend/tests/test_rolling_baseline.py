@@ -0,0 +1,174 @@
+"""
+Unit tests for the Rolling Baseline Store
+"""
+import pytest
+import random
+import threading
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from time import sleep
+
+from backend.services.baseline import BaselineService
+from backend.services.consumption import ConsumptionSeries
+from backend.services.rolling_baseline import RollingBaselineStore
+from backend.tests.conftest import FakeDB
+
+
+def _fake_db(now, rows, factory=FakeDB):
+    """Answers the meter_reading queries with ``rows`` and the clock with ``now``"""
+    return factory().respond(rows, contains="meter_reading").respond([(now,)])
+
+
+class _SlowDB(FakeDB):
+    """Holds the rebuild open long enough for other callers to arrive"""
+
+    def execute(self, statement):
+        sleep(0.05)
+        return super().execute(statement)
+
+
+def _hourly_history(seed, days=35):
+    rng = random.Random(seed)
+    base = datetime(2025, 3, 1, 0, 0)
+    return [
+        {
+            "timestamp": base + timedelta(hours=hour),
+            "consumption_kwh": 5.0 if rng.random() < 0.03 else round(rng.uniform(0.2, 1.0), 4)
+        }
+        for hour in range(days * 24)
+    ]
+
+
+class TestRollingBaselineStore:
+    """Tests for incremental baseline state"""
+
+    def _store(self):
+        return RollingBaselineStore(slots=[(time(17), 3)], weeks_back=4)
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_10_day_lookup_matches_recalculation(self, seed):
+        """Streaming state gives the same baseline as a full recalculation"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        history = _hourly_history(seed)
+        for entry in history:
+            store.ingest(user_id, entry["timestamp"], entry["consumption_kwh"])
+
+        session_start = datetime(2025, 4, 4, 17, 0)
+        expected = BaselineService.calculate_10_day_average(history, session_start, 3)
+        baseline = store.lookup(user_id, session_start, 3)
+
+        assert baseline == expected
+
+    def test_same_weekday_lookup_matches_recalculation(self):
+        """Same-weekday totals are read from the same ring buffer"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        history = _hourly_history(7)
+        store.ingest_series(user_id, ConsumptionSeries.from_records(history))
+
+        session_start = datetime(2025, 4, 4, 17, 0)
+        expected = BaselineService.calculate_same_weekday_average(history, session_start, 3, 4)
+        baseline = store.lookup(user_id, session_start, 3, method="SAME_WEEKDAY_AVERAGE")
+
+        assert baseline == expected
+
+    def test_old_days_rotate_out(self):
+        """Days older than the buffer no longer count"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        for day in range(40):
+            store.ingest(user_id, datetime(2025, 1, 1, 18) + timedelta(days=day), 0.5)
+
+        # Late reading for a day that has already rotated out is ignored
+        store.ingest(user_id, datetime(2025, 1, 1, 18), 100.0)
+
+        assert store.lookup(user_id, datetime(2025, 2, 10, 17), 3) == BaselineService.calculate_10_day_average(
+            [
+                {"timestamp": datetime(2025, 1, 1, 18) + timedelta(days=day), "consumption_kwh": 0.5}
+                for day in range(40)
+            ],
+            datetime(2025, 2, 10, 17),
+            3
+        )
+
+    def test_resent_reading_replaces_previous_value(self):
+        """A corrected interval replaces the old value instead of adding to it"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        for day in range(1, 11):
+            store.ingest(user_id, datetime(2025, 1, 20, 17) - timedelta(days=day), 0.5)
+        store.ingest(user_id, datetime(2025, 1, 19, 17), 9.0)
+        store.ingest(user_id, datetime(2025, 1, 19, 17), 0.5)
+
+        assert store.lookup(user_id, datetime(2025, 1, 20, 17), 3) == Decimal("0.5")
+
+    def test_sync_rebuilds_then_catches_up(self):
+        """The first sync reads the whole window, later ones only newer ingests"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        rows = [
+            (user_id, datetime(2025, 1, 20, 17) - timedelta(days=day), Decimal("0.5000"))
+            for day in range(1, 11)
+        ]
+        db = _fake_db(datetime(2025, 1, 20, 12), rows)
+
+        assert store.sync(db) == 10
+        assert "ingested_at" not in db.statements[-1]
+        assert store.lookup(user_id, datetime(2025, 1, 20, 17), 3) == Decimal("0.5")
+
+        # Another process re-sent one interval; applying it twice changes nothing
+        rows[:] = [(user_id, datetime(2025, 1, 19, 17), Decimal("1.0000"))] * 2
+        assert store.sync(db) == 2
+        assert "meter_reading.ingested_at >" in db.statements[-1]
+
+        expected = self._store()
+        for day in range(2, 11):
+            expected.ingest(user_id, datetime(2025, 1, 20, 17) - timedelta(days=day), 0.5)
+        expected.ingest(user_id, datetime(2025, 1, 19, 17), 1.0)
+        assert store.lookup(user_id, datetime(2025, 1, 20, 17), 3) == \
+            expected.lookup(user_id, datetime(2025, 1, 20, 17), 3)
+
+    def test_first_build_runs_once_for_concurrent_callers(self):
+        """Callers arriving during the rebuild wait for it; later calls do not query"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        db = _fake_db(datetime(2025, 1, 20, 12), [
+            (user_id, datetime(2025, 1, 20, 17) - timedelta(days=day), Decimal("0.5000"))
+            for day in range(1, 11)
+        ], factory=_SlowDB)
+
+        threads = [threading.Thread(target=store.ensure_built, args=(db,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.ensure_built(db)
+
+        assert store.built
+        assert sum("meter_reading" in sql for sql in db.statements) == 1
+        assert store.lookup(user_id, datetime(2025, 1, 20, 17), 3) == Decimal("0.5")
+
+    def test_untracked_slot_misses(self):
+        """Sessions outside tracked slots fall back to recalculation"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        store.ingest(user_id, datetime(2025, 1, 1, 18), 0.5)
+
+        assert store.lookup(user_id, datetime(2025, 1, 5, 9), 3) is None
+        assert store.lookup(user_id, datetime(2025, 1, 5, 17), 2) is None
+        assert store.lookup(uuid.uuid4(), datetime(2025, 1, 5, 17), 3) is None
+
+    def test_insufficient_days(self):
+        """Fewer than five days with consumption gives no baseline"""
+        store = self._store()
+        user_id = uuid.uuid4()
+        for day in range(1, 5):
+            store.ingest(user_id, datetime(2025, 1, 10, 17) - timedelta(days=day), 0.5)
+
+        assert store.lookup(user_id, datetime(2025, 1, 10, 17), 3) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -2,8 +2,14 @@
 Unit tests for Savings Calculation Service
 """
 import pytest
+import uuid
 from decimal import Decimal
 
+from pydantic import ValidationError
+
+import numpy as np
+
+from backend.schemas.session import SessionCompletion
 from backend.services.savings import SavingsCalculationService
 
 
@@ -166,6 +172,57 @@ class TestSavingsCalculationService:
         assert result["coverage_percentage"] == Decimal("100.0")
         assert result["remaining_to_cover"] == Decimal("0.00")
 
+    def test_savings_batch_matches_scalar(self):
+        """Batch columns equal calculate_savings row for row"""
+        rng = np.random.default_rng(3)
+        baselines = [Decimal(int(value)).scaleb(-4) for value in rng.integers(1, 60_000, 2000)]
+        actuals = [Decimal(int(value)).scaleb(-4) for value in rng.integers(0, 60_000, 2000)]
+        double_points = rng.random(2000) < 0.3
+
+        columns = SavingsCalculationService.calculate_savings_batch(baselines, actuals, double_points)
+
+        for index in range(len(baselines)):
+            expected = SavingsCalculationService.calculate_savings(
+                baselines[index], actuals[index], bool(double_points[index])
+            )
+            assert columns["saved_kwh"][index] == int(expected["saved_kwh"] * 100)
+            assert columns["saved_eur"][index] == int(expected["saved_eur"] * 100)
+            assert columns["saved_co2_kg"][index] == int(expected["saved_co2_kg"] * 100)
+            assert columns["green_points_earned"][index] == expected["green_points_earned"]
+            assert columns["savings_percentage"][index] == int(expected["savings_percentage"] * 10)
+
+    def test_savings_batch_accepts_float_arrays(self):
+        """float64 columns give the same result as their Decimal values"""
+        baselines = np.array([2.0, 1.2345, 3.1, 0.5])
+        actuals = np.array([1.5, 1.5, 0.75, 0.5])
+        double_points = np.array([False, True, True, False])
+
+        from_floats = SavingsCalculationService.calculate_savings_batch(baselines, actuals, double_points)
+        from_decimals = SavingsCalculationService.calculate_savings_batch(
+            [Decimal(str(value)) for value in baselines],
+            [Decimal(str(value)) for value in actuals],
+            double_points
+        )
+
+        for name, column in from_floats.items():
+            assert column.dtype == np.int64
+            assert column.tolist() == from_decimals[name].tolist()
+        assert from_floats["saved_eur"].tolist() == [15, 0, 70, 0]
+        assert from_floats["green_points_earned"].tolist() == [5, 0, 46, 0]
+
+
+class TestConsumptionInput:
+    """Consumption enters settlement at the stored precision"""
+
+    def test_accepts_four_decimals(self):
+        completion = SessionCompletion(session_id=uuid.uuid4(), actual_consumption_kwh=Decimal("1.2345"))
+        assert completion.actual_consumption_kwh == Decimal("1.2345")
+
+    def test_rejects_finer_precision(self):
+        """Inputs the mWh fixed-point path would round are refused"""
+        with pytest.raises(ValidationError):
+            SessionCompletion(session_id=uuid.uuid4(), actual_consumption_kwh=Decimal("1.2345678"))
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,150 @@
+"""
+Endpoint tests for the bulk session routes
+"""
+import pytest
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from backend.database import get_db
+from backend.main import app
+from backend.routers import sessions as sessions_router
+from backend.services.session_lifecycle import SessionLifecycleService
+from backend.tests.test_session_lifecycle import START, SessionRow, _fake_db
+
+
+class _QueryDB:
+    """Answers the router's session lookup and counts commits"""
+
+    def __init__(self, sessions=()):
+        self.sessions = list(sessions)
+        self.commits = 0
+        self.rollbacks = 0
+
+    def query(self, *_):
+        return self
+
+    def filter(self, *_):
+        return self
+
+    def all(self):
+        return self.sessions
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class _FakeStats:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, user_ids, db=None):
+        self.invalidated.extend(user_ids)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stats = _FakeStats()
+    monkeypatch.setattr(sessions_router, "get_user_stats_service", lambda: stats)
+    monkeypatch.setattr(sessions_router, "get_batch_executor", lambda: None)
+    client = TestClient(app)
+    client.stats = stats
+    yield client
+    app.dependency_overrides.clear()
+
+
+def _use_db(db):
+    app.dependency_overrides[get_db] = lambda: db
+    return db
+
+
+class TestStartBatch:
+    """POST /api/v1/sessions/start-batch"""
+
+    def test_reports_started_failed_and_unknown(self, client, monkeypatch):
+        started_session = SimpleNamespace(session_id=uuid.uuid4(), status="SCHEDULED")
+        failed_session = SimpleNamespace(session_id=uuid.uuid4(), status="SCHEDULED")
+        unknown = uuid.uuid4()
+        db = _use_db(_QueryDB([started_session, failed_session]))
+        calls = []
+
+        def start_batch(db, sessions, history_loader, executor):
+            calls.append([session.session_id for session in sessions])
+            return [started_session.session_id], {failed_session.session_id: "Failed to calculate valid baseline"}
+
+        monkeypatch.setattr(SessionLifecycleService, "start_batch", start_batch)
+
+        response = client.post("/api/v1/sessions/start-batch", json={"session_ids": [
+            str(started_session.session_id), str(failed_session.session_id), str(unknown), str(unknown)
+        ]})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "started": [str(started_session.session_id)],
+            "failed": [
+                {"session_id": str(failed_session.session_id), "reason": "Failed to calculate valid baseline"},
+                {"session_id": str(unknown), "reason": "Session not found"},
+            ],
+        }
+        assert calls == [[started_session.session_id, failed_session.session_id]]
+        assert db.commits == 1
+
+    def test_rejects_empty_request(self, client):
+        _use_db(_QueryDB())
+
+        assert client.post("/api/v1/sessions/start-batch", json={"session_ids": []}).status_code == 422
+
+
+class TestCompleteBatch:
+    """POST /api/v1/sessions/complete-batch, settled by the real complete_batch"""
+
+    def test_settles_and_reports_failures(self, client):
+        user = uuid.uuid4()
+        settled = SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("2.0000"), "N", "WASTE_WALLET", START)
+        done = SessionRow(uuid.uuid4(), user, "COMPLETED", Decimal("2.0000"), "N", "WASTE_WALLET", START)
+        missing = uuid.uuid4()
+        db = _use_db(_fake_db([settled, done], {user: Decimal("0.15")}))
+
+        response = client.post("/api/v1/sessions/complete-batch", json={"completions": [
+            {"session_id": str(settled.session_id), "actual_consumption_kwh": "1.5"},
+            {"session_id": str(done.session_id), "actual_consumption_kwh": "1.5"},
+            {"session_id": str(missing), "actual_consumption_kwh": "1.5"},
+        ]})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "completed": [str(settled.session_id)],
+            "failed": [
+                {"session_id": str(done.session_id), "reason": "Cannot complete session with status COMPLETED"},
+                {"session_id": str(missing), "reason": "Session not found"},
+            ],
+        }
+        assert db.commits == 1
+        assert client.stats.invalidated == [user]
+
+    def test_rejects_consumption_finer_than_the_column(self, client):
+        _use_db(_fake_db([], {}))
+
+        response = client.post("/api/v1/sessions/complete-batch", json={"completions": [
+            {"session_id": str(uuid.uuid4()), "actual_consumption_kwh": "1.23456"},
+        ]})
+
+        assert response.status_code == 422
+
+    def test_single_completion_validates_precision(self, client):
+        _use_db(_fake_db([], {}))
+
+        response = client.post(
+            f"/api/v1/sessions/{uuid.uuid4()}/complete", params={"actual_consumption_kwh": "1.23456"}
+        )
+
+        assert response.status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,132 @@
+"""
+Unit tests for the Session Lifecycle Service
+"""
+import pytest
+import uuid
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from backend.services.savings import SavingsCalculationService
+from backend.services.session_lifecycle import SessionLifecycleService
+from backend.tests.conftest import FakeDB
+
+START = datetime(2025, 7, 1, 17)
+
+SessionRow = namedtuple(
+    "SessionRow",
+    "session_id user_id status baseline_kwh is_double_points_day allocation_type scheduled_start"
+)
+
+
+def _fake_db(sessions, wallet_balances):
+    """Claims only IN_PROGRESS rows with a baseline, like the conditional UPDATE"""
+    claimed = [row for row in sessions if row.status == "IN_PROGRESS" and row.baseline_kwh is not None]
+    return (
+        FakeDB()
+        .respond(claimed, prefix="UPDATE saving_session", contains="RETURNING")
+        .respond(sessions, prefix="SELECT")
+        .respond(list(wallet_balances.items()), prefix="INSERT INTO waste_wallet")
+    )
+
+
+class TestCompleteBatch:
+    """Tests for set-based session settlement"""
+
+    def test_settles_with_fixed_statement_count(self):
+        """Any cohort size costs claim, results, wallet upsert, ledger insert and user update"""
+        user = uuid.uuid4()
+        sessions = [
+            SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("2.0000"), "N", "WASTE_WALLET", START)
+            for _ in range(50)
+        ]
+        db = _fake_db(sessions, {user: Decimal("17.50")})
+
+        completed, failed = SessionLifecycleService.complete_batch(
+            db, [(row.session_id, Decimal("1.5")) for row in sessions]
+        )
+
+        assert len(completed) == 50
+        assert failed == {}
+        prefixes = ["UPDATE saving_session", "UPDATE saving_session", "INSERT INTO waste_wallet",
+                    "WITH ledger AS \n(INSERT INTO wallet_transaction", 'UPDATE "user"']
+        assert len(db.statements) == len(prefixes)
+        for sql, prefix in zip(db.statements, prefixes):
+            assert sql.startswith(prefix)
+        assert "saving_session.status = %(status_1)s" in db.statements[0]
+        assert "RETURNING" in db.statements[0]
+        assert "ON CONFLICT (user_id) DO UPDATE" in db.statements[2]
+        # The monthly rollup is maintained by the ledger statement itself
+        assert "INSERT INTO wallet_monthly_rollup" in db.statements[3]
+
+    def test_wallet_transactions_carry_running_balance(self):
+        """balance_after walks forward from the pre-batch balance"""
+        user = uuid.uuid4()
+        sessions = [
+            SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("2.0000"), "N", "WASTE_WALLET", START),
+            SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("3.0000"), "Y", "WASTE_WALLET", START),
+        ]
+        # 0.15 + 0.30 credited on top of 10.00
+        db = _fake_db(sessions, {user: Decimal("10.45")})
+
+        completed, _ = SessionLifecycleService.complete_batch(
+            db, [(sessions[0].session_id, Decimal("1.5")), (sessions[1].session_id, Decimal("2.0"))]
+        )
+
+        assert completed[sessions[1].session_id]["savings"] == SavingsCalculationService.calculate_savings(
+            Decimal("3.0000"), Decimal("2.0"), is_double_points_day=True
+        )
+        assert completed[sessions[1].session_id]["wallet_credit"] == Decimal("0.30")
+
+        wallet, = db.executed("INSERT INTO waste_wallet")
+        assert wallet["current_balance_m0"] == Decimal("0.45")
+        assert wallet["sessions_contributed_m0"] == 2
+
+        transactions, = db.executed("WITH ledger AS \n(INSERT INTO wallet_transaction")
+        assert [transactions["amount_m0"], transactions["amount_m1"]] == [Decimal("0.15"), Decimal("0.30")]
+        assert [transactions["balance_after_m0"], transactions["balance_after_m1"]] == \
+            [Decimal("10.15"), Decimal("10.45")]
+
+    def test_user_update_advances_streaks(self):
+        """Consecutive days in one batch reach the user UPDATE as one run"""
+        user = uuid.uuid4()
+        sessions = [
+            SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("2.0000"), "N", "SOLIDARITY_FUND", START),
+            SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("2.0000"), "N", "SOLIDARITY_FUND",
+                       datetime(2025, 7, 2, 17)),
+        ]
+        db = _fake_db(sessions, {})
+
+        SessionLifecycleService.complete_batch(db, [(row.session_id, Decimal("1")) for row in sessions])
+
+        sql, = [sql for sql in db.statements if sql.startswith('UPDATE "user"')]
+        params, = db.executed('UPDATE "user"')
+        assert "current_streak_days=CASE" in sql
+        row = [value for name, value in params.items() if name.startswith("param_")]
+        # user, points, kWh, EUR, CO2, then first day, last day, latest and longest run
+        assert row[0] == user
+        assert row[5:] == [date(2025, 7, 1), date(2025, 7, 2), 2, 2]
+
+    def test_late_sessions_recompute_only_their_users(self):
+        """Users whose run starts on or before their last day get the backfill"""
+        late, on_time = uuid.uuid4(), uuid.uuid4()
+        sessions = [
+            SessionRow(uuid.uuid4(), user, "IN_PROGRESS", Decimal("2.0000"), "N", "SOLIDARITY_FUND", START)
+            for user in (late, on_time)
+        ]
+        db = _fake_db(sessions, {}).respond(
+            [SimpleNamespace(user_id=late, late=True), SimpleNamespace(user_id=on_time, late=None)],
+            prefix='UPDATE "user"'
+        )
+
+        SessionLifecycleService.complete_batch(db, [(row.session_id, Decimal("1")) for row in sessions])
+
+        assert db.statements[-2].startswith('UPDATE "user"')
+        assert '"user" AS previous' in db.statements[-2]
+        assert db.statements[-1].startswith("WITH completed_days")
+        assert [late] in db.params[-1].values()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
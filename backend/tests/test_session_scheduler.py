@@ -0,0 +1,313 @@
+"""
+Unit tests for the Session Scheduler
+"""
+import pytest
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.services.consumption import ConsumptionSeries, to_epoch_us, US_PER_HOUR
+from backend.services.meter_data import MeterDataService
+from backend.services.session_lifecycle import SessionLifecycleService
+from backend.services.session_scheduler import COMPLETE, START, SessionScheduler
+
+NOW = datetime(2025, 7, 1, 16, 59)
+
+
+class _FakeDB:
+    def __init__(self, query_results=(), overdue=(False, False)):
+        self.query_results = list(query_results)
+        self.overdue = list(overdue)
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def query(self, *_):
+        return self
+
+    def filter(self, *_):
+        return self
+
+    def all(self):
+        return self.query_results.pop(0)
+
+    def scalar(self):
+        return self.overdue.pop(0)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def _scheduler(db_factory=None, **kwargs):
+    return SessionScheduler(
+        session_factory=db_factory or _FakeDB,
+        history_loader=lambda sessions: [],
+        consumption_loader=lambda sessions: [],
+        settle_delay=timedelta(minutes=30),
+        now=lambda: NOW,
+        **kwargs
+    )
+
+
+class TestHeap:
+    """Tests for due-time bookkeeping"""
+
+    def test_sessions_sharing_a_due_time_share_one_entry(self):
+        """Scheduling the same (time, action) again is a no-op"""
+        scheduler = _scheduler()
+        for _ in range(10_000):
+            scheduler.schedule(datetime(2025, 7, 1, 17), START)
+        scheduler.schedule(datetime(2025, 7, 1, 20, 30), COMPLETE)
+
+        assert scheduler.stats()["queued"] == 2
+        assert scheduler.next_due() == datetime(2025, 7, 1, 17)
+
+    def test_pop_due_returns_actions_in_time(self):
+        """Only entries due by now are removed"""
+        scheduler = _scheduler()
+        scheduler.schedule(datetime(2025, 7, 1, 17), START)
+        scheduler.schedule(datetime(2025, 7, 1, 17), COMPLETE)
+        scheduler.schedule(datetime(2025, 7, 1, 18), START)
+
+        assert scheduler.pop_due(datetime(2025, 7, 1, 16)) == set()
+        assert scheduler.pop_due(datetime(2025, 7, 1, 17)) == {START, COMPLETE}
+        assert scheduler.next_due() == datetime(2025, 7, 1, 18)
+
+    def test_refresh_queues_starts_and_delayed_completions(self):
+        """Completions are due settle_delay after scheduled_end"""
+        start = datetime(2025, 7, 1, 17)
+        # Session starts, session ends, event starts, event ends
+        db = _FakeDB([[(start,)], [(start + timedelta(hours=3),)], [(start,)], []])
+        scheduler = _scheduler()
+
+        assert scheduler.refresh(db) == 2
+        assert scheduler.pop_due(start) == {START}
+        assert scheduler.next_due() == datetime(2025, 7, 1, 20, 30)
+
+    def test_refresh_queues_overdue_rows_now(self):
+        """Sessions left behind earlier are picked up without a restart"""
+        db = _FakeDB([[], [], [], []], overdue=[True, True])
+        scheduler = _scheduler()
+        scheduler._refreshed_until = NOW
+
+        assert scheduler.refresh(db) == 2
+        assert scheduler.pop_due(NOW) == {START, COMPLETE}
+
+    def test_refresh_leaves_pending_retries_alone(self):
+        """A queued backoff retry is not overtaken by the overdue check"""
+        scheduler = _scheduler()
+        retry_at = scheduler.retry(COMPLETE)
+        # Only the START overdue check runs
+        db = _FakeDB([[], [], [], []], overdue=[False])
+
+        assert scheduler.refresh(db) == 0
+        assert scheduler.next_due() == retry_at
+
+    def test_retry_backs_off(self):
+        """Each retry of an action waits twice as long, up to the cap"""
+        scheduler = _scheduler()
+        delays = []
+        for _ in range(6):
+            delays.append(scheduler.retry(START) - NOW)
+            scheduler.pop_due(NOW + timedelta(days=1))
+
+        assert delays == [timedelta(seconds=seconds) for seconds in (60, 120, 240, 480, 900, 900)]
+
+
+class TestRunDue:
+    """Tests for batch claiming"""
+
+    def test_processes_batches_until_a_short_one(self, monkeypatch):
+        """Each batch is its own transaction; keyset position advances"""
+        dbs = []
+
+        def factory():
+            dbs.append(_FakeDB())
+            return dbs[-1]
+
+        scheduler = _scheduler(db_factory=factory, batch_size=2)
+        sessions = [
+            SimpleNamespace(session_id=uuid.UUID(int=index), scheduled_start=NOW)
+            for index in range(5)
+        ]
+        claims = []
+
+        def claim(db, action, after):
+            claims.append(after)
+            offset = 0 if after is None else next(
+                index + 1 for index, session in enumerate(sessions) if session.session_id == after[1]
+            )
+            return sessions[offset:offset + 2]
+
+        monkeypatch.setattr(scheduler, "_claim", claim)
+        monkeypatch.setattr(scheduler, "_process", lambda db, action, batch: (len(batch) - 1, 1))
+        monkeypatch.setattr(scheduler, "_event_transition", lambda action: None)
+
+        assert scheduler.run_due(START) == (2, 3)
+        assert claims == [None, (NOW, uuid.UUID(int=1)), (NOW, uuid.UUID(int=3))]
+        assert [db.commits for db in dbs] == [1, 1, 1]
+        assert all(db.closed for db in dbs)
+
+    def test_failed_batch_rolls_back(self, monkeypatch):
+        """An error leaves the batch's sessions untouched"""
+        db = _FakeDB()
+        scheduler = _scheduler(db_factory=lambda: db)
+        monkeypatch.setattr(scheduler, "_claim", lambda *_: [SimpleNamespace(session_id=uuid.uuid4())])
+
+        def fail(*_):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(scheduler, "_process", fail)
+        monkeypatch.setattr(scheduler, "_event_transition", lambda action: None)
+
+        with pytest.raises(RuntimeError):
+            scheduler.run_due(COMPLETE)
+        assert db.rollbacks == 1
+        assert db.commits == 0
+
+    @pytest.mark.asyncio
+    async def test_one_wake_up_per_due_batch(self, monkeypatch):
+        """The loop runs each due action once, starts before completions"""
+        scheduler = _scheduler()
+        runs = []
+        monkeypatch.setattr(scheduler, "_refresh_once", lambda: 0)
+        monkeypatch.setattr(scheduler, "run_due", lambda action: runs.append(action) or (0, 0))
+        for _ in range(100):
+            scheduler.schedule(NOW - timedelta(minutes=1), START)
+
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert runs == [START, COMPLETE]
+        assert scheduler.next_due() is None
+
+    @pytest.mark.asyncio
+    async def test_failed_or_partial_runs_are_retried(self, monkeypatch):
+        """A run that raises or leaves sessions behind queues a backoff retry"""
+        scheduler = _scheduler()
+        monkeypatch.setattr(scheduler, "_refresh_once", lambda: 0)
+
+        def run_due(action):
+            if action == START:
+                raise RuntimeError("AHK unavailable")
+            return 10, 3
+
+        monkeypatch.setattr(scheduler, "run_due", run_due)
+
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        retry_at = NOW + timedelta(seconds=60)
+        assert scheduler.pop_due(retry_at) == {START, COMPLETE}
+
+
+class TestProcess:
+    """Tests for the outcome of one claimed batch"""
+
+    class _DB:
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, statement):
+            self.statements.append(statement)
+
+    def _sessions(self, starts):
+        return [
+            SimpleNamespace(session_id=uuid.uuid4(), scheduled_start=start, status="SCHEDULED")
+            for start in starts
+        ]
+
+    def test_missing_baseline_stays_scheduled_for_retry(self, monkeypatch):
+        """A brief meter data outage does not fail the cohort"""
+        sessions = self._sessions([NOW, NOW])
+        monkeypatch.setattr(
+            SessionLifecycleService, "start_batch",
+            lambda **_: ([], {session.session_id: "Failed to calculate valid baseline" for session in sessions})
+        )
+        db = self._DB()
+
+        assert _scheduler()._process(db, START, sessions) == (0, 2)
+        assert db.statements == []
+
+    def test_missing_baseline_fails_after_grace_period(self, monkeypatch):
+        """Sessions still without a baseline long after their start are FAILED"""
+        sessions = self._sessions([NOW - timedelta(hours=25), NOW])
+        monkeypatch.setattr(
+            SessionLifecycleService, "start_batch",
+            lambda **_: ([], {session.session_id: "Failed to calculate valid baseline" for session in sessions})
+        )
+        db = self._DB()
+
+        assert _scheduler()._process(db, START, sessions) == (0, 1)
+        assert len(db.statements) == 1
+        assert db.statements[0].compile().params["status"] == "FAILED"
+
+    def test_sessions_without_readings_are_left_behind(self, monkeypatch):
+        """Ended sessions without complete readings are counted for a retry"""
+        sessions = self._sessions([NOW, NOW, NOW])
+        monkeypatch.setattr(
+            SessionLifecycleService, "complete_batch",
+            lambda db, completions: ({session_id: None for session_id, _ in completions}, {})
+        )
+        scheduler = SessionScheduler(
+            session_factory=_FakeDB,
+            history_loader=lambda sessions: [],
+            consumption_loader=lambda sessions: [Decimal("1.0"), None, None],
+            now=lambda: NOW
+        )
+
+        assert scheduler._process(self._DB(), COMPLETE, sessions) == (1, 2)
+
+
+class TestSessionConsumption:
+    """Tests for metered consumption during a session"""
+
+    def test_sums_window_once_readings_cover_it(self):
+        """Readings must reach the last interval of the session"""
+        session = SimpleNamespace(
+            scheduled_start=datetime(2025, 7, 1, 17),
+            scheduled_end=datetime(2025, 7, 1, 20)
+        )
+        timestamps = to_epoch_us(datetime(2025, 7, 1, 15)) + np.arange(6) * US_PER_HOUR
+        complete = ConsumptionSeries(timestamps, np.array([1.0, 1.0, 0.5, 0.25, 0.125, 9.0]))
+        partial = ConsumptionSeries(timestamps[:4], np.array([1.0, 1.0, 0.5, 0.25]))
+
+        assert MeterDataService._session_consumption(
+            [session, session, session], [complete, partial, []], interval_minutes=60
+        ) == [Decimal("0.8750"), None, None]
+
+    def test_every_interval_must_be_metered(self):
+        """With 15-minute readings a gap of up to 45 minutes is not settled"""
+        session = SimpleNamespace(
+            scheduled_start=datetime(2025, 7, 1, 17),
+            scheduled_end=datetime(2025, 7, 1, 20)
+        )
+        quarter = US_PER_HOUR // 4
+        timestamps = to_epoch_us(session.scheduled_start) + np.arange(12) * quarter
+        complete = ConsumptionSeries(timestamps, np.full(12, 0.25))
+        gap = ConsumptionSeries(np.delete(timestamps, [8, 9, 10]), np.full(9, 0.25))
+        short = ConsumptionSeries(timestamps[:9], np.full(9, 0.25))
+
+        assert MeterDataService._session_consumption(
+            [session, session, session], [complete, gap, short], interval_minutes=15
+        ) == [Decimal("3.0000"), None, None]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,73 @@
+"""
+Unit tests for the Streak Service
+"""
+import pytest
+import uuid
+from datetime import date
+
+from sqlalchemy import column, values, Date, Integer, update
+from sqlalchemy.dialects import postgresql
+
+from backend.models.user import User
+from backend.services.streaks import StreakService
+from backend.tests.conftest import FakeDB
+
+
+class TestBatchRuns:
+    """Tests for runs within one settlement batch"""
+
+    def test_latest_and_longest_run(self):
+        """Days are deduplicated; the latest run may be shorter than the longest"""
+        user = uuid.uuid4()
+        days = [date(2025, 7, 1), date(2025, 7, 2), date(2025, 7, 3), date(2025, 7, 3), date(2025, 7, 6)]
+
+        assert StreakService.batch_runs({user: days}) == {
+            user: (date(2025, 7, 6), date(2025, 7, 6), 1, 3)
+        }
+
+    def test_single_day(self):
+        """One day is a run of one"""
+        user = uuid.uuid4()
+
+        assert StreakService.batch_runs({user: [date(2025, 7, 1)]}) == {
+            user: (date(2025, 7, 1), date(2025, 7, 1), 1, 1)
+        }
+
+
+class TestStatements:
+    """Tests for the generated SQL"""
+
+    def test_completion_updates_only_read_the_user_row(self):
+        """The streak CASE references "user" and the batch values, not saving_session"""
+        runs = values(
+            column("user_id", postgresql.UUID(as_uuid=True)),
+            column("first_day", Date),
+            column("last_day", Date),
+            column("run_length", Integer),
+            column("longest_run", Integer),
+            name="runs"
+        ).data([(uuid.uuid4(), date(2025, 7, 1), date(2025, 7, 1), 1, 1)])
+        sql = str(
+            update(User)
+            .where(User.user_id == runs.c.user_id)
+            .values(**StreakService.completion_updates(runs))
+            .compile(dialect=postgresql.dialect())
+        )
+
+        assert "saving_session" not in sql
+        assert "greatest(\"user\".last_participation_date, runs.last_day)" in sql
+        assert "runs.last_day - \"user\".last_participation_date" in sql
+
+    def test_backfill_is_one_update(self):
+        """Gaps-and-islands per user feed a single UPDATE ... FROM"""
+        db = FakeDB().respond([], rowcount=3)
+
+        assert StreakService.backfill(db) == 3
+        sql, = db.statements
+        assert sql.startswith("WITH completed_days")
+        assert "row_number() OVER (PARTITION BY completed_days.user_id ORDER BY completed_days.day)" in sql
+        assert 'UPDATE "user" SET last_participation_date=streaks.last_day' in sql
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
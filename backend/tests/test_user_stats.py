@@ -0,0 +1,152 @@
+"""
+Unit tests for the User Stats Service
+"""
+import pytest
+import uuid
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql
+
+from backend.services.user_stats import UserStatsService
+from backend.tests.conftest import FakeDB
+
+StatsRow = namedtuple(
+    "StatsRow",
+    "total_kwh_saved total_eur_saved total_co2_saved green_points_balance "
+    "last_participation_date current_streak_days longest_streak_days total_sessions completed_sessions"
+)
+
+TODAY = date(2025, 7, 10)
+
+
+def _row(last_day=date(2025, 7, 9), length=3):
+    return StatsRow(Decimal("6.00"), Decimal("0.90"), Decimal("4.20"), 120, last_day, length, 7, 5, 4)
+
+
+def _fake_db(row):
+    return FakeDB().respond([row] if row is not None else [])
+
+
+def _service():
+    return UserStatsService(ttl_seconds=300, max_bytes=1024 * 1024)
+
+
+class TestStatsQuery:
+    """Tests for the single aggregate statement"""
+
+    def test_one_statement_without_session_history_scan(self):
+        """Counts use FILTER; the streak is read from the user row"""
+        sql = str(UserStatsService.stats_query(uuid.uuid4()).compile(dialect=postgresql.dialect()))
+
+        assert sql.count("SELECT") == 2
+        assert "count(*) FILTER (WHERE saving_session.status" in sql
+        assert '"user".current_streak_days' in sql
+
+
+class TestFromRow:
+    """Tests for turning the row into the response"""
+
+    def test_streak_ending_yesterday_is_current(self):
+        """A streak is current until a full day is missed"""
+        stats = UserStatsService.from_row(_row(), TODAY)
+
+        assert stats["current_streak_days"] == 3
+        assert stats["average_savings_per_session"] == Decimal("1.5")
+
+    def test_lapsed_streak_is_zero(self):
+        """A streak whose last day is before yesterday has lapsed"""
+        stats = UserStatsService.from_row(_row(last_day=date(2025, 7, 8)), TODAY)
+
+        assert stats["current_streak_days"] == 0
+        assert stats["longest_streak_days"] == 7
+
+    def test_user_without_sessions(self):
+        """No completed days means no streak and no average"""
+        row = StatsRow(None, None, None, None, None, None, None, 0, 0)
+        stats = UserStatsService.from_row(row, TODAY)
+
+        assert stats["current_streak_days"] == 0
+        assert stats["average_savings_per_session"] == Decimal("0")
+        assert stats["total_green_points"] == 0
+
+
+class TestCaching:
+    """Tests for per-user caching"""
+
+    def test_served_from_cache_until_invalidated(self):
+        """Completion invalidates the user's entry"""
+        service = _service()
+        user_id = uuid.uuid4()
+        db = _fake_db(_row())
+
+        first = service.get(db, user_id, today=TODAY)
+        assert service.get(db, user_id, today=TODAY) == first
+        assert len(db.statements) == 1
+
+        service.invalidate([user_id, user_id])
+        service.get(db, user_id, today=TODAY)
+        assert len(db.statements) == 2
+
+    def test_new_day_recomputes_the_streak(self):
+        """Entries from yesterday are not served"""
+        service = _service()
+        user_id = uuid.uuid4()
+        db = _fake_db(_row())
+
+        service.get(db, user_id, today=TODAY)
+        assert service.get(db, user_id, today=date(2025, 7, 11))["current_streak_days"] == 0
+        assert len(db.statements) == 2
+
+    def test_missing_user_is_not_cached(self):
+        """Unknown users are reported, not cached"""
+        service = _service()
+        db = _fake_db(None)
+
+        assert service.get(db, uuid.uuid4(), today=TODAY) is None
+        assert service.stats()["entries"] == 0
+
+
+class TestSharedInvalidation:
+    """Tests for invalidating every worker's cache"""
+
+    def test_invalidation_is_sent_in_the_callers_transaction(self):
+        """With a session, the user ids are NOTIFYed on the stats channel"""
+        service = _service()
+        user_id = uuid.uuid4()
+        db = _fake_db(None)
+
+        service.invalidate([user_id, user_id], db=db)
+
+        assert len(db.statements) == 1
+        assert "pg_notify" in db.statements[0]
+
+    @pytest.mark.asyncio
+    async def test_notification_drops_the_named_users(self):
+        """Another worker's invalidation reaches this cache"""
+        service = _service()
+        kept, dropped = uuid.uuid4(), uuid.uuid4()
+        db = _fake_db(_row())
+        service.get(db, kept, today=TODAY)
+        service.get(db, dropped, today=TODAY)
+
+        await service.on_notify([f"{uuid.uuid4()},{dropped}"])
+
+        assert service.stats()["entries"] == 1
+        service.get(db, kept, today=TODAY)
+        assert len(db.statements) == 2
+
+    @pytest.mark.asyncio
+    async def test_reconnect_drops_everything(self):
+        """Invalidations missed while disconnected cannot leave stale entries"""
+        service = _service()
+        service.get(_fake_db(_row()), uuid.uuid4(), today=TODAY)
+
+        await service.on_notify(None)
+
+        assert service.stats()["entries"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
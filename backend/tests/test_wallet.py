@@ -0,0 +1,187 @@
+"""
+Unit tests for the Waste Wallet Service
+"""
+import pytest
+import uuid
+from decimal import Decimal
+
+from backend.models.wallet import WalletTransaction
+from backend.services.wallet import WasteWalletService
+from backend.tests.conftest import FakeDB
+
+
+class _Row:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+    def __getattr__(self, name):
+        return self._mapping[name]
+
+
+def _fake_db(balance_after=None, balance=None):
+    """Plays the database side of the one-statement ledger writes"""
+    def ledger_row(params):
+        if balance_after is None:
+            return []
+        return [_Row({
+            "transaction_id": params["param_1"],
+            "user_id": params["param_2"],
+            "type": params["param_3"],
+            "amount": params["param_4"],
+            "balance_after": balance_after,
+        })]
+
+    return FakeDB().respond([(balance,)], prefix="SELECT").respond(ledger_row)
+
+
+class TestLedgerWrites:
+    """Tests for single-statement credits and debits"""
+
+    def test_credit_is_one_statement(self):
+        """The wallet upsert feeds the transaction insert as a CTE"""
+        db = _fake_db(balance_after=Decimal("12.35"))
+
+        transaction = WasteWalletService.credit_wallet(db, uuid.uuid4(), Decimal("2.34"), session_id=uuid.uuid4())
+
+        sql, = db.statements
+        assert sql.startswith("WITH wallet AS \n(INSERT INTO waste_wallet")
+        assert "ON CONFLICT (user_id) DO UPDATE" in sql
+        assert "INSERT INTO wallet_transaction" in sql
+        assert "wallet.current_balance AS current_balance \nFROM wallet" in sql
+        assert "INSERT INTO wallet_monthly_rollup" in sql
+        assert "ON CONFLICT (user_id, year, month, type) DO UPDATE" in sql
+        assert db.commits == 1
+        assert transaction.amount == Decimal("2.34")
+        assert transaction.balance_after == Decimal("12.35")
+
+    def test_debit_is_a_conditional_update(self):
+        """The balance check happens in the UPDATE's WHERE clause"""
+        db = _fake_db(balance_after=Decimal("0.50"))
+
+        transaction = WasteWalletService.debit_wallet(db, uuid.uuid4(), Decimal("1.00"))
+
+        sql, = db.statements
+        assert sql.startswith("WITH wallet AS \n(UPDATE waste_wallet")
+        assert "waste_wallet.current_balance >= " in sql
+        assert transaction.type == "PAYMENT_TO_MUNICIPALITY"
+
+    def test_insufficient_balance_reads_it_for_the_message(self):
+        """Nothing is committed when the UPDATE matches no row"""
+        db = _fake_db(balance=Decimal("0.40"))
+
+        with pytest.raises(ValueError, match="Available: €0.40"):
+            WasteWalletService.debit_wallet(db, uuid.uuid4(), Decimal("1.00"))
+        assert db.commits == 0
+        assert len(db.statements) == 2
+
+    def test_donation_is_a_conditional_update(self):
+        """Donations spend with the same guarded UPDATE as payments"""
+        db = _fake_db()
+
+        with pytest.raises(ValueError, match="Insufficient balance for donation"):
+            WasteWalletService.donate_to_solidarity_fund(db, uuid.uuid4(), Decimal("5"), uuid.uuid4())
+        sql, = db.statements
+        assert sql.startswith("WITH wallet AS \n(UPDATE waste_wallet")
+        assert "waste_wallet.current_balance >= " in sql
+        assert db.commits == 0
+
+    @pytest.mark.parametrize("amount", [Decimal("0"), Decimal("-0.01"), Decimal("0.004")])
+    def test_rejects_amounts_below_a_cent(self, amount):
+        """Amounts that round to no cents are refused before any statement"""
+        db = _fake_db()
+        with pytest.raises(ValueError):
+            WasteWalletService.credit_wallet(db, uuid.uuid4(), amount)
+        with pytest.raises(ValueError):
+            WasteWalletService.debit_wallet(db, uuid.uuid4(), amount)
+        assert db.statements == []
+
+    def test_amounts_are_rounded_like_the_columns(self):
+        """Sub-cent amounts are rounded half away from zero, as DECIMAL(10, 2) stores them"""
+        db = _fake_db(balance_after=Decimal("0.01"))
+
+        transaction = WasteWalletService.credit_wallet(db, uuid.uuid4(), Decimal("0.005"))
+
+        assert transaction.amount == Decimal("0.01")
+
+
+def _batch_db(balances):
+    """Plays the database side of credit_many"""
+    def ledger_rows(params):
+        count = sum(1 for key in params if key.startswith("transaction_id_m"))
+        columns = ("transaction_id", "user_id", "type", "amount", "balance_after", "description", "session_id")
+        # Shuffled, as multi-row RETURNING order is not guaranteed
+        return [
+            _Row({column: params[f"{column}_m{index}"] for column in columns})
+            for index in reversed(range(count))
+        ]
+
+    return FakeDB().respond(list(balances.items()), prefix="INSERT INTO waste_wallet").respond(ledger_rows)
+
+
+class TestCreditMany:
+    """Tests for the batched credit used by settlement and the coalescer"""
+
+    def test_two_statements_with_running_balances(self):
+        """One wallet upsert, one ledger insert, balances per credit in input order"""
+        alice, bob = uuid.uuid4(), uuid.uuid4()
+        db = _batch_db({alice: Decimal("13.00"), bob: Decimal("2.50")})
+
+        transactions = WasteWalletService.credit_many(db, [
+            (alice, 100, None, "first"),
+            (bob, 250, uuid.uuid4(), "bob"),
+            (alice, 200, None, "second"),
+        ])
+
+        assert len(db.statements) == 2
+        assert "ON CONFLICT (user_id) DO UPDATE" in db.statements[0]
+        assert db.statements[1].startswith("WITH ledger AS \n(INSERT INTO wallet_transaction")
+        assert "GROUP BY ledger.user_id" in db.statements[1]
+        assert [t.description for t in transactions] == ["first", "bob", "second"]
+        assert [t.balance_after for t in transactions] == [Decimal("11.00"), Decimal("2.50"), Decimal("13.00")]
+        assert [t.amount for t in transactions] == [Decimal("1.00"), Decimal("2.50"), Decimal("2.00")]
+
+
+class TestMonthlySummary:
+    """Tests for the monthly summary"""
+
+    def test_reads_the_rollup(self):
+        """One primary key lookup; the ledger is not scanned"""
+        db = FakeDB().respond([
+            ("CREDIT", Decimal("12.50"), 5),
+            ("PAYMENT_TO_MUNICIPALITY", Decimal("5.00"), 1),
+            ("DEBIT", Decimal("1.00"), 1),
+            ("DONATION", Decimal("2.00"), 2),
+        ])
+
+        summary = WasteWalletService.get_monthly_summary(db, uuid.uuid4(), 2025, 12)
+
+        sql, = db.statements
+        params, = db.params
+        assert "FROM wallet_monthly_rollup" in sql
+        assert "wallet_transaction" not in sql
+        assert params["year_1"] == 2025 and params["month_1"] == 12
+        assert summary["total_credits"] == Decimal("12.50")
+        assert summary["total_debits"] == Decimal("6.00")
+        assert summary["total_donations"] == Decimal("2.00")
+        assert summary["net_change"] == Decimal("4.50")
+        assert summary["transaction_count"] == 9
+
+    def test_empty_month(self):
+        """A month without activity sums to zero"""
+        summary = WasteWalletService.get_monthly_summary(FakeDB(), uuid.uuid4(), 2025, 3)
+
+        assert summary["net_change"] == Decimal("0")
+        assert summary["transaction_count"] == 0
+
+    def test_user_created_index(self):
+        """History pages are served by a (user_id, created_at) index"""
+        indexes = {
+            index.name: [column.name for column in index.columns]
+            for index in WalletTransaction.__table__.indexes
+        }
+
+        assert indexes["ix_wallet_transaction_user_created"] == ["user_id", "created_at"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,183 @@
+"""
+Unit tests for the wallet write coalescer
+"""
+import asyncio
+import pytest
+import uuid
+from decimal import Decimal
+
+from backend.services import wallet_coalescer
+from backend.services.wallet_coalescer import CommitOutcomeUnknown, WalletWriteCoalescer
+
+
+class _FakeSession:
+    def __init__(self, commit_error=None):
+        self.commit_error = commit_error
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def commit(self):
+        if self.commit_error is not None:
+            raise self.commit_error
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeLedger:
+    """Stands in for WasteWalletService.credit_many"""
+
+    def __init__(self, bad_users=()):
+        self.bad_users = set(bad_users)
+        self.commit_error = None
+        self.batches = []
+        self.sessions = []
+
+    def session(self):
+        db = _FakeSession(self.commit_error)
+        self.sessions.append(db)
+        return db
+
+    def credit_many(self, db, credits):
+        self.batches.append(list(credits))
+        if any(user_id in self.bad_users for user_id, *_ in credits):
+            raise RuntimeError("wallet write failed")
+        return [
+            {"user_id": user_id, "amount_cents": cents, "description": description}
+            for user_id, cents, _, description in credits
+        ]
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    fake = _FakeLedger()
+    monkeypatch.setattr(wallet_coalescer.WasteWalletService, "credit_many", fake.credit_many)
+    return fake
+
+
+class TestWalletWriteCoalescer:
+    """Test group commit of wallet credits"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_credits_share_one_commit(self, ledger):
+        """Credits arriving together are written as one batch, each caller gets its own row"""
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=5, max_batch=100)
+        users = [uuid.uuid4() for _ in range(20)]
+
+        results = await asyncio.gather(*[
+            coalescer.credit(user_id, Decimal("1.005"), description=f"credit {index}")
+            for index, user_id in enumerate(users)
+        ])
+
+        assert len(ledger.batches) == 1
+        assert len(ledger.sessions) == 1
+        assert ledger.sessions[0].commits == 1
+        assert ledger.sessions[0].closed
+        assert [result["user_id"] for result in results] == users
+        assert [result["description"] for result in results] == [f"credit {i}" for i in range(20)]
+        # Rounded to cents like the DECIMAL(10, 2) column credit_wallet writes to
+        assert all(result["amount_cents"] == 101 for result in results)
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_without_waiting(self, ledger):
+        """Reaching max_batch flushes immediately and starts a new batch"""
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=10_000, max_batch=3)
+
+        results = await asyncio.wait_for(asyncio.gather(*[
+            coalescer.credit(uuid.uuid4(), Decimal("0.50")) for _ in range(6)
+        ]), 1)
+
+        assert len(results) == 6
+        assert [len(batch) for batch in ledger.batches] == [3, 3]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_single_credits(self, ledger):
+        """One bad credit fails only its own caller"""
+        bad = uuid.uuid4()
+        ledger.bad_users.add(bad)
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=5, max_batch=100)
+        good = [uuid.uuid4(), uuid.uuid4()]
+
+        results = await asyncio.gather(
+            coalescer.credit(good[0], Decimal("1.00")),
+            coalescer.credit(bad, Decimal("1.00")),
+            coalescer.credit(good[1], Decimal("1.00")),
+            return_exceptions=True
+        )
+
+        assert results[0]["user_id"] == good[0]
+        assert isinstance(results[1], RuntimeError)
+        assert results[2]["user_id"] == good[1]
+        # The batch, then each credit alone
+        assert [len(batch) for batch in ledger.batches] == [3, 1, 1, 1]
+        assert ledger.sessions[0].rollbacks == 1
+        stats = coalescer.stats()
+        assert stats["fallbacks"] == 1
+        # The single-credit retries are batches too
+        assert stats["batches"] == 2
+        assert stats["credits"] == 2
+        assert stats["failed_credits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_commit_is_not_retried(self, ledger):
+        """A batch whose COMMIT may have landed is never written again"""
+        ledger.commit_error = ConnectionError("server closed the connection")
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=5, max_batch=100)
+
+        results = await asyncio.gather(
+            coalescer.credit(uuid.uuid4(), Decimal("1.00")),
+            coalescer.credit(uuid.uuid4(), Decimal("1.00")),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, CommitOutcomeUnknown) for result in results)
+        assert len(ledger.batches) == 1
+        assert ledger.sessions[0].rollbacks == 0
+        assert coalescer.stats()["fallbacks"] == 0
+        assert coalescer.stats()["failed_credits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_drain_writes_pending_credits(self, ledger):
+        """Shutdown does not wait for the timer or drop credits"""
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=10_000, max_batch=100)
+        credits = [asyncio.create_task(coalescer.credit(uuid.uuid4(), Decimal("1.00"))) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(coalescer.drain(), 1)
+
+        assert [len(batch) for batch in ledger.batches] == [3]
+        assert all(credit.done() and not credit.exception() for credit in credits)
+        assert coalescer.stats()["writing"] == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("amount", [Decimal("0"), Decimal("0.004")])
+    async def test_rejects_amounts_below_a_cent(self, ledger, amount):
+        """Credits that round to no cents fail before joining a batch"""
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=5, max_batch=100)
+
+        with pytest.raises(ValueError, match="must be positive"):
+            await coalescer.credit(uuid.uuid4(), amount)
+
+        assert ledger.batches == []
+
+    @pytest.mark.asyncio
+    async def test_stats(self, ledger):
+        """Batch sizes land in the histogram"""
+        coalescer = WalletWriteCoalescer(ledger.session, max_delay_ms=5, max_batch=100)
+
+        await coalescer.credit(uuid.uuid4(), Decimal("1.00"))
+        await asyncio.gather(*[coalescer.credit(uuid.uuid4(), Decimal("1.00")) for _ in range(12)])
+
+        stats = coalescer.stats()
+        assert stats["batches"] == 2
+        assert stats["credits"] == 13
+        assert stats["largest_batch"] == 12
+        assert stats["average_batch_size"] == 6.5
+        assert stats["batch_size_histogram"] == {"<=1": 1, "<=10": 0, "<=100": 1, "<=1000": 0, ">1000": 0}
+        assert stats["pending"] == 0
+        assert stats["max_batch"] == 100
@@ -0,0 +1,90 @@
+"""
+Unit tests for the monthly wallet rollup
+"""
+import pytest
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql
+
+from backend.models.wallet import WalletMonthlyRollup, WalletTransaction
+from backend.services.wallet_rollup import WalletRollupService
+from backend.tests.conftest import FakeDB
+
+
+class TestRollupMaintenance:
+    """Tests for keeping the rollup in step with the ledger"""
+
+    def test_apply_rides_on_the_ledger_insert(self):
+        """Inserted rows are grouped by month and type, then upserted"""
+        ledger = (
+            insert(WalletTransaction)
+            .values([{"user_id": uuid.uuid4(), "type": "CREDIT", "amount": Decimal("1"), "balance_after": 1}])
+            .returning(*WalletTransaction.__table__.c)
+            .cte("ledger")
+        )
+
+        sql = str(
+            select(ledger).add_cte(WalletRollupService.apply(ledger)).compile(dialect=postgresql.dialect())
+        )
+
+        assert sql.startswith("WITH ledger AS \n(INSERT INTO wallet_transaction")
+        assert "rollup AS \n(INSERT INTO wallet_monthly_rollup" in sql
+        assert "EXTRACT(month FROM ledger.created_at)" in sql
+        assert "GROUP BY ledger.user_id" in sql
+        assert "ON CONFLICT (user_id, year, month, type) DO UPDATE SET " \
+            "total_amount = (wallet_monthly_rollup.total_amount + excluded.total_amount)" in sql
+
+    def test_rebuild_replaces_contents_under_lock(self):
+        """Lock, clear, then one INSERT ... SELECT over the ledger"""
+        db = FakeDB().respond([], prefix="INSERT INTO wallet_monthly_rollup", rowcount=3)
+
+        written = WalletRollupService.rebuild(db)
+
+        sqls = db.statements
+        assert sqls[0] == "LOCK TABLE wallet_monthly_rollup IN EXCLUSIVE MODE"
+        assert sqls[1].startswith("DELETE FROM wallet_monthly_rollup")
+        assert sqls[2].startswith("INSERT INTO wallet_monthly_rollup")
+        assert "FROM wallet_transaction GROUP BY" in sqls[2]
+        assert written == 3
+
+    def test_rollup_key(self):
+        """The primary key is the lookup key of a user's month"""
+        key = [column.name for column in WalletMonthlyRollup.__table__.primary_key.columns]
+
+        assert key == ["user_id", "year", "month", "type"]
+
+
+class TestRollupReads:
+    """Tests for summaries served from the rollup"""
+
+    def test_municipality_month_sums_its_users(self):
+        """Totals per type over the municipality's users"""
+        municipality = uuid.uuid4()
+        db = FakeDB().respond(
+            [("CREDIT", Decimal("100.00"), Decimal("40")), ("DONATION", Decimal("10.00"), Decimal("2"))]
+        )
+
+        summary = WalletRollupService.municipality_month(db, municipality, 2025, 7)
+
+        sql, = db.statements
+        params, = db.params
+        assert 'JOIN "user" ON "user".user_id = wallet_monthly_rollup.user_id' in sql
+        assert "GROUP BY wallet_monthly_rollup.type" in sql
+        assert params["municipality_id_1"] == municipality
+        assert summary["municipality_id"] == municipality
+        assert summary["net_change"] == Decimal("90.00")
+        assert summary["transaction_count"] == 42
+
+    def test_summarize_defaults_to_zero(self):
+        """Types without activity count as zero"""
+        summary = WalletRollupService.summarize(2025, 7, [("DEBIT", Decimal("3.00"), 1)])
+
+        assert summary["total_credits"] == Decimal("0")
+        assert summary["total_debits"] == Decimal("3.00")
+        assert summary["net_change"] == Decimal("-3.00")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])